@@ -0,0 +1,174 @@
+"""
+Admission control for quiz generation.
+
+Two limits, both kept in Django's cache so they hold across worker processes
+when the cache is shared (Redis, Memcached, database cache):
+
+- a token bucket per user, charged ``number_of_questions`` per new quiz, so
+  a 20-question quiz costs ten times a 2-question one
+- a global cap on generations in flight, held as a fixed set of cache slots
+  that expire on their own if a worker dies without releasing them
+
+Over-limit requests raise DRF's ``Throttled``, which becomes a 429 with a
+``Retry-After`` header.
+"""
+import random
+import time
+import uuid
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import Throttled
+
+from .concurrency import cache_lock
+
+
+class TokenBucket:
+    """
+    Token buckets stored in the cache, one per key.
+
+    Each bucket holds at most ``capacity`` tokens and regains
+    ``refill_per_second`` tokens per second.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, cache_alias: str = 'default',
+                 prefix: str = 'quizgen:bucket'):
+        if refill_per_second <= 0:
+            raise ValueError("refill_per_second must be positive")
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.cache = caches[cache_alias]
+        self.prefix = prefix
+
+    def consume(self, key: str, cost: float, now: Optional[float] = None) -> float:
+        """
+        Take ``cost`` tokens from the bucket for ``key``.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until
+            enough will have refilled (nothing is taken in that case).
+        """
+        # A request larger than the bucket drains a full bucket rather than never fitting.
+        cost = min(cost, self.capacity)
+        now = time.time() if now is None else now
+        cache_key = f"{self.prefix}:{key}"
+        # Idle buckets are full again by the time their entry expires.
+        ttl = int(self.capacity / self.refill_per_second) + 60
+
+        with cache_lock(self.cache, f"{cache_key}:lock"):
+            tokens, updated = self.cache.get(cache_key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.refill_per_second)
+            if tokens < cost:
+                return (cost - tokens) / self.refill_per_second
+            self.cache.set(cache_key, (tokens - cost, now), timeout=ttl)
+        return 0.0
+
+
+class SlotPool:
+    """A fixed number of cache-held slots; a slot is held from ``acquire`` until ``release`` or ``ttl``."""
+
+    def __init__(self, size: int, ttl: float, cache_alias: str = 'default', prefix: str = 'quizgen:slot'):
+        self.size = size
+        self.ttl = ttl
+        self.cache = caches[cache_alias]
+        self.prefix = prefix
+
+    def acquire(self) -> Optional[tuple]:
+        """Claim a free slot, or return None if all are taken."""
+        token = uuid.uuid4().hex
+        # Start at a random slot so concurrent callers do not all race for slot 0.
+        start = random.randrange(self.size)
+        for i in range(self.size):
+            key = f"{self.prefix}:{(start + i) % self.size}"
+            if self.cache.add(key, token, timeout=self.ttl):
+                return key, token
+        return None
+
+    def release(self, slot: tuple) -> None:
+        key, token = slot
+        # Only free the slot if it has not expired and been claimed by someone else.
+        if self.cache.get(key) == token:
+            self.cache.delete(key)
+
+    def in_use(self) -> int:
+        keys = [f"{self.prefix}:{i}" for i in range(self.size)]
+        return len(self.cache.get_many(keys))
+
+
+def user_bucket() -> Optional[TokenBucket]:
+    if settings.GENERATION_BUCKET_CAPACITY <= 0:
+        return None
+    return TokenBucket(
+        settings.GENERATION_BUCKET_CAPACITY,
+        settings.GENERATION_BUCKET_REFILL_PER_MINUTE / 60,
+        settings.ADMISSION_CACHE_ALIAS,
+    )
+
+
+def generation_slots() -> Optional[SlotPool]:
+    if settings.GENERATION_MAX_IN_FLIGHT <= 0:
+        return None
+    return SlotPool(settings.GENERATION_MAX_IN_FLIGHT, settings.GENERATION_SLOT_TTL,
+                    settings.ADMISSION_CACHE_ALIAS)
+
+
+def charge(user, number_of_questions: int) -> None:
+    """Charge a new quiz against the user's bucket, raising ``Throttled`` if it is empty."""
+    bucket = user_bucket()
+    if bucket is None:
+        return
+    wait = bucket.consume(f"user:{user.pk}", number_of_questions)
+    if wait:
+        raise Throttled(wait=wait, detail="Quiz generation limit reached.")
+
+
+class Admission:
+    """A held generation slot; release it (or leave the ``with`` block) when generation ends."""
+
+    def __init__(self, pool: Optional[SlotPool], slot: Optional[tuple]):
+        self._pool = pool
+        self._slot = slot
+
+    def release(self) -> None:
+        if self._slot is not None:
+            self._pool.release(self._slot)
+            self._slot = None
+
+    def releasing(self, items: Iterable) -> Iterator:
+        """Yield from ``items`` and release once they are exhausted or abandoned."""
+        try:
+            yield from items
+        finally:
+            self.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def admit(user, number_of_questions: int) -> Admission:
+    """
+    Admit a new generation: claim a global slot, then charge the user's bucket.
+
+    Raises ``Throttled`` if either limit is hit; a slot is never held by a
+    request that was turned away.
+    """
+    pool = generation_slots()
+    slot = None
+    if pool is not None:
+        slot = pool.acquire()
+        if slot is None:
+            raise Throttled(
+                wait=settings.GENERATION_BUSY_RETRY_AFTER,
+                detail="Too many quizzes are being generated right now.",
+            )
+    admission = Admission(pool, slot)
+    try:
+        charge(user, number_of_questions)
+    except Throttled:
+        admission.release()
+        raise
+    return admission
@@ -0,0 +1,281 @@
+"""
+ASGI-native versions of the quiz endpoints.
+
+DRF's ``@api_view`` is synchronous, so under ASGI every request holding an
+LLM call pins a worker thread for its full duration. These views await the
+LLM and use Django's async ORM instead, so one process can keep many
+generations in flight. Request and response shapes match ``views.py``.
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import admission, jobs, progress, question_bank
+from .models import GenerationJob, QuizHistory
+from .serializers import AnswerSerializer, QuizGenerationSerializer, QuizHistorySerializer, ResumeQuizSerializer
+from .scoring import calculate_score
+from .views import answer_row, quiz_history_page, save_completion
+
+
+def _authenticate(request):
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+def async_api_view(methods):
+    """
+    Async stand-in for ``@api_view(methods)`` + ``IsAuthenticated``.
+
+    Authenticates with the configured DRF authentication classes and exposes
+    the parsed JSON body as ``request.data``.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @require_http_methods(methods)
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                user = await sync_to_async(_authenticate)(request)
+            except exceptions.AuthenticationFailed as e:
+                detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+                return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+            if user is None or not user.is_active:
+                return JsonResponse(
+                    {"detail": "Authentication credentials were not provided."},
+                    status=status.HTTP_401_UNAUTHORIZED,
+                )
+            request.user = user
+
+            request.data = {}
+            if request.body:
+                try:
+                    request.data = json.loads(request.body)
+                except ValueError:
+                    return JsonResponse({"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                return await view(request, *args, **kwargs)
+            except Http404:
+                return JsonResponse({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+            except exceptions.Throttled as e:
+                response = JsonResponse({"detail": e.detail}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+                if e.wait is not None:
+                    response['Retry-After'] = str(e.wait)
+                return response
+        return wrapper
+    return decorator
+
+
+async def _get_user_quiz(request, quiz_id):
+    try:
+        return await QuizHistory.objects.with_questions().aget(id=quiz_id, user=request.user)
+    except QuizHistory.DoesNotExist:
+        raise Http404
+
+
+async def _resumed_quiz_response(quiz):
+    await progress.aoverlay([quiz])
+    return JsonResponse({
+        "message": "Incomplete quiz found. Resuming...",
+        "quiz_id": quiz.id,
+        "questions": quiz.questions,
+        "user_answers": quiz.user_answers or [],
+        "current_question_index": quiz.current_question_index or 0,
+    }, status=status.HTTP_200_OK)
+
+
+# ---------- Generate Quiz ----------
+@async_api_view(['POST'])
+async def generate_quiz(request):
+    serializer = QuizGenerationSerializer(data=request.data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    topic = QuizHistory.objects.filter(user=request.user, domain=data['domain'], sub_domain=data['sub_domain'])
+    existing_quiz = await topic.resumable().with_questions().afirst()
+
+    if existing_quiz:
+        return await _resumed_quiz_response(existing_quiz)
+    await sync_to_async(topic.abandon_empty)()
+
+    if data['mode'] == 'async':
+        await sync_to_async(admission.charge)(request.user, data['number_of_questions'])
+        job = await sync_to_async(jobs.enqueue_generation)(
+            user=request.user,
+            domain=data['domain'],
+            sub_domain=data['sub_domain'],
+            level=data['level'],
+            number_of_questions=data['number_of_questions'],
+        )
+        return JsonResponse({
+            "message": "Quiz generation queued.",
+            "job_id": str(job.id),
+            "status": job.status,
+        }, status=status.HTTP_202_ACCEPTED)
+
+    ticket = await sync_to_async(admission.admit)(request.user, data['number_of_questions'])
+    try:
+        result = await question_bank.aassemble_quiz(
+            user=request.user,
+            domain=data['domain'],
+            sub_domain=data['sub_domain'],
+            level=data['level'],
+            number_of_questions=data['number_of_questions'],
+        )
+    finally:
+        await sync_to_async(ticket.release)()
+
+    if isinstance(result, dict) and 'error' in result:
+        return JsonResponse(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    questions = question_bank.pad_with_placeholders(result, data['number_of_questions'])
+
+    quiz, created = await QuizHistory.objects.with_questions().aget_or_create(
+        user=request.user,
+        domain=data['domain'],
+        sub_domain=data['sub_domain'],
+        status='incomplete',
+        defaults={'questions': questions, 'user_answers': [], 'current_question_index': 0},
+    )
+    if not created:
+        # Lost a race with a concurrent request for the same topic.
+        return await _resumed_quiz_response(quiz)
+
+    return JsonResponse({
+        "message": "New quiz generated.",
+        "quiz_id": quiz.id,
+        "questions": questions,
+        "user_answers": [],
+        "current_question_index": 0,
+    }, status=status.HTTP_200_OK)
+
+
+# ---------- Generation Job Status ----------
+MAX_JOB_WAIT_SECONDS = 25
+
+
+@async_api_view(['GET'])
+async def generation_job_status(request, job_id):
+    try:
+        job = await GenerationJob.objects.select_related('quiz').aget(id=job_id, user=request.user)
+    except GenerationJob.DoesNotExist:
+        raise Http404
+    try:
+        wait = min(float(request.GET.get('wait', 0)), MAX_JOB_WAIT_SECONDS)
+    except ValueError:
+        return JsonResponse({"wait": ["A number of seconds is required."]}, status=status.HTTP_400_BAD_REQUEST)
+    job = await sync_to_async(jobs.recover_if_stale)(job)
+    if wait > 0:
+        job = await jobs.await_job(job, wait)
+    return JsonResponse(await sync_to_async(jobs.job_payload)(job), status=status.HTTP_200_OK)
+
+
+# ---------- Save Quiz Progress ----------
+@async_api_view(['POST'])
+async def save_quiz_progress(request, quiz_id):
+    quiz = await _get_user_quiz(request, quiz_id)
+    data = request.data
+
+    if progress.write_behind():
+        await sync_to_async(progress.buffer_progress)(
+            quiz.id, data.get('current_question_index'), data.get('user_answers'))
+        return JsonResponse({"message": "Progress saved successfully."}, status=status.HTTP_200_OK)
+
+    if 'user_answers' in data:
+        quiz.user_answers = data['user_answers']
+    quiz.current_question_index = data.get('current_question_index', quiz.current_question_index)
+    await quiz.asave(update_fields=['user_answers', 'current_question_index', 'updated_at'])
+
+    return JsonResponse({"message": "Progress saved successfully."}, status=status.HTTP_200_OK)
+
+
+# ---------- Record One Answer ----------
+@async_api_view(['PATCH'])
+async def record_answer(request, quiz_id):
+    serializer = AnswerSerializer(data=request.data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    row = answer_row(request.user, quiz_id, data['index'])
+    if progress.write_behind():
+        found = await row.aexists()
+        if found:
+            await sync_to_async(progress.buffer_answer)(quiz_id, data['index'], data['selected'])
+    else:
+        found = await row.aupdate(selected=data['selected'])
+        if found:
+            await QuizHistory.objects.filter(id=quiz_id).aupdate(updated_at=timezone.now())
+    if not found:
+        return JsonResponse({"message": "No such question in an incomplete quiz."}, status=status.HTTP_404_NOT_FOUND)
+    return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+# ---------- Mark Quiz Complete ----------
+@async_api_view(['POST'])
+async def mark_quiz_complete(request, quiz_id):
+    if progress.write_behind():
+        await sync_to_async(progress.flush)([quiz_id])
+    quiz = await _get_user_quiz(request, quiz_id)
+    data = request.data
+    newly_completed = quiz.status != 'completed'
+
+    if 'user_answers' in data:
+        quiz.user_answers = data['user_answers']
+    quiz.score = calculate_score(quiz.questions, quiz.user_answers)
+
+    quiz.status = 'completed'
+    quiz.current_question_index = len(quiz.questions)
+    await sync_to_async(save_completion)(quiz, newly_completed)
+
+    serializer = QuizHistorySerializer(quiz)
+    return JsonResponse({
+        "message": "Quiz completed successfully.",
+        **serializer.data
+    }, status=status.HTTP_200_OK)
+
+
+# ---------- Get Quiz History ----------
+@async_api_view(['GET'])
+async def get_quiz_history(request):
+    page = await sync_to_async(quiz_history_page)(Request(request), request.user)
+    return JsonResponse(page, status=status.HTTP_200_OK)
+
+
+# ---------- Resume Quiz ----------
+@async_api_view(['POST'])
+async def resume_quiz(request):
+    serializer = ResumeQuizSerializer(data=request.data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    quiz = await QuizHistory.objects.with_questions().resumable().filter(
+        user=request.user,
+        domain=data['domain'],
+        sub_domain=data['sub_domain'],
+    ).afirst()
+
+    if not quiz:
+        return JsonResponse({"message": "No incomplete quiz found."}, status=status.HTTP_404_NOT_FOUND)
+
+    await progress.aoverlay([quiz])
+    return JsonResponse({
+        "quiz_id": quiz.id,
+        "questions": quiz.questions,
+        "user_answers": quiz.user_answers or [],
+        "current_question_index": quiz.current_question_index or 0,
+        "status": quiz.status,
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,81 @@
+"""
+Negotiated response compression.
+
+``CompressionMiddleware`` compresses responses of at least
+``COMPRESSION_MIN_SIZE`` bytes with brotli when the client accepts it and
+the ``brotli`` package is installed, and with gzip otherwise. Smaller
+responses (most of the API) go out as they are, since compressing them
+saves little and costs CPU on every request. Streaming responses (the SSE
+and NDJSON quiz streams) are left alone so events are not held back.
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+
+def accepted_encodings(header: str) -> dict:
+    """``Accept-Encoding`` as ``{coding: q}``, e.g. ``"br;q=0.9, gzip"`` -> ``{"br": 0.9, "gzip": 1.0}``."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        q = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str):
+    """The coding to use for a client sending ``header``: "br", "gzip", or None."""
+    accepted = accepted_encodings(header)
+    default = accepted.get('*', 0.0)
+    if brotli is not None and accepted.get('br', default) > 0:
+        return 'br'
+    if accepted.get('gzip', default) > 0:
+        return 'gzip'
+    return None
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if (response.streaming or response.has_header('Content-Encoding')
+                or not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+                or len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The ETag names the uncompressed body; the weak form still matches If-None-Match.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
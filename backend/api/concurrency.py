@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Hashable
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=max(1, settings.BACKGROUND_WORKERS),
+                    thread_name_prefix='quizgen-worker',
+                )
+    return _pool
+
+
+def submit_background(fn: Callable, *args, **kwargs) -> Future:
+    """
+    Run ``fn`` on the process-wide background worker pool.
+
+    At most ``BACKGROUND_WORKERS`` tasks run at once; the rest queue. With
+    ``BACKGROUND_TASKS_EAGER`` the task runs inline and the returned future is
+    already resolved, which keeps tests deterministic.
+    """
+    def run():
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if not settings.BACKGROUND_TASKS_EAGER:
+                close_old_connections()
+
+    if settings.BACKGROUND_TASKS_EAGER:
+        future = Future()
+        try:
+            future.set_result(run())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return _get_pool().submit(run)
+
+
+@contextmanager
+def cache_lock(cache, key: str, wait: float = 0.5):
+    """
+    Best-effort mutual exclusion through ``cache.add``.
+
+    If the lock cannot be had within ``wait`` seconds the block runs anyway:
+    callers use it where an occasional lost race is cheaper than a stall.
+    """
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    acquired = cache.add(key, token, timeout=5)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.002)
+        acquired = cache.add(key, token, timeout=5)
+    try:
+        yield
+    finally:
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait for and share its result (or exception). Nothing is
+    cached once the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Async ``do``: ``fn`` returns an awaitable; callers share one task per key."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._async_calls.get((loop, key))
+            if task is None:
+                task = loop.create_task(fn())
+                self._async_calls[(loop, key)] = task
+                task.add_done_callback(lambda _: self._async_calls.pop((loop, key), None))
+        return await asyncio.shield(task)
@@ -0,0 +1,60 @@
+"""
+Conditional GETs for quiz payloads.
+
+Quiz responses carry an ``ETag`` and ``Last-Modified`` derived from the
+quizzes' ``updated_at`` (plus their score and status, which ``regrade``
+changes without touching ``updated_at``), so a client that sends them back
+in ``If-None-Match`` / ``If-Modified-Since`` gets a bodiless 304 while
+nothing has changed, before the questions are loaded or serialized.
+
+Progress buffered by ``progress`` has not reached ``updated_at`` yet, so
+its version goes into the ETag and ``Last-Modified`` is left out while any
+is pending.
+"""
+import hashlib
+from calendar import timegm
+from typing import Iterable, NamedTuple, Optional
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import progress
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[int]  # Unix time
+
+
+def quiz_validators(quizzes: Iterable, variant: str = '') -> Validators:
+    """
+    Validators for a response built from ``quizzes``; ``variant`` is anything
+    else the body depends on (the query string, the page's links, ...).
+    """
+    quizzes = list(quizzes)
+    buffered = progress.versions(quiz.id for quiz in quizzes)
+    digest = hashlib.blake2b(variant.encode('utf-8'), digest_size=16)
+    for quiz in quizzes:
+        digest.update(f"|{quiz.id}:{quiz.updated_at.isoformat()}:{quiz.status}:{quiz.score}:"
+                      f"{buffered.get(quiz.id, '')}".encode('utf-8'))
+    last_modified = None
+    if quizzes and not buffered:
+        last_modified = max(timegm(quiz.updated_at.utctimetuple()) for quiz in quizzes)
+    return Validators(f'"{digest.hexdigest()}"', last_modified)
+
+
+def tag(response, validators: Validators):
+    """Add the validators to ``response``; clients must revalidate before reusing it."""
+    response['ETag'] = validators.etag
+    if validators.last_modified is not None:
+        response['Last-Modified'] = http_date(validators.last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, validators: Validators):
+    """A 304 if ``request`` is a GET whose preconditions say the client's copy is current, else None."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    response = get_conditional_response(request, validators.etag, validators.last_modified)
+    return tag(response, validators) if response is not None else None
@@ -0,0 +1,129 @@
+import hashlib
+import re
+import threading
+from typing import Hashable, Iterable, List, Optional
+
+import numpy as np
+
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+
+
+def question_text(question) -> str:
+    """Text a question is compared on: its wording plus its options, in a stable order."""
+    if isinstance(question, str):
+        return question
+    options = sorted(str(o) for o in question.get('options', []))
+    return " ".join([str(question.get('question', '')), *options])
+
+
+def shingles(text: str, size: int = 3) -> np.ndarray:
+    """32-bit hashes of the word n-grams in ``text`` (single words for very short texts)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        grams = words or [text.lower()]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=4).digest(), 'little') for g in set(grams)),
+        dtype=np.uint64,
+    )
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index for spotting reworded copies of questions.
+
+    Each question is reduced to a ``num_perm``-value MinHash signature of its
+    word 3-grams. Signatures are split into ``bands``; questions sharing any
+    band are candidates, and a candidate is a near-duplicate when the share of
+    matching signature values (an estimate of Jaccard similarity) reaches
+    ``threshold``. Lookups touch only candidate rows, so cost stays flat as
+    the index grows instead of scanning every stored question.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.6, seed: int = 7):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._signatures = np.empty((0, num_perm), dtype=np.uint64)
+        self._size = 0
+        self._keys: List[Hashable] = []
+        self._buckets = [dict() for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def signature(self, question) -> np.ndarray:
+        hashes = shingles(question_text(question))
+        # ((a * x + b) mod p) & 0xffffffff for every permutation and shingle at
+        # once. The uint64 product wraps on purpose (as in datasketch); it keeps
+        # the permutations well mixed without leaving NumPy.
+        with np.errstate(over='ignore'):
+            permuted = ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _similar_rows(self, signature: np.ndarray) -> np.ndarray:
+        candidates = set()
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(band.get(key, ()))
+        if not candidates:
+            return np.empty(0, dtype=np.int64)
+        rows = np.fromiter(candidates, dtype=np.int64)
+        similarity = (self._signatures[rows] == signature).mean(axis=1)
+        return rows[similarity >= self.threshold]
+
+    def query(self, question) -> List[Hashable]:
+        """Keys of stored questions that are near-duplicates of ``question``."""
+        signature = self.signature(question)
+        with self._lock:
+            return [self._keys[row] for row in self._similar_rows(signature)]
+
+    def contains_near_duplicate(self, question) -> bool:
+        return bool(self.query(question))
+
+    def add(self, question, key: Optional[Hashable] = None) -> None:
+        self._add_signature(self.signature(question), key)
+
+    def add_many(self, questions: Iterable, keys: Optional[Iterable[Hashable]] = None) -> None:
+        questions = list(questions)
+        keys = list(keys) if keys is not None else [None] * len(questions)
+        for question, key in zip(questions, keys):
+            self.add(question, key)
+
+    def add_if_new(self, question, key: Optional[Hashable] = None) -> bool:
+        """Add ``question`` unless it near-duplicates something stored; returns whether it was added."""
+        signature = self.signature(question)
+        with self._lock:
+            if len(self._similar_rows(signature)):
+                return False
+            self._add_signature_locked(signature, key)
+        return True
+
+    def _add_signature(self, signature: np.ndarray, key: Optional[Hashable]) -> None:
+        with self._lock:
+            self._add_signature_locked(signature, key)
+
+    def _add_signature_locked(self, signature: np.ndarray, key: Optional[Hashable]) -> None:
+        row = self._size
+        if row == len(self._signatures):
+            grown = np.empty((max(64, row * 2), self.num_perm), dtype=np.uint64)
+            grown[:row] = self._signatures[:row]
+            self._signatures = grown
+        self._signatures[row] = signature
+        self._size += 1
+        self._keys.append(row if key is None else key)
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(band_key, []).append(row)
@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+
+def percentile(ordered, q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process counters and latency histograms.
+
+    Histograms keep the most recent ``window`` observations per series, so
+    percentiles describe current behaviour rather than the whole process life.
+    """
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple, float] = defaultdict(float)
+        self._histograms: Dict[Tuple, deque] = {}
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = deque(maxlen=self.window)
+            series.append(value)
+
+    def percentile(self, name: str, q: float, **labels) -> Optional[float]:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            ordered = sorted(self._histograms.get(key, ()))
+        return percentile(ordered, q)
+
+    def count(self, name: str, **labels) -> int:
+        """Observations currently held for a histogram series."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            return len(self._histograms.get(key, ()))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: sorted(values) for key, values in self._histograms.items()}
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            "histograms": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": len(values),
+                    "p50": percentile(values, 50),
+                    "p90": percentile(values, 90),
+                    "p99": percentile(values, 99),
+                    "max": values[-1] if values else None,
+                }
+                for (name, labels), values in sorted(histograms.items())
+            ],
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GenerationRecord:
+    """What one ``AIService`` generation did, from request to result."""
+    backend: str
+    model_name: str
+    domain: str
+    sub_domain: str
+    level: str
+    mode: str
+    requested: int
+    returned: int = 0
+    shards: int = 1
+    failed_shards: int = 0
+    schema_failures: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    truncated: bool = False
+    outcome: str = "ok"
+    error: str = ""
+    wall_ms: float = 0.0
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def add_usage(self, usage: dict) -> None:
+        self.input_tokens += usage.get("input_tokens") or 0
+        self.output_tokens += usage.get("output_tokens") or 0
+        self.truncated = self.truncated or bool(usage.get("truncated"))
+
+    def finish(self, returned: int = 0, error: Optional[BaseException] = None) -> "GenerationRecord":
+        self.wall_ms = (time.perf_counter() - self._started) * 1000
+        self.returned = returned
+        if error is not None:
+            self.outcome = "schema_error" if is_schema_error(error) else "error"
+            self.error = f"{type(error).__name__}: {error}"[:2000]
+        elif returned < self.requested:
+            self.outcome = "partial"
+        return self
+
+
+class LLMOutputError(ValueError):
+    """The model answered, but its output did not validate against the quiz schema."""
+
+    def __init__(self, message: str, usage: Optional[dict] = None):
+        super().__init__(message)
+        self.usage = usage or {}
+
+
+def is_schema_error(error: BaseException) -> bool:
+    from pydantic import ValidationError
+
+    return isinstance(error, (LLMOutputError, ValidationError))
+
+
+def record_generation(record: GenerationRecord) -> None:
+    """Feed a finished generation into the metrics registry and, if enabled, ``GenerationLog``."""
+    labels = {"backend": record.backend, "mode": record.mode}
+    registry.increment("llm_generations", outcome=record.outcome, **labels)
+    registry.observe("llm_latency_ms", record.wall_ms, **labels)
+    registry.increment("llm_input_tokens", record.input_tokens, **labels)
+    registry.increment("llm_output_tokens", record.output_tokens, **labels)
+    registry.increment("llm_questions_requested", record.requested, **labels)
+    registry.increment("llm_questions_returned", record.returned, **labels)
+    if record.truncated:
+        registry.increment("llm_truncated", **labels)
+    if record.schema_failures:
+        registry.increment("llm_schema_failures", record.schema_failures, **labels)
+
+    if settings.GENERATION_LOG_ENABLED:
+        from .models import GenerationLog
+
+        fields = asdict(record)
+        fields.pop("_started")
+        try:
+            GenerationLog.objects.create(**fields)
+        except Exception:
+            # Losing a log row must never fail the generation it describes.
+            logger.exception("Could not persist GenerationLog")
+
+
+async def arecord_generation(record: GenerationRecord) -> None:
+    await sync_to_async(record_generation)(record)
@@ -0,0 +1,185 @@
+"""
+Queued quiz generation on the background worker pool.
+
+A worker claims a job by moving it from queued to running, then refreshes
+its ``heartbeat_at`` every ``GENERATION_JOB_HEARTBEAT_INTERVAL`` seconds
+until it finishes. The pool's queue lives in memory, so a job whose process
+died stays queued or running with no worker behind it; ``recover_if_stale``
+(run when the job is polled) requeues it, or fails it after
+``GENERATION_JOB_MAX_ATTEMPTS`` runs.
+"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import question_bank
+from .concurrency import submit_background
+from .models import GenerationJob, QuizHistory
+
+
+def enqueue_generation(user, domain: str, sub_domain: str, level: str, number_of_questions: int) -> GenerationJob:
+    """Record a generation job and hand it to the background worker pool."""
+    job = GenerationJob.objects.create(
+        user=user,
+        domain=domain,
+        sub_domain=sub_domain,
+        level=level,
+        number_of_questions=number_of_questions,
+    )
+    # Submit only once the row is visible to the worker's connection.
+    transaction.on_commit(lambda: submit_background(run_generation_job, job.id))
+    return job
+
+
+def run_generation_job(job_id) -> None:
+    """Assemble the quiz for a queued job and attach it, recording any failure on the job."""
+    now = timezone.now()
+    # Claimed in one statement, so a job submitted twice (e.g. requeued) runs once.
+    claimed = GenerationJob.objects.filter(id=job_id, status='queued').update(
+        status='running', attempts=F('attempts') + 1, heartbeat_at=now, updated_at=now)
+    if not claimed:
+        return
+    job = GenerationJob.objects.select_related('user').get(id=job_id)
+
+    try:
+        with _heartbeat(job.id):
+            _generate(job)
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+
+
+def _generate(job: GenerationJob) -> None:
+    """Attach the topic's resumable quiz to ``job``, assembling a new one if there is none."""
+    topic = QuizHistory.objects.filter(user=job.user, domain=job.domain, sub_domain=job.sub_domain)
+    quiz = topic.resumable().first()
+
+    if quiz is None:
+        topic.abandon_empty()
+        result = question_bank.assemble_quiz(
+            user=job.user,
+            domain=job.domain,
+            sub_domain=job.sub_domain,
+            level=job.level,
+            number_of_questions=job.number_of_questions,
+        )
+        if isinstance(result, dict) and 'error' in result:
+            raise RuntimeError(result['error'])
+
+        # get_or_create: a concurrent request may have started this topic meanwhile.
+        quiz, _ = QuizHistory.objects.get_or_create(
+            user=job.user,
+            domain=job.domain,
+            sub_domain=job.sub_domain,
+            status='incomplete',
+            defaults={
+                'questions': question_bank.pad_with_placeholders(result, job.number_of_questions),
+                'user_answers': [],
+                'current_question_index': 0,
+            },
+        )
+
+    job.quiz = quiz
+    job.status = 'succeeded'
+    job.save(update_fields=['quiz', 'status', 'updated_at'])
+
+
+@contextmanager
+def _heartbeat(job_id):
+    """Refresh the running job's ``heartbeat_at`` from a side thread while the body runs."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.GENERATION_JOB_HEARTBEAT_INTERVAL):
+                GenerationJob.objects.filter(id=job_id, status='running').update(heartbeat_at=timezone.now())
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name='quizgen-job-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def recover_if_stale(job: GenerationJob) -> GenerationJob:
+    """
+    Requeue ``job``, or fail it once it has used up its attempts, if no
+    worker is behind it: running without a heartbeat for
+    ``GENERATION_JOB_STALE_AFTER`` seconds, or queued for
+    ``GENERATION_JOB_QUEUE_TIMEOUT`` seconds.
+    """
+    now = timezone.now()
+    if job.status == 'running':
+        # Compare-and-set on the heartbeat read, so only one poller recovers it.
+        rows = GenerationJob.objects.filter(id=job.id, status='running', heartbeat_at=job.heartbeat_at)
+        stale = job.heartbeat_at is None or (
+            now - job.heartbeat_at > timedelta(seconds=settings.GENERATION_JOB_STALE_AFTER))
+    elif job.status == 'queued':
+        rows = GenerationJob.objects.filter(id=job.id, status='queued', updated_at=job.updated_at)
+        stale = now - job.updated_at > timedelta(seconds=settings.GENERATION_JOB_QUEUE_TIMEOUT)
+    else:
+        return job
+    if not stale:
+        return job
+
+    if job.attempts >= settings.GENERATION_JOB_MAX_ATTEMPTS:
+        recovered = rows.update(status='failed', error="The worker running this job stopped responding.",
+                                updated_at=now)
+    else:
+        recovered = rows.update(status='queued', heartbeat_at=None, updated_at=now)
+        if recovered:
+            submit_background(run_generation_job, job.id)
+    if recovered:
+        job.refresh_from_db()
+    return job
+
+
+def wait_for_job(job: GenerationJob, timeout: float, interval: float = 0.25) -> GenerationJob:
+    """Long-poll helper: re-read the job until it finishes or ``timeout`` seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not job.is_finished and time.monotonic() < deadline:
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        job.refresh_from_db()
+    return job
+
+
+async def await_job(job: GenerationJob, timeout: float, interval: float = 0.25) -> GenerationJob:
+    """``wait_for_job`` for async views: sleeps without holding a worker thread."""
+    deadline = time.monotonic() + timeout
+    while not job.is_finished and time.monotonic() < deadline:
+        await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        await job.arefresh_from_db()
+    return job
+
+
+def job_payload(job: GenerationJob) -> dict:
+    payload = {
+        "job_id": str(job.id),
+        "status": job.status,
+        "domain": job.domain,
+        "sub_domain": job.sub_domain,
+        "level": job.level,
+        "number_of_questions": job.number_of_questions,
+    }
+    if job.status == 'succeeded' and job.quiz is not None:
+        payload.update({
+            "quiz_id": job.quiz.id,
+            "questions": job.quiz.questions,
+            "user_answers": job.quiz.user_answers or [],
+            "current_question_index": job.quiz.current_question_index or 0,
+        })
+    elif job.status == 'failed':
+        payload["error"] = job.error
+    return payload
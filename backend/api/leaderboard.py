@@ -0,0 +1,116 @@
+"""
+Per-domain and global leaderboards of best and average quiz score.
+
+``LeaderboardEntry`` is a rank table: one row per user and board, updated
+in place when a quiz completes. Boards are read through indexes on
+(domain, score), so a top-K page costs about K index entries and a user's
+rank is one indexed count, however large quiz history grows.
+
+Rankings use competition ranking: users with equal scores share a rank.
+``rebuild`` recomputes every entry from history, e.g. after
+``manage.py regrade``.
+"""
+from collections import defaultdict
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Greatest
+
+from .models import LeaderboardEntry, QuizHistory
+from .question_bank import normalize_key
+
+ORDERINGS = {'best': 'best_score', 'average': 'average_score'}
+
+
+def _record(user_id: int, domain: str, score: float) -> None:
+    rows = LeaderboardEntry.objects.filter(domain=domain, user_id=user_id)
+    # Every right-hand side reads the row's values from before the update.
+    changes = dict(
+        quizzes=F('quizzes') + 1,
+        total_score=F('total_score') + score,
+        best_score=Greatest(F('best_score'), score),
+        average_score=(F('total_score') + score) / (F('quizzes') + 1),
+    )
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            LeaderboardEntry.objects.create(
+                domain=domain, user_id=user_id, quizzes=1,
+                total_score=score, best_score=score, average_score=score,
+            )
+    except IntegrityError:
+        # Another completion created the entry first.
+        rows.update(**changes)
+
+
+def record_score(quiz: QuizHistory) -> None:
+    """Count a just-completed quiz on its domain's board and the global one; call it once per quiz."""
+    if quiz.score is None:
+        return
+    _record(quiz.user_id, normalize_key(quiz.domain), quiz.score)
+    _record(quiz.user_id, LeaderboardEntry.GLOBAL, quiz.score)
+
+
+def top(domain: str = LeaderboardEntry.GLOBAL, by: str = 'best', limit: int = 10) -> list:
+    """The first ``limit`` entries of a board, with their ranks."""
+    field = ORDERINGS[by]
+    entries = (LeaderboardEntry.objects.filter(domain=normalize_key(domain))
+               .select_related('user').order_by(f'-{field}', 'user')[:limit])
+    ranked, rank, previous = [], 0, None
+    for position, entry in enumerate(entries, start=1):
+        score = getattr(entry, field)
+        if score != previous:
+            rank, previous = position, score
+        ranked.append(_payload(entry, rank))
+    return ranked
+
+
+def rank_of(user, domain: str = LeaderboardEntry.GLOBAL, by: str = 'best') -> Optional[dict]:
+    """``user``'s entry and rank on a board, or None if they are not on it."""
+    field = ORDERINGS[by]
+    domain = normalize_key(domain)
+    entry = LeaderboardEntry.objects.filter(domain=domain, user=user).select_related('user').first()
+    if entry is None:
+        return None
+    ahead = LeaderboardEntry.objects.filter(domain=domain, **{f'{field}__gt': getattr(entry, field)}).count()
+    return _payload(entry, ahead + 1)
+
+
+def _payload(entry: LeaderboardEntry, rank: int) -> dict:
+    return {
+        'rank': rank,
+        'username': entry.user.username,
+        'quizzes': entry.quizzes,
+        'best_score': entry.best_score,
+        'average_score': round(entry.average_score, 2),
+    }
+
+
+def rebuild() -> int:
+    """
+    Recompute every board from completed quizzes.
+
+    Returns:
+        int: the number of entries written.
+    """
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    grouped = (QuizHistory.objects.filter(status='completed', score__isnull=False)
+               .values('user_id', 'domain').order_by()
+               .annotate(quizzes=Count('id'), total=Sum('score'), best=Max('score')))
+    for row in grouped.iterator():
+        for domain in (normalize_key(row['domain']), LeaderboardEntry.GLOBAL):
+            total = totals[(row['user_id'], domain)]
+            total[0] += row['quizzes']
+            total[1] += row['total']
+            total[2] = max(total[2], row['best'])
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create([
+            LeaderboardEntry(user_id=user_id, domain=domain, quizzes=quizzes, total_score=total,
+                             best_score=best, average_score=total / quizzes)
+            for (user_id, domain), (quizzes, total, best) in totals.items()
+        ], batch_size=1000)
+    return len(totals)
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import transfer
+from api.models import BankQuestion
+from api.question_bank import normalize_key
+
+
+class Command(BaseCommand):
+    help = "Stream the question bank to NDJSON question sets or CSV, in the form import_questions reads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write, or - for stdout.")
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            help="Output format (default: from the file extension, else ndjson).")
+        parser.add_argument('--domain', help="Only export this domain's pools.")
+        parser.add_argument('--level', choices=sorted(transfer.LEVELS))
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Questions read per query.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        entries = BankQuestion.objects.all()
+        if options['domain']:
+            entries = entries.filter(domain=normalize_key(options['domain']))
+        if options['level']:
+            entries = entries.filter(level=options['level'])
+
+        fmt = transfer.format_for(options['output'], options['format'])
+        started = time.perf_counter()
+        if options['output'] == '-':
+            written, report = transfer.export_bank(entries, fmt, self.stdout, options['chunk_size']), self.stderr
+        else:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                written, report = transfer.export_bank(entries, fmt, stream, options['chunk_size']), self.stdout
+        unit = 'questions' if fmt == 'csv' else 'question sets'
+        report.write(f"Exported {written} {unit} in {time.perf_counter() - started:.1f}s.")
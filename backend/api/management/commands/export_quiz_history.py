@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api import transfer
+from api.models import QuizHistory
+
+
+class Command(BaseCommand):
+    help = "Stream quiz history, with each quiz's questions and answers, to NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write, or - for stdout.")
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            help="Output format (default: from the file extension, else ndjson).")
+        parser.add_argument('--status', choices=[status for status, _ in QuizHistory.STATUS_CHOICES])
+        parser.add_argument('--domain', help="Only export quizzes in this domain.")
+        parser.add_argument('--user', help="Only export this username's quizzes.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Quizzes read per query.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        quizzes = QuizHistory.objects.all()
+        if options['status']:
+            quizzes = quizzes.filter(status=options['status'])
+        if options['domain']:
+            quizzes = quizzes.filter(domain__iexact=options['domain'])
+        if options['user']:
+            if not User.objects.filter(username=options['user']).exists():
+                raise CommandError(f"No user named {options['user']!r}")
+            quizzes = quizzes.filter(user__username=options['user'])
+
+        fmt = transfer.format_for(options['output'], options['format'])
+        started = time.perf_counter()
+        if options['output'] == '-':
+            written, report = transfer.export_history(quizzes, fmt, self.stdout, options['chunk_size']), self.stderr
+        else:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                written, report = transfer.export_history(quizzes, fmt, stream, options['chunk_size']), self.stdout
+        unit = 'rows' if fmt == 'csv' else 'quizzes'
+        report.write(f"Exported {written} {unit} in {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,53 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.instrumentation import percentile
+from api.models import GenerationLog
+
+
+class Command(BaseCommand):
+    help = "Summarise logged LLM generations (latency, tokens, outcomes) by domain and level."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help="Only include the last N days (0 = all).")
+        parser.add_argument('--domain', help="Only include this domain.")
+
+    def handle(self, *args, **options):
+        logs = GenerationLog.objects.all()
+        if options['days']:
+            logs = logs.filter(created_at__gte=timezone.now() - timedelta(days=options['days']))
+        if options['domain']:
+            logs = logs.filter(domain__iexact=options['domain'])
+
+        groups = defaultdict(list)
+        rows = logs.values_list(
+            'domain', 'level', 'wall_ms', 'outcome', 'requested', 'returned',
+            'input_tokens', 'output_tokens', 'truncated', 'schema_failures',
+        )
+        for domain, level, *values in rows.iterator(chunk_size=5000):
+            groups[(domain.lower(), level)].append(values)
+
+        if not groups:
+            self.stdout.write("No generations logged.")
+            return
+
+        header = (f"{'domain':<24} {'level':<7} {'calls':>6} {'ok%':>6} {'p50ms':>8} {'p99ms':>8} "
+                  f"{'tok_in':>8} {'tok_out':>8} {'ret/req':>8} {'trunc':>6} {'schema':>6}")
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for (domain, level), values in sorted(groups.items()):
+            latencies = sorted(v[0] for v in values)
+            calls = len(values)
+            ok = sum(1 for v in values if v[1] == 'ok')
+            requested = sum(v[2] for v in values)
+            returned = sum(v[3] for v in values)
+            self.stdout.write(
+                f"{domain[:24]:<24} {level:<7} {calls:>6} {ok / calls * 100:>6.1f} "
+                f"{percentile(latencies, 50):>8.0f} {percentile(latencies, 99):>8.0f} "
+                f"{sum(v[4] for v in values) / calls:>8.0f} {sum(v[5] for v in values) / calls:>8.0f} "
+                f"{returned / requested if requested else 0:>8.2f} "
+                f"{sum(1 for v in values if v[6]):>6} {sum(v[7] for v in values):>6}"
+            )
@@ -0,0 +1,44 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import transfer
+
+
+class Command(BaseCommand):
+    help = "Bulk-import question sets (NDJSON or CSV, as export_question_bank writes them) into the question bank."
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File to read, or - for stdin.")
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            help="Input format (default: from the file extension, else ndjson).")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Questions inserted per transaction.")
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help="Stop after this many invalid questions (earlier batches are kept).")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        fmt = transfer.format_for(options['input'], options['format'])
+        read = transfer.read_csv if fmt == 'csv' else transfer.read_ndjson
+
+        started = time.perf_counter()
+        try:
+            if options['input'] == '-':
+                result = transfer.import_questions(read(sys.stdin), options['batch_size'], options['max_errors'])
+            else:
+                with open(options['input'], newline='', encoding='utf-8') as stream:
+                    result = transfer.import_questions(read(stream), options['batch_size'], options['max_errors'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except transfer.InvalidRecord as e:
+            raise CommandError(f"Too many invalid questions; stopped at {e}")
+        elapsed = time.perf_counter() - started
+
+        for error in result.errors:
+            self.stderr.write(f"Skipped {error}")
+        self.stdout.write(
+            f"Read {result.read} questions in {elapsed:.1f}s ({result.read / max(elapsed, 1e-9):.0f}/s): "
+            f"added {result.added}, already in the bank {result.skipped}, invalid {len(result.errors)}."
+        )
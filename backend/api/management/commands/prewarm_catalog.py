@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import prewarm
+from api.resilience import RetryPolicy
+
+
+class Command(BaseCommand):
+    help = "Fill the question bank for every topic in a catalog file, generating in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', help="JSON catalog of domains, sub_domains and levels.")
+        parser.add_argument('--questions', type=int,
+                            default=settings.QUESTION_BANK_LOW_WATER_MARK + settings.QUESTION_BANK_REFILL_BATCH,
+                            help="Questions each topic's pool should hold.")
+        parser.add_argument('--workers', type=int, default=8, help="Topics generated at once.")
+        parser.add_argument('--batch-size', type=int, default=settings.QUESTION_BANK_REFILL_BATCH,
+                            help="Questions requested per generation.")
+        parser.add_argument('--rate', type=float, default=60,
+                            help="Provider requests per minute across all workers (0 = unlimited).")
+        parser.add_argument('--burst', type=int, default=5, help="Requests that may go out back to back.")
+        parser.add_argument('--attempts', type=int, default=3, help="Tries per generation before a topic fails.")
+        parser.add_argument('--checkpoint', help="File of finished topics (default: <catalog>.done).")
+        parser.add_argument('--report-every', type=float, default=10, help="Seconds between progress lines.")
+        parser.add_argument('--dry-run', action='store_true', help="List the topics still to do and exit.")
+
+    def handle(self, *args, **options):
+        for name in ('questions', 'workers', 'batch_size', 'attempts'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1")
+        try:
+            with open(options['catalog'], encoding='utf-8') as f:
+                topics = prewarm.read_catalog(f)
+        except (OSError, prewarm.CatalogError) as e:
+            raise CommandError(str(e))
+        checkpoint = prewarm.Checkpoint(options['checkpoint'] or f"{options['catalog']}.done")
+
+        if options['dry_run']:
+            pending = [topic for topic in topics if topic not in checkpoint]
+            for topic in pending:
+                self.stdout.write(topic.key)
+            self.stdout.write(f"{len(pending)} of {len(topics)} topics to prewarm.")
+            return
+
+        limiter = prewarm.RateLimiter(options['rate'], options['burst']) if options['rate'] > 0 else None
+        retry = RetryPolicy(options['attempts'], settings.LLM_RETRY_BASE_DELAY, settings.LLM_RETRY_MAX_DELAY)
+        try:
+            stats = prewarm.prewarm(
+                topics, options['questions'], options['workers'], options['batch_size'], checkpoint, limiter,
+                retry, report=lambda stats: self.stdout.write(stats.summary()), report_every=options['report_every'],
+            )
+        except KeyboardInterrupt:
+            raise CommandError(f"Interrupted; finished topics are in {checkpoint.path}, rerun to resume.")
+
+        for key, error in sorted(stats.failures.items()):
+            self.stderr.write(f"Failed {key}: {error}")
+        self.stdout.write(f"Done: {stats.summary()}")
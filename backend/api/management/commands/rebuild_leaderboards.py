@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-domain and global leaderboards from completed quiz history."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = leaderboard.rebuild()
+        self.stdout.write(f"Wrote {written} leaderboard entries in {time.perf_counter() - started:.1f}s.")
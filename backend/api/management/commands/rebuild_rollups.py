@@ -0,0 +1,29 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api import rollups, scoring
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user topic performance rollups from completed quiz history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only rebuild this username's rollup.")
+        parser.add_argument('--mode', choices=scoring.MODES, help="Scoring mode (default: SCORING_MODE).")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Quizzes read per batch.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']!r}")
+
+        started = time.perf_counter()
+        written = rollups.rebuild(user, options['mode'], options['chunk_size'])
+        self.stdout.write(f"Wrote {written} rollup rows in {time.perf_counter() - started:.1f}s.")
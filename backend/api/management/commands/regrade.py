@@ -0,0 +1,52 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import scoring
+from api.models import QuizHistory
+
+
+class Command(BaseCommand):
+    help = "Rescore completed quizzes from their stored answers and the current answer keys."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=scoring.MODES, help="Scoring mode (default: SCORING_MODE).")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Quizzes rescored per batch.")
+        parser.add_argument('--domain', help="Only rescore quizzes in this domain.")
+        parser.add_argument('--dry-run', action='store_true', help="Count changes without saving them.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        quizzes = QuizHistory.objects.filter(status='completed')
+        if options['domain']:
+            quizzes = quizzes.filter(domain__iexact=options['domain'])
+
+        keys = scoring.AnswerKeys()
+        seen = changed = 0
+        started = time.perf_counter()
+        rows = quizzes.only('id', 'score').order_by('id').iterator(chunk_size=options['chunk_size'])
+        for batch in scoring.chunked(rows, options['chunk_size']):
+            changed += self.regrade(batch, keys, options)
+            seen += len(batch)
+
+        verb = "would change" if options['dry_run'] else "changed"
+        self.stdout.write(f"Rescored {seen} quizzes in {time.perf_counter() - started:.1f}s; {verb} {changed}.")
+
+    def regrade(self, quizzes, keys, options):
+        ids = np.array([quiz.id for quiz in quizzes], dtype=np.int64)
+        quiz_ids, _, answer_keys, selected = keys.answers(ids.tolist())
+        # ids come back sorted, so searchsorted maps each answer to its quiz's position.
+        scores = scoring.score_many(np.searchsorted(ids, quiz_ids), answer_keys, selected, len(quizzes), options['mode'])
+
+        changed = []
+        for quiz, score in zip(quizzes, scores):
+            if quiz.score != score:
+                quiz.score = score
+                changed.append(quiz)
+        if changed and not options['dry_run']:
+            with transaction.atomic():
+                QuizHistory.objects.bulk_update(changed, ['score'], batch_size=500)
+        return len(changed)
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_quizhistory_user_answers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=100)),
+                ('sub_domain', models.CharField(max_length=100)),
+                ('level', models.CharField(choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=20)),
+                ('sub_topic', models.CharField(blank=True, default='', max_length=200)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('question', models.JSONField()),
+                ('times_served', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['domain', 'sub_domain', 'level', 'sub_topic'], name='bank_topic_idx')],
+                'constraints': [models.UniqueConstraint(fields=('domain', 'sub_domain', 'level', 'fingerprint'), name='unique_bank_question_per_topic')],
+            },
+        ),
+    ]
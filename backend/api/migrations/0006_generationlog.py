@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('backend', models.CharField(max_length=50)),
+                ('model_name', models.CharField(max_length=100)),
+                ('domain', models.CharField(max_length=100)),
+                ('sub_domain', models.CharField(max_length=100)),
+                ('level', models.CharField(max_length=20)),
+                ('mode', models.CharField(max_length=20)),
+                ('requested', models.IntegerField()),
+                ('returned', models.IntegerField(default=0)),
+                ('shards', models.IntegerField(default=1)),
+                ('failed_shards', models.IntegerField(default=0)),
+                ('schema_failures', models.IntegerField(default=0)),
+                ('input_tokens', models.IntegerField(default=0)),
+                ('output_tokens', models.IntegerField(default=0)),
+                ('truncated', models.BooleanField(default=False)),
+                ('outcome', models.CharField(choices=[('ok', 'OK'), ('partial', 'Partial'), ('schema_error', 'Schema error'), ('error', 'Error')], default='ok', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('wall_ms', models.FloatField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['domain', 'level', 'created_at'], name='genlog_domain_level_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_generationlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('content', models.JSONField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizHistoryQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('item_id', models.IntegerField(blank=True, null=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='quiz_links', to='api.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_links', to='api.quizhistory')),
+            ],
+            options={
+                'ordering': ['position'],
+                'constraints': [models.UniqueConstraint(fields=('quiz', 'position'), name='unique_quiz_question_position')],
+            },
+        ),
+        migrations.AddField(
+            model_name='bankquestion',
+            name='question_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bank_entries', to='api.question'),
+        ),
+        # Nullable so that unapplying 0009 can re-add the columns to populated tables.
+        migrations.AlterField(
+            model_name='quizhistory',
+            name='questions',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='bankquestion',
+            name='question',
+            field=models.JSONField(null=True),
+        ),
+    ]
@@ -0,0 +1,110 @@
+import hashlib
+import json
+
+from django.db import migrations
+
+
+BATCH_SIZE = 500
+
+
+# Frozen copies of api.models.split_question / join_question / Question.fingerprint_for,
+# so this migration keeps working if those change.
+def split_question(question):
+    if isinstance(question, dict):
+        item_id = question.get('id')
+        if isinstance(item_id, int) and not isinstance(item_id, bool):
+            return {k: v for k, v in question.items() if k != 'id'}, item_id
+    return question, None
+
+
+def join_question(content, item_id):
+    if item_id is None or not isinstance(content, dict):
+        return content
+    return {'id': item_id, **content}
+
+
+def fingerprint_for(content):
+    payload = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def intern(Question, contents):
+    """Question ids for ``contents``, in order, creating rows as needed."""
+    fingerprints = [fingerprint_for(content) for content in contents]
+    unique = dict(zip(fingerprints, contents))
+    ids = dict(Question.objects.filter(fingerprint__in=list(unique)).values_list('fingerprint', 'id'))
+    missing = [Question(fingerprint=fp, content=content) for fp, content in unique.items() if fp not in ids]
+    if missing:
+        Question.objects.bulk_create(missing, ignore_conflicts=True)
+        ids.update(Question.objects.filter(
+            fingerprint__in=[row.fingerprint for row in missing]
+        ).values_list('fingerprint', 'id'))
+    return [ids[fp] for fp in fingerprints]
+
+
+def batches(queryset):
+    batch = []
+    for row in queryset.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def forwards(apps, schema_editor):
+    Question = apps.get_model('api', 'Question')
+    QuizHistory = apps.get_model('api', 'QuizHistory')
+    QuizHistoryQuestion = apps.get_model('api', 'QuizHistoryQuestion')
+    BankQuestion = apps.get_model('api', 'BankQuestion')
+
+    for quizzes in batches(QuizHistory.objects.only('pk', 'questions')):
+        parts = [
+            (quiz.pk, position, *split_question(question))
+            for quiz in quizzes
+            for position, question in enumerate(quiz.questions or [])
+        ]
+        ids = intern(Question, [content for _, _, content, _ in parts])
+        QuizHistoryQuestion.objects.bulk_create([
+            QuizHistoryQuestion(quiz_id=quiz_id, question_id=question_id, position=position, item_id=item_id)
+            for (quiz_id, position, _, item_id), question_id in zip(parts, ids)
+        ])
+
+    for rows in batches(BankQuestion.objects.only('pk', 'question')):
+        ids = intern(Question, [row.question for row in rows])
+        for row, question_id in zip(rows, ids):
+            row.question_ref_id = question_id
+        BankQuestion.objects.bulk_update(rows, ['question_ref'])
+
+
+def backwards(apps, schema_editor):
+    QuizHistory = apps.get_model('api', 'QuizHistory')
+    QuizHistoryQuestion = apps.get_model('api', 'QuizHistoryQuestion')
+    BankQuestion = apps.get_model('api', 'BankQuestion')
+
+    for quizzes in batches(QuizHistory.objects.only('pk')):
+        questions = {quiz.pk: [] for quiz in quizzes}
+        links = (QuizHistoryQuestion.objects.filter(quiz_id__in=list(questions))
+                 .select_related('question').order_by('quiz_id', 'position'))
+        for link in links:
+            questions[link.quiz_id].append(join_question(link.question.content, link.item_id))
+        for quiz in quizzes:
+            quiz.questions = questions[quiz.pk]
+        QuizHistory.objects.bulk_update(quizzes, ['questions'])
+
+    for rows in batches(BankQuestion.objects.select_related('question_ref')):
+        for row in rows:
+            row.question = row.question_ref.content
+        BankQuestion.objects.bulk_update(rows, ['question'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_question_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_backfill_questions'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='quizhistory',
+            name='questions',
+        ),
+        migrations.RemoveField(
+            model_name='bankquestion',
+            name='question',
+        ),
+        migrations.RenameField(
+            model_name='bankquestion',
+            old_name='question_ref',
+            new_name='question',
+        ),
+        migrations.AlterField(
+            model_name='bankquestion',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='bank_entries', to='api.question'),
+        ),
+    ]
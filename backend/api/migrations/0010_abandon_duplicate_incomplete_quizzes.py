@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def abandon_duplicates(apps, schema_editor):
+    """
+    Keep only the most recently updated incomplete quiz per user and topic,
+    so the unique constraint added in 0011 can be created.
+    """
+    QuizHistory = apps.get_model('api', 'QuizHistory')
+    duplicated = (
+        QuizHistory.objects.filter(status='incomplete')
+        .values('user_id', 'domain', 'sub_domain')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for group in duplicated.iterator():
+        ids = list(
+            QuizHistory.objects.filter(
+                status='incomplete',
+                user_id=group['user_id'],
+                domain=group['domain'],
+                sub_domain=group['sub_domain'],
+            ).order_by('-updated_at', '-id').values_list('id', flat=True)
+        )
+        QuizHistory.objects.filter(id__in=ids[1:]).update(status='abandoned')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_remove_inline_questions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quizhistory',
+            name='status',
+            field=models.CharField(choices=[('incomplete', 'Incomplete'), ('completed', 'Completed'), ('abandoned', 'Abandoned')], default='incomplete', max_length=20),
+        ),
+        # Not reversed: which quizzes were duplicates is not recorded.
+        migrations.RunPython(abandon_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_abandon_duplicate_incomplete_quizzes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='quizhistory',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='quizhistory',
+            index=models.Index(fields=['user', 'domain', 'sub_domain', 'status'], name='quiz_topic_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizhistory',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='quiz_user_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizhistory',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'incomplete')), fields=('user', 'domain', 'sub_domain'), name='one_incomplete_quiz_per_topic'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_quiz_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizhistoryquestion',
+            name='selected',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
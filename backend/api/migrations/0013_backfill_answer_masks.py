@@ -0,0 +1,84 @@
+from django.db import migrations
+
+
+BATCH_SIZE = 500
+
+
+# Frozen copies of api.models.answer_mask / selected_options, so this
+# migration keeps working if those change.
+def options_of(content):
+    return content.get('options', []) if isinstance(content, dict) else []
+
+
+def answer_mask(options, selected):
+    chosen = {str(a).strip().lower() for a in selected}
+    return sum(1 << i for i, option in enumerate(options) if str(option).strip().lower() in chosen)
+
+
+def selected_options(options, mask):
+    return [option for i, option in enumerate(options) if mask >> i & 1]
+
+
+def batches(queryset):
+    batch = []
+    for row in queryset.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def links_by_quiz(QuizHistoryQuestion, quiz_ids):
+    links = {quiz_id: [] for quiz_id in quiz_ids}
+    for link in (QuizHistoryQuestion.objects.filter(quiz_id__in=quiz_ids)
+                 .select_related('question').order_by('quiz_id', 'position')):
+        links[link.quiz_id].append(link)
+    return links
+
+
+def forwards(apps, schema_editor):
+    """Answers that match none of a question's options cannot be kept and are dropped."""
+    QuizHistory = apps.get_model('api', 'QuizHistory')
+    QuizHistoryQuestion = apps.get_model('api', 'QuizHistoryQuestion')
+
+    for quizzes in batches(QuizHistory.objects.only('pk', 'user_answers')):
+        links = links_by_quiz(QuizHistoryQuestion, [quiz.pk for quiz in quizzes])
+        changed = []
+        for quiz in quizzes:
+            for link, answer in zip(links[quiz.pk], quiz.user_answers or []):
+                if answer is None:
+                    continue
+                answer = answer if isinstance(answer, list) else [answer]
+                link.selected = answer_mask(options_of(link.question.content), answer)
+                changed.append(link)
+        QuizHistoryQuestion.objects.bulk_update(changed, ['selected'])
+
+
+def backwards(apps, schema_editor):
+    QuizHistory = apps.get_model('api', 'QuizHistory')
+    QuizHistoryQuestion = apps.get_model('api', 'QuizHistoryQuestion')
+
+    for quizzes in batches(QuizHistory.objects.only('pk')):
+        links = links_by_quiz(QuizHistoryQuestion, [quiz.pk for quiz in quizzes])
+        for quiz in quizzes:
+            answers = [
+                None if link.selected is None else selected_options(options_of(link.question.content), link.selected)
+                for link in links[quiz.pk]
+            ]
+            while answers and answers[-1] is None:
+                answers.pop()
+            quiz.user_answers = [answer or [] for answer in answers]
+        QuizHistory.objects.bulk_update(quizzes, ['user_answers'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_quizhistoryquestion_selected'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_backfill_answer_masks'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='quizhistory',
+            name='user_answers',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_remove_quizhistory_user_answers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=100)),
+                ('sub_domain', models.CharField(max_length=100)),
+                ('sub_topic', models.CharField(blank=True, default='', max_length=200)),
+                ('day', models.DateField()),
+                ('questions', models.PositiveIntegerField(default=0)),
+                ('answered', models.PositiveIntegerField(default=0)),
+                ('credit', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_performance', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'domain', 'sub_domain', 'sub_topic', 'day'), name='unique_topic_performance')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_topic_performance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(blank=True, max_length=100)),
+                ('quizzes', models.PositiveIntegerField(default=0)),
+                ('total_score', models.FloatField(default=0)),
+                ('best_score', models.FloatField(default=0)),
+                ('average_score', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['domain', '-best_score', 'user'], name='leaderboard_best_idx'), models.Index(fields=['domain', '-average_score', 'user'], name='leaderboard_average_idx')],
+                'constraints': [models.UniqueConstraint(fields=('domain', 'user'), name='unique_leaderboard_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,107 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+BATCH_SIZE = 500
+
+
+# Frozen copies of api.question_bank.normalize_key, api.scoring.answer_key /
+# credit and the aggregation in api.rollups.rebuild, so this migration keeps
+# working if those change.
+def normalize_key(value):
+    return " ".join(str(value).split()).lower()
+
+
+def answer_mask(options, selected):
+    chosen = {str(a).strip().lower() for a in selected}
+    return sum(1 << i for i, option in enumerate(options) if str(option).strip().lower() in chosen)
+
+
+def answer_key(content):
+    if not isinstance(content, dict):
+        return 0
+    return answer_mask(content.get('options', []), content.get('correct_answers', []))
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def credit(key, selected, mode):
+    if key == 0:
+        return 0.0
+    if mode == 'exact':
+        return float(key == selected)
+    right = popcount(key & selected)
+    if mode == 'partial':
+        return max(right - popcount(selected & ~key), 0) / max(popcount(key), 1)
+    if mode == 'jaccard':
+        return right / max(popcount(key | selected), 1)
+    raise ValueError(f"Unknown scoring mode {mode!r}")
+
+
+def batches(queryset):
+    batch = []
+    for row in queryset.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def forwards(apps, schema_editor):
+    """Roll up every quiz completed before the rollup existed, as ``manage.py rebuild_rollups`` would."""
+    Question = apps.get_model('api', 'Question')
+    QuizHistory = apps.get_model('api', 'QuizHistory')
+    QuizHistoryQuestion = apps.get_model('api', 'QuizHistoryQuestion')
+    TopicPerformance = apps.get_model('api', 'TopicPerformance')
+
+    mode = settings.SCORING_MODE
+    keys, sub_topics = {}, {}
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    completed = QuizHistory.objects.filter(status='completed').only('pk', 'user_id', 'domain', 'sub_domain', 'updated_at')
+    for quizzes in batches(completed):
+        groups = {
+            quiz.pk: (quiz.user_id, normalize_key(quiz.domain), normalize_key(quiz.sub_domain),
+                      timezone.localdate(quiz.updated_at))
+            for quiz in quizzes
+        }
+        links = list(QuizHistoryQuestion.objects.filter(quiz_id__in=list(groups))
+                     .values_list('quiz_id', 'question_id', 'selected').order_by())
+        missing = {question_id for _, question_id, _ in links} - keys.keys()
+        for question_id, content in Question.objects.filter(id__in=missing).values_list('id', 'content'):
+            keys[question_id] = answer_key(content)
+            sub_topics[question_id] = content.get('sub_topic', '') if isinstance(content, dict) else ''
+        for quiz_id, question_id, selected in links:
+            user_id, domain, sub_domain, day = groups[quiz_id]
+            total = totals[(user_id, domain, sub_domain, normalize_key(sub_topics[question_id])[:200], day)]
+            total[0] += 1
+            total[1] += bool(selected)
+            total[2] += credit(keys[question_id], selected or 0, mode)
+
+    TopicPerformance.objects.all().delete()
+    TopicPerformance.objects.bulk_create([
+        TopicPerformance(user_id=user_id, domain=domain, sub_domain=sub_domain, sub_topic=sub_topic, day=day,
+                         questions=count, answered=answered, credit=earned)
+        for (user_id, domain, sub_domain, sub_topic, day), (count, answered, earned) in totals.items()
+    ], batch_size=1000)
+
+
+def backwards(apps, schema_editor):
+    apps.get_model('api', 'TopicPerformance').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_generation_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
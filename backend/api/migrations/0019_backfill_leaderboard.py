@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, Max, Sum
+
+
+# Frozen copies of api.question_bank.normalize_key, LeaderboardEntry.GLOBAL and
+# the aggregation in api.leaderboard.rebuild, so this migration keeps working
+# if those change.
+GLOBAL = ''
+
+
+def normalize_key(value):
+    return " ".join(str(value).split()).lower()
+
+
+def forwards(apps, schema_editor):
+    """Rank every quiz completed before the boards existed, as ``manage.py rebuild_leaderboards`` would."""
+    QuizHistory = apps.get_model('api', 'QuizHistory')
+    LeaderboardEntry = apps.get_model('api', 'LeaderboardEntry')
+
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    grouped = (QuizHistory.objects.filter(status='completed', score__isnull=False)
+               .values('user_id', 'domain').order_by()
+               .annotate(quizzes=Count('id'), total=Sum('score'), best=Max('score')))
+    for row in grouped.iterator():
+        for domain in (normalize_key(row['domain']), GLOBAL):
+            total = totals[(row['user_id'], domain)]
+            total[0] += row['quizzes']
+            total[1] += row['total']
+            total[2] = max(total[2], row['best'])
+
+    LeaderboardEntry.objects.all().delete()
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(user_id=user_id, domain=domain, quizzes=quizzes, total_score=total,
+                         best_score=best, average_score=total / quizzes)
+        for (user_id, domain), (quizzes, total, best) in totals.items()
+    ], batch_size=1000)
+
+
+def backwards(apps, schema_editor):
+    apps.get_model('api', 'LeaderboardEntry').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_backfill_topic_performance'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -1,23 +1,479 @@
-from django.db import models
+import hashlib
+import json
+import uuid
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+
+def split_question(question):
+    """
+    Split a quiz question into its shared content and its per-quiz ``id``.
+
+    Returns:
+        tuple: (content, item_id). ``item_id`` is None when the question has
+        no integer id, in which case any ``id`` stays part of the content.
+    """
+    if isinstance(question, dict):
+        item_id = question.get('id')
+        if isinstance(item_id, int) and not isinstance(item_id, bool):
+            return {k: v for k, v in question.items() if k != 'id'}, item_id
+    return question, None
+
+
+def join_question(content, item_id):
+    """Inverse of ``split_question``."""
+    if item_id is None or not isinstance(content, dict):
+        return content
+    return {'id': item_id, **content}
+
+
+def _options(content):
+    return content.get('options', []) if isinstance(content, dict) else []
+
+
+def answer_mask(options, selected) -> int:
+    """Bitmask of the ``options`` named in ``selected``: bit i is set when options[i] was chosen."""
+    chosen = {str(a).strip().lower() for a in selected}
+    return sum(1 << i for i, option in enumerate(options) if str(option).strip().lower() in chosen)
+
+
+def selected_options(options, mask: int):
+    """Inverse of ``answer_mask``."""
+    return [option for i, option in enumerate(options) if mask >> i & 1]
+
+
+def decode_answers(contents, masks):
+    """
+    ``user_answers`` from each question's content and mask: unanswered
+    questions read as ``[]`` and trailing ones are left off.
+    """
+    answers = [None if mask is None else selected_options(_options(content), mask)
+               for content, mask in zip(contents, masks)]
+    while answers and answers[-1] is None:
+        answers.pop()
+    return [answer or [] for answer in answers]
+
+
+class QuestionManager(models.Manager):
+    def get_or_create_many(self, contents):
+        """
+        Stored rows for ``contents``, in order, inserting those not seen
+        before. Equal contents map to the same row.
+        """
+        fingerprints = [Question.fingerprint_for(content) for content in contents]
+        unique = dict(zip(fingerprints, contents))
+        rows = self.in_bulk(list(unique), field_name='fingerprint')
+        missing = [self.model(fingerprint=fp, content=content) for fp, content in unique.items() if fp not in rows]
+        if missing:
+            self.bulk_create(missing, ignore_conflicts=True)
+            rows.update(self.in_bulk([row.fingerprint for row in missing], field_name='fingerprint'))
+        return [rows[fp] for fp in fingerprints]
+
+    def ids_for_many(self, contents):
+        """
+        Like ``get_or_create_many``, but returns only the rows' ids, without
+        loading their content back; for bulk inserts that just need the keys.
+        """
+        fingerprints = [Question.fingerprint_for(content) for content in contents]
+        unique = dict(zip(fingerprints, contents))
+        ids = dict(self.filter(fingerprint__in=list(unique)).values_list('fingerprint', 'id'))
+        missing = [self.model(fingerprint=fp, content=content) for fp, content in unique.items() if fp not in ids]
+        if missing:
+            self.bulk_create(missing, ignore_conflicts=True)
+            ids.update(self.filter(fingerprint__in=[row.fingerprint for row in missing]).values_list('fingerprint', 'id'))
+        return [ids[fp] for fp in fingerprints]
+
+
+class Question(models.Model):
+    """
+    A distinct question (text, options, answers, explanation, sub_topic),
+    stored once however many quizzes and pools use it.
+    """
+    fingerprint = models.CharField(max_length=64, unique=True)
+    content = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = QuestionManager()
+
+    @staticmethod
+    def fingerprint_for(content) -> str:
+        """SHA-256 of the canonical JSON encoding of ``content``."""
+        payload = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def __str__(self):
+        text = self.content.get('question', '') if isinstance(self.content, dict) else self.content
+        return str(text)[:80]
+
+
+class QuizHistoryQuerySet(models.QuerySet):
+    def with_questions(self):
+        """Prefetch each quiz's questions in two queries instead of one per quiz."""
+        return self.prefetch_related(models.Prefetch(
+            'question_links',
+            queryset=QuizHistoryQuestion.objects.select_related('question'),
+        ))
+
+    def resumable(self):
+        """
+        Incomplete quizzes that have questions. One whose generation stopped
+        before producing any is not resumed; ``abandon_empty`` retires it.
+        """
+        return self.filter(models.Exists(QuizHistoryQuestion.objects.filter(quiz=models.OuterRef('pk'))),
+                           status='incomplete')
+
+    def abandon_empty(self) -> int:
+        """Mark incomplete quizzes without questions abandoned, freeing their topics for new quizzes."""
+        return (self.filter(status='incomplete')
+                .exclude(models.Exists(QuizHistoryQuestion.objects.filter(quiz=models.OuterRef('pk'))))
+                .update(status='abandoned'))
+
+
 class QuizHistory(models.Model):
     STATUS_CHOICES = [
         ('incomplete', 'Incomplete'),
         ('completed', 'Completed'),
+        # Superseded by a newer incomplete quiz on the same topic.
+        ('abandoned', 'Abandoned'),
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     domain = models.CharField(max_length=100)
     sub_domain = models.CharField(max_length=100)
-    questions = models.JSONField()
-    user_answers = models.JSONField(default=list, blank=True)
     current_question_index = models.IntegerField(default=0)
     score = models.FloatField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='incomplete')
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = QuizHistoryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            # Resuming relies on there being at most one incomplete quiz per topic.
+            models.UniqueConstraint(
+                fields=['user', 'domain', 'sub_domain'],
+                condition=models.Q(status='incomplete'),
+                name='one_incomplete_quiz_per_topic',
+            ),
+        ]
+        indexes = [
+            # generate_quiz / resume_quiz: the incomplete quiz for a topic.
+            models.Index(fields=['user', 'domain', 'sub_domain', 'status'], name='quiz_topic_status_idx'),
+            # get_quiz_history: a user's quizzes, newest first.
+            models.Index(fields=['user', '-created_at', '-id'], name='quiz_user_created_idx'),
+        ]
+
+    _question_list = None
+    _questions_changed = False
+    _answer_list = None
+    _answers_changed = False
+    _link_list = None
+
+    def _links(self):
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'question_links' in prefetched:
+            return prefetched['question_links']
+        if self._link_list is None:
+            self._link_list = list(self.question_links.select_related('question'))
+        return self._link_list
+
+    def _forget_links(self):
+        getattr(self, '_prefetched_objects_cache', {}).pop('question_links', None)
+        self._link_list = None
+
+    @property
+    def questions(self):
+        """
+        The quiz's questions as a list of dicts, in order.
+
+        Stored as ``Question`` rows joined through ``QuizHistoryQuestion``;
+        assigning a new list replaces them when the quiz is next saved.
+        """
+        if self._question_list is None:
+            if self.pk is None:
+                self._question_list = []
+            else:
+                self._question_list = [join_question(link.question.content, link.item_id) for link in self._links()]
+        return self._question_list
+
+    @questions.setter
+    def questions(self, value):
+        self._question_list = list(value)
+        self._questions_changed = True
+
+    @property
+    def user_answers(self):
+        """
+        The chosen options per question, as lists of option strings.
+
+        Stored as a bitmask on each ``QuizHistoryQuestion``; unanswered
+        questions read as ``[]`` and trailing ones are left off.
+        """
+        if self._answer_list is None:
+            links = [] if self.pk is None else self._links()
+            self._answer_list = decode_answers([link.question.content for link in links],
+                                               [link.selected for link in links])
+        return self._answer_list
+
+    @user_answers.setter
+    def user_answers(self, value):
+        self._answer_list = [
+            [] if answer is None else list(answer) if isinstance(answer, (list, tuple)) else [answer]
+            for answer in value or []
+        ]
+        self._answers_changed = True
+
+    def _answer_masks(self, contents):
+        answers = self._answer_list or []
+        return [
+            answer_mask(_options(content), answers[position]) if position < len(answers) else None
+            for position, content in enumerate(contents)
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        write_questions = self._questions_changed and (update_fields is None or 'questions' in update_fields)
+        write_answers = self._answers_changed and (update_fields is None or 'user_answers' in update_fields)
+        if update_fields is not None:
+            kwargs['update_fields'] = [f for f in update_fields if f not in ('questions', 'user_answers')]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if write_questions:
+                self._write_questions()
+            elif write_answers:
+                self._write_answers()
+
+    def _write_questions(self):
+        parts = [split_question(question) for question in self._question_list]
+        contents = [content for content, _ in parts]
+        rows = Question.objects.get_or_create_many(contents)
+        masks = self._answer_masks(contents)
+        self.question_links.all().delete()
+        QuizHistoryQuestion.objects.bulk_create([
+            QuizHistoryQuestion(quiz=self, question=row, position=position, item_id=item_id, selected=mask)
+            for position, (row, (_, item_id), mask) in enumerate(zip(rows, parts, masks))
+        ])
+        self._forget_links()
+        self._questions_changed = False
+        self._answers_changed = False
+
+    def stage_answers(self):
+        """
+        Set each question link's mask from ``user_answers`` without saving.
+
+        Returns:
+            list: the ``QuizHistoryQuestion`` rows that changed, for ``bulk_update``.
+        """
+        links = self._links()
+        changed = []
+        for link, mask in zip(links, self._answer_masks([link.question.content for link in links])):
+            if link.selected != mask:
+                link.selected = mask
+                changed.append(link)
+        self._answers_changed = False
+        return changed
+
+    def _write_answers(self):
+        QuizHistoryQuestion.objects.bulk_update(self.stage_answers(), ['selected'])
+
+    def append_question(self, question) -> None:
+        """Add a question to the end of a saved quiz without rewriting the others."""
+        content, item_id = split_question(question)
+        [row] = Question.objects.get_or_create_many([content])
+        QuizHistoryQuestion.objects.create(quiz=self, question=row, position=len(self.questions), item_id=item_id)
+        self._question_list.append(question)
+        self._forget_links()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._question_list = None
+        self._questions_changed = False
+        self._answer_list = None
+        self._answers_changed = False
+        self._forget_links()
+
     def __str__(self):
         return f"{self.user.username} - {self.domain}/{self.sub_domain} ({self.status})"
+
+
+class QuizHistoryQuestion(models.Model):
+    """A question's place in a quiz."""
+    quiz = models.ForeignKey(QuizHistory, on_delete=models.CASCADE, related_name='question_links')
+    question = models.ForeignKey(Question, on_delete=models.PROTECT, related_name='quiz_links')
+    position = models.PositiveIntegerField()
+    # The question's "id" as the client sees it within this quiz.
+    item_id = models.IntegerField(null=True, blank=True)
+    # The chosen options as a bitmask (bit i = options[i]); null until answered.
+    selected = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'position'], name='unique_quiz_question_position'),
+        ]
+
+    def __str__(self):
+        return f"quiz {self.quiz_id} #{self.position}: question {self.question_id}"
+
+
+class BankQuestion(models.Model):
+    """A validated question held in the shared pool for a topic and level."""
+    LEVEL_CHOICES = [
+        ('easy', 'Easy'),
+        ('medium', 'Medium'),
+        ('hard', 'Hard'),
+    ]
+
+    domain = models.CharField(max_length=100)
+    sub_domain = models.CharField(max_length=100)
+    level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    sub_topic = models.CharField(max_length=200, blank=True, default='')
+    fingerprint = models.CharField(max_length=64)
+    question = models.ForeignKey(Question, on_delete=models.PROTECT, related_name='bank_entries')
+    times_served = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['domain', 'sub_domain', 'level', 'fingerprint'],
+                name='unique_bank_question_per_topic',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['domain', 'sub_domain', 'level', 'sub_topic'], name='bank_topic_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.domain}/{self.sub_domain}/{self.level} - {self.sub_topic}"
+
+
+class GenerationJob(models.Model):
+    """A quiz generation request processed on the background worker pool."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    domain = models.CharField(max_length=100)
+    sub_domain = models.CharField(max_length=100)
+    level = models.CharField(max_length=20)
+    number_of_questions = models.IntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    quiz = models.ForeignKey(QuizHistory, null=True, blank=True, on_delete=models.SET_NULL)
+    error = models.TextField(blank=True, default='')
+    # Runs started, and the last sign of life from the one in progress (see api.jobs).
+    attempts = models.PositiveSmallIntegerField(default=0)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.domain}/{self.sub_domain} job ({self.status})"
+
+
+class GenerationLog(models.Model):
+    """One instrumented LLM generation (see api.instrumentation)."""
+    OUTCOME_CHOICES = [
+        ('ok', 'OK'),
+        ('partial', 'Partial'),
+        ('schema_error', 'Schema error'),
+        ('error', 'Error'),
+    ]
+
+    backend = models.CharField(max_length=50)
+    model_name = models.CharField(max_length=100)
+    domain = models.CharField(max_length=100)
+    sub_domain = models.CharField(max_length=100)
+    level = models.CharField(max_length=20)
+    mode = models.CharField(max_length=20)
+    requested = models.IntegerField()
+    returned = models.IntegerField(default=0)
+    shards = models.IntegerField(default=1)
+    failed_shards = models.IntegerField(default=0)
+    schema_failures = models.IntegerField(default=0)
+    input_tokens = models.IntegerField(default=0)
+    output_tokens = models.IntegerField(default=0)
+    truncated = models.BooleanField(default=False)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, default='ok')
+    error = models.TextField(blank=True, default='')
+    wall_ms = models.FloatField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['domain', 'level', 'created_at'], name='genlog_domain_level_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.backend} {self.domain}/{self.sub_domain}/{self.level} ({self.outcome}, {self.wall_ms:.0f}ms)"
+
+
+class TopicPerformance(models.Model):
+    """
+    One user's results on one sub_topic of a topic on one day, summed over
+    their completed quizzes. Kept up to date as quizzes complete (see
+    ``api.rollups``) and rebuilt from history by ``manage.py rebuild_rollups``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_performance')
+    domain = models.CharField(max_length=100)
+    sub_domain = models.CharField(max_length=100)
+    sub_topic = models.CharField(max_length=200, blank=True, default='')
+    day = models.DateField()
+    questions = models.PositiveIntegerField(default=0)
+    answered = models.PositiveIntegerField(default=0)
+    # Summed per-question credit under the scoring mode in force when recorded.
+    credit = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves the stats endpoint's per-user lookups.
+            models.UniqueConstraint(
+                fields=['user', 'domain', 'sub_domain', 'sub_topic', 'day'],
+                name='unique_topic_performance',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.domain}/{self.sub_domain}/{self.sub_topic} on {self.day}"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    A user's standing on one leaderboard: a domain, or the global board
+    (``domain=''``). Updated as quizzes complete (see ``api.leaderboard``)
+    and rebuilt from history by ``manage.py rebuild_leaderboards``.
+    """
+    GLOBAL = ''
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    domain = models.CharField(max_length=100, blank=True)
+    quizzes = models.PositiveIntegerField(default=0)
+    total_score = models.FloatField(default=0)
+    best_score = models.FloatField(default=0)
+    average_score = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['domain', 'user'], name='unique_leaderboard_entry'),
+        ]
+        indexes = [
+            # Top-K reads and "my rank" counts walk these in score order.
+            models.Index(fields=['domain', '-best_score', 'user'], name='leaderboard_best_idx'),
+            models.Index(fields=['domain', '-average_score', 'user'], name='leaderboard_average_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.domain or 'global'}: best {self.best_score}, avg {self.average_score}"
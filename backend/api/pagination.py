@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class QuizHistoryPagination(CursorPagination):
+    """
+    Newest-first cursor pagination over a user's quizzes.
+
+    Pages are fetched by keyset on the ``quiz_user_created_idx`` index, so
+    deep pages cost the same as the first one.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
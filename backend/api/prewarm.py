@@ -0,0 +1,269 @@
+"""
+Prewarming the question bank from a topic catalog.
+
+A catalog lists the topics expected to be used (e.g. a semester's domains,
+sub_domains and levels). ``prewarm`` fills each topic's pool up to a target
+size on a bounded pool of worker threads, so the first user of a topic is
+served from the bank instead of waiting on a live generation.
+
+- Generations go through ``AIService.generate_quiz_questions``, with its
+  retries, hedging and circuit breaker, and results are validated and
+  de-duplicated by ``store_questions`` as for background refills.
+- Provider calls are paced by a shared ``TokenBucket``, charged one token
+  per shard a generation is split into, so concurrent prewarm runs (and
+  processes sharing the cache) stay within one request rate.
+- Finished topics are appended to a checkpoint file. A rerun skips them,
+  and topics that were cut short resume from whatever their pool already
+  holds.
+"""
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import IO, Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .admission import TokenBucket
+from .instrumentation import percentile
+from .models import BankQuestion
+from .question_bank import normalize_key, pool_size, store_questions, topic_index
+from .resilience import RetryPolicy
+from .services import get_ai_service
+
+LEVELS = [level for level, _ in BankQuestion.LEVEL_CHOICES]
+
+
+class CatalogError(ValueError):
+    """A catalog file that cannot be read."""
+
+
+class PrewarmError(RuntimeError):
+    """A topic whose generations kept failing."""
+
+
+@dataclass(frozen=True)
+class Topic:
+    domain: str
+    sub_domain: str
+    level: str
+
+    @property
+    def key(self) -> str:
+        return f"{normalize_key(self.domain)}/{normalize_key(self.sub_domain)}/{self.level}"
+
+
+def read_catalog(stream: IO[str]) -> List[Topic]:
+    """
+    Topics from a JSON catalog, in order and without repeats.
+
+    The catalog is a list (or ``{"topics": [...]}``) of entries, each with a
+    ``domain``, a ``sub_domain`` or list of ``sub_domains``, and optionally
+    the ``levels`` to prewarm (default: all)::
+
+        [{"domain": "Python", "sub_domains": ["Lists", "Classes"], "levels": ["easy"]}]
+
+    Raises:
+        CatalogError: if the file is not such a catalog.
+    """
+    try:
+        catalog = json.load(stream)
+    except ValueError as e:
+        raise CatalogError(f"catalog is not valid JSON: {e}")
+    entries = catalog.get('topics') if isinstance(catalog, dict) else catalog
+    if not isinstance(entries, list):
+        raise CatalogError("catalog must be a list of topic entries")
+
+    topics = {}
+    for n, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict) or not str(entry.get('domain', '')).strip():
+            raise CatalogError(f"entry {n}: a domain is required")
+        sub_domains = entry.get('sub_domains', [entry.get('sub_domain')])
+        levels = entry.get('levels', LEVELS)
+        if not isinstance(sub_domains, list) or not all(isinstance(s, str) and s.strip() for s in sub_domains):
+            raise CatalogError(f"entry {n}: sub_domains must be a list of names")
+        if not isinstance(levels, list) or not set(levels) <= set(LEVELS):
+            raise CatalogError(f"entry {n}: levels must be drawn from {', '.join(LEVELS)}")
+        for sub_domain in sub_domains:
+            for level in levels:
+                topic = Topic(entry['domain'].strip(), sub_domain.strip(), level)
+                topics.setdefault(topic.key, topic)
+    return list(topics.values())
+
+
+class Checkpoint:
+    """Keys of the topics already prewarmed, appended to a file as each one finishes."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        if path:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.done = {line.strip() for line in f if line.strip()}
+            except FileNotFoundError:
+                pass
+
+    def __contains__(self, topic: Topic) -> bool:
+        return topic.key in self.done
+
+    def add(self, topic: Topic) -> None:
+        with self._lock:
+            self.done.add(topic.key)
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(topic.key + '\n')
+
+
+class RateLimiter:
+    """Blocks callers so provider requests stay within ``per_minute``, with bursts of up to ``burst``."""
+
+    def __init__(self, per_minute: float, burst: int = 1, key: str = 'llm'):
+        self.bucket = TokenBucket(max(1, burst), per_minute / 60, prefix='quizgen:prewarm')
+        self.key = key
+
+    def wait(self, requests: int = 1) -> None:
+        while True:
+            delay = self.bucket.consume(self.key, requests)
+            if not delay:
+                return
+            time.sleep(delay)
+
+
+@dataclass
+class PrewarmStats:
+    total: int = 0
+    skipped: int = 0
+    done: int = 0
+    failed: int = 0
+    short: int = 0
+    added: int = 0
+    calls: int = 0
+    failures: dict = field(default_factory=dict)
+    seconds: List[float] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        elapsed = max(self.elapsed, 1e-9)
+        finished = self.done + self.failed
+        return (
+            f"{finished}/{self.total - self.skipped} topics ({self.skipped} already done), {self.failed} failed, "
+            f"{self.short} short of target; "
+            f"{self.added} questions from {self.calls} calls in {elapsed:.0f}s "
+            f"({finished / elapsed * 60:.1f} topics/min, {self.added / elapsed:.1f} questions/s, "
+            f"p50 {percentile(sorted(self.seconds), 50) or 0:.1f}s per topic)"
+        )
+
+
+def prewarm_topic(topic: Topic, target: int, batch_size: int, limiter: Optional[RateLimiter] = None,
+                  retry: Optional[RetryPolicy] = None) -> tuple:
+    """
+    Generate questions for ``topic`` until its pool holds ``target``.
+
+    Returns:
+        tuple: (questions added, generation calls made, whether the pool
+        reached ``target``; it may not if the provider runs out of new
+        questions).
+
+    Raises:
+        PrewarmError: if every attempt of a generation failed.
+    """
+    retry = retry or RetryPolicy(attempts=1)
+    added = calls = 0
+    filled = False
+    # Bounded so a provider that keeps returning duplicates cannot loop forever.
+    for _ in range(max(1, -(-target // batch_size)) * 2):
+        missing = target - pool_size(topic.domain, topic.sub_domain, topic.level)
+        if missing <= 0:
+            filled = True
+            break
+        count = min(batch_size, missing)
+        for attempt in range(retry.attempts):
+            if limiter is not None:
+                limiter.wait(-(-count // max(1, settings.LLM_SHARD_SIZE)))
+            calls += 1
+            result = get_ai_service().generate_quiz_questions(
+                domain=topic.domain,
+                sub_domain=topic.sub_domain,
+                number_of_questions=count,
+                level=topic.level,
+                exclude_index=topic_index(topic.domain, topic.sub_domain, topic.level),
+            )
+            if isinstance(result, list):
+                break
+            if attempt + 1 < retry.attempts:
+                time.sleep(retry.delay(attempt))
+        else:
+            raise PrewarmError(result.get('error', 'generation failed'))
+        if not result:
+            break
+        added += store_questions(topic.domain, topic.sub_domain, topic.level, result)
+    else:
+        filled = pool_size(topic.domain, topic.sub_domain, topic.level) >= target
+    return added, calls, filled
+
+
+def prewarm(topics: Iterable[Topic], target: int, workers: int, batch_size: int,
+            checkpoint: Optional[Checkpoint] = None, limiter: Optional[RateLimiter] = None,
+            retry: Optional[RetryPolicy] = None, report: Optional[Callable[[PrewarmStats], None]] = None,
+            report_every: float = 10.0) -> PrewarmStats:
+    """
+    Prewarm ``topics`` on ``workers`` threads, skipping those in
+    ``checkpoint`` and recording each one that finishes there.
+
+    ``report`` is called with the running stats about every ``report_every``
+    seconds. Failed topics are listed in ``stats.failures``; they and
+    topics left short of ``target`` stay out of the checkpoint, so a rerun
+    retries them.
+    """
+    checkpoint = checkpoint or Checkpoint(None)
+    topics = list(topics)
+    stats = PrewarmStats(total=len(topics))
+    pending = [topic for topic in topics if topic not in checkpoint]
+    stats.skipped = len(topics) - len(pending)
+
+    def run(topic):
+        started = time.perf_counter()
+        try:
+            return prewarm_topic(topic, target, batch_size, limiter, retry) + (time.perf_counter() - started,)
+        finally:
+            close_old_connections()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='quizgen-prewarm') as pool:
+        futures = {pool.submit(run, topic): topic for topic in pending}
+        last_report = time.perf_counter()
+        try:
+            while futures:
+                finished, _ = wait(futures, timeout=report_every, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    topic = futures.pop(future)
+                    try:
+                        added, calls, filled, seconds = future.result()
+                    except Exception as e:
+                        stats.failed += 1
+                        stats.failures[topic.key] = str(e)
+                        continue
+                    stats.done += 1
+                    stats.added += added
+                    stats.calls += calls
+                    stats.seconds.append(seconds)
+                    if filled:
+                        checkpoint.add(topic)
+                    else:
+                        stats.short += 1
+                if report and time.perf_counter() - last_report >= report_every:
+                    report(stats)
+                    last_report = time.perf_counter()
+        except BaseException:
+            # Interrupted: drop the queue, let running topics finish into the bank.
+            for future in futures:
+                future.cancel()
+            raise
+    return stats
@@ -0,0 +1,218 @@
+"""
+Write-behind buffering for quiz progress.
+
+With ``PROGRESS_WRITE_BEHIND`` on, progress saves (question index, full
+answer arrays, single answers) update one cache entry per quiz instead of
+the database. Rapid saves to the same quiz coalesce into that entry, and a
+background thread flushes every dirty quiz in one transaction each
+``PROGRESS_FLUSH_INTERVAL`` seconds, so the database lags by at most about
+that long. Completing a quiz flushes it first, and the process flushes what
+it holds at exit.
+
+Anything that shows progress back to the user must go through ``overlay``
+so it sees buffered saves that have not reached the database yet.
+
+Each process flushes the quizzes it buffered. With several worker
+processes, use a shared cache so every process sees the same entries.
+"""
+import atexit
+import logging
+import threading
+import time
+import uuid
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .concurrency import cache_lock
+from .models import QuizHistory, QuizHistoryQuestion, selected_options
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = 'quizgen:progress'
+# Long enough that an entry outlives any realistic gap between flushes.
+_ENTRY_TTL = 24 * 60 * 60
+_FLUSH_BATCH = 500
+
+_dirty = set()
+_dirty_lock = threading.Lock()
+_flusher = None
+
+
+def write_behind() -> bool:
+    return settings.PROGRESS_WRITE_BEHIND
+
+
+def _cache():
+    return caches[settings.PROGRESS_CACHE_ALIAS]
+
+
+def _key(quiz_id) -> str:
+    return f"{_PREFIX}:{quiz_id}"
+
+
+def _update(quiz_id: int, change) -> None:
+    cache = _cache()
+    key = _key(quiz_id)
+    with cache_lock(cache, f"{key}:lock"):
+        entry = cache.get(key) or {'index': None, 'answers': None, 'masks': {}}
+        change(entry)
+        entry['version'] = uuid.uuid4().hex
+        cache.set(key, entry, timeout=_ENTRY_TTL)
+    with _dirty_lock:
+        _dirty.add(quiz_id)
+    _start_flusher()
+
+
+def buffer_progress(quiz_id: int, current_question_index: Optional[int] = None,
+                    user_answers: Optional[list] = None) -> None:
+    """Buffer a ``save_quiz_progress``; a full answer array replaces any buffered single answers."""
+    def change(entry):
+        if current_question_index is not None:
+            entry['index'] = current_question_index
+        if user_answers is not None:
+            entry['answers'] = list(user_answers)
+            entry['masks'] = {}
+    _update(quiz_id, change)
+
+
+def buffer_answer(quiz_id: int, index: int, selected: int) -> None:
+    """Buffer one answer (an option bitmask, as in ``QuizHistoryQuestion.selected``)."""
+    def change(entry):
+        entry['masks'][index] = selected
+    _update(quiz_id, change)
+
+
+def _apply(quiz: QuizHistory, entry: dict) -> None:
+    if entry['index'] is not None:
+        quiz.current_question_index = entry['index']
+    if entry['answers'] is None and not entry['masks']:
+        return
+    answers = list(entry['answers'] if entry['answers'] is not None else quiz.user_answers)
+    questions = quiz.questions
+    for position, mask in entry['masks'].items():
+        if position < len(questions):
+            answers += [[]] * (position + 1 - len(answers))
+            answers[position] = selected_options(questions[position].get('options', []), mask)
+    quiz.user_answers = answers
+
+
+def overlay(quizzes: Iterable[QuizHistory]) -> None:
+    """Apply buffered progress to ``quizzes`` in memory; nothing is written."""
+    if not write_behind():
+        return
+    quizzes = list(quizzes)
+    entries = _cache().get_many([_key(quiz.id) for quiz in quizzes])
+    for quiz in quizzes:
+        entry = entries.get(_key(quiz.id))
+        if entry:
+            _apply(quiz, entry)
+
+
+def versions(quiz_ids: Iterable[int]) -> dict:
+    """The version of each quiz's buffered progress, by quiz id; quizzes with none are left out."""
+    if not write_behind():
+        return {}
+    quiz_ids = list(quiz_ids)
+    entries = _cache().get_many([_key(quiz_id) for quiz_id in quiz_ids])
+    return {quiz_id: entries[_key(quiz_id)]['version'] for quiz_id in quiz_ids if _key(quiz_id) in entries}
+
+
+async def aoverlay(quizzes: Iterable[QuizHistory]) -> None:
+    """``overlay`` for async views; the quizzes' questions must already be loaded."""
+    if not write_behind():
+        return
+    quizzes = list(quizzes)
+    entries = await _cache().aget_many([_key(quiz.id) for quiz in quizzes])
+    for quiz in quizzes:
+        entry = entries.get(_key(quiz.id))
+        if entry:
+            _apply(quiz, entry)
+
+
+def flush(quiz_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Write buffered progress to the database, by default for every quiz this
+    process has buffered.
+
+    Returns:
+        int: the number of quizzes written.
+    """
+    with _dirty_lock:
+        ids = sorted(_dirty if quiz_ids is None else set(quiz_ids))
+    written = 0
+    for start in range(0, len(ids), _FLUSH_BATCH):
+        written += _flush_batch(ids[start:start + _FLUSH_BATCH])
+    return written
+
+
+def _flush_batch(ids: List[int]) -> int:
+    cache = _cache()
+    entries = cache.get_many([_key(quiz_id) for quiz_id in ids])
+    pending = {quiz_id: entries[_key(quiz_id)] for quiz_id in ids if _key(quiz_id) in entries}
+    if not pending:
+        with _dirty_lock:
+            _dirty.difference_update(ids)
+        return 0
+
+    quizzes = list(QuizHistory.objects.with_questions().filter(id__in=list(pending)))
+    links = []
+    now = timezone.now()
+    for quiz in quizzes:
+        _apply(quiz, pending[quiz.id])
+        links += quiz.stage_answers()
+        quiz.updated_at = now
+    with transaction.atomic():
+        QuizHistory.objects.bulk_update(quizzes, ['current_question_index', 'updated_at'])
+        QuizHistoryQuestion.objects.bulk_update(links, ['selected'])
+
+    done = set(ids) - set(pending)
+    for quiz_id, entry in pending.items():
+        key = _key(quiz_id)
+        # Keep entries that took another save while this flush ran.
+        with cache_lock(cache, f"{key}:lock"):
+            current = cache.get(key)
+            if current is None or current['version'] == entry['version']:
+                cache.delete(key)
+                done.add(quiz_id)
+    with _dirty_lock:
+        _dirty.difference_update(done)
+    return len(quizzes)
+
+
+def pending_count() -> int:
+    """Quizzes this process has buffered and not yet flushed."""
+    with _dirty_lock:
+        return len(_dirty)
+
+
+def _flush_forever() -> None:
+    while True:
+        time.sleep(settings.PROGRESS_FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.exception("Could not flush buffered quiz progress")
+        finally:
+            close_old_connections()
+
+
+def _flush_at_exit() -> None:
+    try:
+        flush()
+    except Exception:
+        logger.exception("Could not flush buffered quiz progress at exit")
+
+
+def _start_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _dirty_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_forever, name='quizgen-progress-flush', daemon=True)
+            _flusher.start()
+            atexit.register(_flush_at_exit)
@@ -0,0 +1,378 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Iterator, List
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+
+from .concurrency import SingleFlight, submit_background
+from .dedup import NearDuplicateIndex
+from .models import BankQuestion, Question
+from .services import get_ai_service
+
+
+_refills_in_flight = set()
+_refills_lock = threading.Lock()
+
+# One near-duplicate index per pool, built from the database on first use and
+# updated as questions are stored.
+_topic_indexes = {}
+_topic_indexes_lock = threading.Lock()
+
+# Identical concurrent shortfall generations (e.g. a whole class starting the
+# same quiz at once) share a single LLM call.
+_generation_flight = SingleFlight()
+
+
+def _generation_key(domain: str, sub_domain: str, level: str, number_of_questions: int) -> tuple:
+    return (normalize_key(domain), normalize_key(sub_domain), level, number_of_questions)
+
+
+def generate_coalesced(domain: str, sub_domain: str, level: str, number_of_questions: int):
+    """``AIService.generate_quiz_questions``, shared between identical concurrent requests."""
+    return _generation_flight.do(
+        _generation_key(domain, sub_domain, level, number_of_questions),
+        lambda: get_ai_service().generate_quiz_questions(
+            domain=domain,
+            sub_domain=sub_domain,
+            number_of_questions=number_of_questions,
+            level=level,
+        ),
+    )
+
+
+async def agenerate_coalesced(domain: str, sub_domain: str, level: str, number_of_questions: int):
+    return await _generation_flight.ado(
+        _generation_key(domain, sub_domain, level, number_of_questions),
+        lambda: get_ai_service().agenerate_quiz_questions(
+            domain=domain,
+            sub_domain=sub_domain,
+            number_of_questions=number_of_questions,
+            level=level,
+        ),
+    )
+
+
+def normalize_key(value: str) -> str:
+    """Collapse whitespace and case so "Python " and "python" share a pool."""
+    return " ".join(str(value).split()).lower()
+
+
+def question_fingerprint(question: dict) -> str:
+    """Stable content hash of a question's text and options."""
+    text = normalize_key(question.get('question', ''))
+    options = sorted(normalize_key(o) for o in question.get('options', []))
+    payload = "\x1f".join([text, *options])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SeenQuestions:
+    """
+    Questions a user has already been given for a topic.
+
+    Membership covers exact repeats (by fingerprint) and reworded ones (via a
+    near-duplicate index). Adding a question marks it as taken for the rest
+    of the quiz being assembled.
+    """
+
+    def __init__(self, questions: Iterable[dict] = ()):
+        self.fingerprints = set()
+        self.index = NearDuplicateIndex()
+        for question in questions:
+            self.add(question)
+
+    def add(self, question: dict) -> None:
+        self.fingerprints.add(question_fingerprint(question))
+        self.index.add(question)
+
+    def __contains__(self, question: dict) -> bool:
+        return (question_fingerprint(question) in self.fingerprints
+                or self.index.contains_near_duplicate(question))
+
+
+def seen_questions(user, domain: str, sub_domain: str) -> SeenQuestions:
+    """Every question the user has already been given for this topic."""
+    contents = Question.objects.filter(
+        quiz_links__quiz__user=user,
+        quiz_links__quiz__domain__iexact=domain.strip(),
+        quiz_links__quiz__sub_domain__iexact=sub_domain.strip(),
+    ).distinct().values_list('content', flat=True)
+    return SeenQuestions(content for content in contents if isinstance(content, dict))
+
+
+def topic_index(domain: str, sub_domain: str, level: str) -> NearDuplicateIndex:
+    """Near-duplicate index over the pool for a topic and level."""
+    key = (normalize_key(domain), normalize_key(sub_domain), level)
+    with _topic_indexes_lock:
+        index = _topic_indexes.get(key)
+        if index is None:
+            index = _topic_indexes[key] = NearDuplicateIndex()
+            rows = BankQuestion.objects.filter(
+                domain=key[0], sub_domain=key[1], level=level
+            ).values_list('fingerprint', 'question__content')
+            for fingerprint, question in rows.iterator(chunk_size=2000):
+                index.add(question, key=fingerprint)
+    return index
+
+
+def pool_size(domain: str, sub_domain: str, level: str) -> int:
+    return BankQuestion.objects.filter(
+        domain=normalize_key(domain),
+        sub_domain=normalize_key(sub_domain),
+        level=level,
+    ).count()
+
+
+def reset_topic_indexes() -> None:
+    """Forget the cached pool indexes; they are rebuilt from the database on next use."""
+    with _topic_indexes_lock:
+        _topic_indexes.clear()
+
+
+def store_questions(domain: str, sub_domain: str, level: str, questions: Iterable[dict]) -> int:
+    """
+    Add validated questions to the pool, skipping exact and near-duplicates
+    of ones it already holds.
+
+    Returns:
+        int: Number of questions offered to the pool.
+    """
+    index = topic_index(domain, sub_domain, level)
+    payloads = {}
+    for question in questions:
+        payload = {k: v for k, v in question.items() if k != 'id'}
+        fingerprint = question_fingerprint(payload)
+        if fingerprint in payloads or not index.add_if_new(payload, key=fingerprint):
+            continue
+        payloads[fingerprint] = payload
+
+    contents = Question.objects.get_or_create_many(list(payloads.values()))
+    BankQuestion.objects.bulk_create([
+        BankQuestion(
+            domain=normalize_key(domain),
+            sub_domain=normalize_key(sub_domain),
+            level=level,
+            sub_topic=normalize_key(payload.get('sub_topic', ''))[:200],
+            fingerprint=fingerprint,
+            question=content,
+        )
+        for (fingerprint, payload), content in zip(payloads.items(), contents)
+    ], ignore_conflicts=True)
+    return len(payloads)
+
+
+def draw_questions(domain: str, sub_domain: str, level: str, count: int, seen: SeenQuestions) -> List[dict]:
+    """
+    Take up to ``count`` unseen questions from the pool and mark them as seen.
+
+    Least-served questions are preferred, and picks rotate across sub_topics
+    so a quiz is not dominated by a single concept.
+    """
+    candidates = (
+        BankQuestion.objects.filter(
+            domain=normalize_key(domain),
+            sub_domain=normalize_key(sub_domain),
+            level=level,
+        )
+        .exclude(fingerprint__in=seen.fingerprints)
+        .order_by('times_served', 'id')
+        .values_list('id', 'sub_topic', 'question__content')[:count * 4]
+    )
+
+    by_sub_topic = OrderedDict()
+    for row_id, sub_topic, question in candidates:
+        if question in seen:
+            continue
+        by_sub_topic.setdefault(sub_topic, []).append((row_id, question))
+
+    chosen = []
+    while len(chosen) < count and by_sub_topic:
+        for sub_topic in list(by_sub_topic):
+            rows = by_sub_topic[sub_topic]
+            row_id, question = rows.pop(0)
+            if question not in seen:
+                seen.add(question)
+                chosen.append((row_id, question))
+            if not rows:
+                del by_sub_topic[sub_topic]
+            if len(chosen) == count:
+                break
+
+    if chosen:
+        BankQuestion.objects.filter(id__in=[row_id for row_id, _ in chosen]).update(
+            times_served=F('times_served') + 1
+        )
+    return [dict(question) for _, question in chosen]
+
+
+def draw_fallback(domain: str, sub_domain: str, level: str, count: int, taken: List[dict]) -> List[dict]:
+    """
+    Up to ``count`` pool questions not in ``taken``, including ones the user
+    has already seen. Used when the LLM cannot cover a shortfall, so a quiz
+    repeats stored questions instead of failing.
+    """
+    if count <= 0:
+        return []
+    return draw_questions(domain, sub_domain, level, count, SeenQuestions(taken))
+
+
+def refill_pool(domain: str, sub_domain: str, level: str) -> int:
+    """Generate questions until the pool is back above its low-water mark."""
+    batch_size = settings.QUESTION_BANK_REFILL_BATCH
+    low_water_mark = settings.QUESTION_BANK_LOW_WATER_MARK
+    added = 0
+    # Bounded so a provider that keeps returning duplicates cannot loop forever.
+    for _ in range(max(1, -(-low_water_mark // batch_size))):
+        if pool_size(domain, sub_domain, level) > low_water_mark:
+            break
+        result = get_ai_service().generate_quiz_questions(
+            domain=domain,
+            sub_domain=sub_domain,
+            number_of_questions=batch_size,
+            level=level,
+            exclude_index=topic_index(domain, sub_domain, level),
+        )
+        if not isinstance(result, list) or not result:
+            break
+        added += store_questions(domain, sub_domain, level, result)
+    return added
+
+
+def schedule_refill(domain: str, sub_domain: str, level: str) -> bool:
+    """
+    Top the pool back up on the background worker pool if it has dropped to
+    the low-water mark.
+
+    Only one refill per topic runs at a time in this process.
+    """
+    if pool_size(domain, sub_domain, level) > settings.QUESTION_BANK_LOW_WATER_MARK:
+        return False
+
+    key = (normalize_key(domain), normalize_key(sub_domain), level)
+    with _refills_lock:
+        if key in _refills_in_flight:
+            return False
+        _refills_in_flight.add(key)
+
+    def run():
+        try:
+            refill_pool(domain, sub_domain, level)
+        finally:
+            with _refills_lock:
+                _refills_in_flight.discard(key)
+
+    submit_background(run)
+    return True
+
+
+def assemble_quiz(user, domain: str, sub_domain: str, level: str, number_of_questions: int):
+    """
+    Build a quiz from the question bank, calling the LLM only for the shortfall.
+
+    Returns:
+        List[dict] of questions numbered from 1, or the AIService error dict when
+        the pool is empty and generation failed.
+    """
+    seen = seen_questions(user, domain, sub_domain)
+    questions = draw_questions(domain, sub_domain, level, number_of_questions, seen)
+
+    shortfall = number_of_questions - len(questions)
+    if shortfall > 0:
+        result = generate_coalesced(domain, sub_domain, level, shortfall)
+        if isinstance(result, dict) and 'error' in result:
+            questions += draw_fallback(domain, sub_domain, level, shortfall, questions)
+            if not questions:
+                return result
+        else:
+            store_questions(domain, sub_domain, level, result)
+            _top_up(questions, result, seen, number_of_questions)
+
+    schedule_refill(domain, sub_domain, level)
+    return [{'id': i, **question} for i, question in enumerate(questions, start=1)]
+
+
+async def aassemble_quiz(user, domain: str, sub_domain: str, level: str, number_of_questions: int):
+    """Async ``assemble_quiz``: database work runs in the ORM thread, the LLM call is awaited."""
+    seen = await sync_to_async(seen_questions)(user, domain, sub_domain)
+    questions = await sync_to_async(draw_questions)(domain, sub_domain, level, number_of_questions, seen)
+
+    shortfall = number_of_questions - len(questions)
+    if shortfall > 0:
+        result = await agenerate_coalesced(domain, sub_domain, level, shortfall)
+        if isinstance(result, dict) and 'error' in result:
+            questions += await sync_to_async(draw_fallback)(domain, sub_domain, level, shortfall, questions)
+            if not questions:
+                return result
+        else:
+            await sync_to_async(store_questions)(domain, sub_domain, level, result)
+            _top_up(questions, result, seen, number_of_questions)
+
+    await sync_to_async(schedule_refill)(domain, sub_domain, level)
+    return [{'id': i, **question} for i, question in enumerate(questions, start=1)]
+
+
+def pad_with_placeholders(result, num_required):
+    questions = result if isinstance(result, list) else []
+    while len(questions) < num_required:
+        questions.append({
+            "question": f"Placeholder question {len(questions)+1}",
+            "question_type": "single",
+            "correct_answer": "N/A",
+            "correct_answers": ["N/A"],
+            "explanation": "Auto-generated placeholder."
+        })
+    return questions
+
+
+def _top_up(questions: List[dict], generated: List[dict], seen: SeenQuestions, number_of_questions: int) -> None:
+    """Append generated questions not already seen or drawn, up to the requested count."""
+    for question in generated:
+        if question in seen:
+            continue
+        seen.add(question)
+        questions.append({k: v for k, v in question.items() if k != 'id'})
+        if len(questions) == number_of_questions:
+            break
+
+
+def iter_quiz_questions(user, domain: str, sub_domain: str, level: str, number_of_questions: int) -> Iterator[dict]:
+    """
+    Streaming counterpart of ``assemble_quiz``.
+
+    Unseen bank questions are yielded immediately, then the shortfall is
+    streamed from the LLM one validated question at a time. Questions are
+    yielded without ids. If generation fails, already-seen pool questions
+    fill the rest; the error propagates only when even those run out.
+    """
+    seen = seen_questions(user, domain, sub_domain)
+    served = draw_questions(domain, sub_domain, level, number_of_questions, seen)
+    yield from served
+
+    shortfall = number_of_questions - len(served)
+    generated = []
+    try:
+        if shortfall > 0:
+            for question in get_ai_service().stream_quiz_questions(
+                domain=domain,
+                sub_domain=sub_domain,
+                number_of_questions=shortfall,
+                level=level,
+            ):
+                generated.append(question)
+                if question in seen:
+                    continue
+                seen.add(question)
+                served.append({k: v for k, v in question.items() if k != 'id'})
+                yield served[-1]
+    except Exception:
+        remaining = number_of_questions - len(served)
+        fallback = draw_fallback(domain, sub_domain, level, remaining, served)
+        yield from fallback
+        if len(fallback) < remaining:
+            raise
+    finally:
+        if generated:
+            store_questions(domain, sub_domain, level, generated)
+    schedule_refill(domain, sub_domain, level)
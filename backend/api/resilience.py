@@ -0,0 +1,130 @@
+"""
+Failure handling for calls to the LLM provider.
+
+Backend-agnostic pieces used by ``services.ResilientBackend``: which errors
+are worth retrying, jittered backoff, and a circuit breaker.
+"""
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from .instrumentation import is_schema_error
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider has been failing; calls are refused until the breaker's cool-down ends."""
+
+
+class TransientLLMError(RuntimeError):
+    """A provider failure that is expected to go away on retry (timeouts, 5xx, overload)."""
+
+
+# HTTP statuses that will fail the same way however often they are retried.
+_PERMANENT_STATUSES = {400, 401, 403, 404}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether another attempt could succeed.
+
+    Malformed output is retried because sampling usually fixes it; bad
+    requests, auth failures and programming errors are not.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if is_schema_error(error):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int):
+        return status not in _PERMANENT_STATUSES
+    return not isinstance(error, (TypeError, AttributeError, KeyError, NotImplementedError))
+
+
+def counts_against_provider(error: BaseException) -> bool:
+    """Failures that say the provider is unhealthy; a schema miss means it answered."""
+    return is_retryable(error) and not is_schema_error(error)
+
+
+class RetryPolicy:
+    """Bounded retries with "full jitter" exponential backoff."""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 rng: Optional[random.Random] = None):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after failed attempt number ``attempt`` (0-based)."""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the provider is down.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow()`` raises ``CircuitOpenError`` for ``reset_timeout`` seconds.
+    Then a single trial call is let through (half-open): success closes the
+    breaker, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> None:
+        """Raise ``CircuitOpenError`` unless a call may go ahead now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN:
+                remaining = self.reset_timeout - (self._clock() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"LLM provider unavailable; retrying in {remaining:.0f}s")
+                self._state = self.HALF_OPEN
+            if self._trial_in_flight:
+                raise CircuitOpenError("LLM provider unavailable; a trial call is in progress")
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """End a call that said nothing about provider health (e.g. a schema miss)."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._failures = 0
+            self._trial_in_flight = False
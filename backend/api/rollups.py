@@ -0,0 +1,138 @@
+"""
+Per-user performance rollups by topic, sub_topic and day.
+
+``record_quiz`` adds a newly completed quiz to ``TopicPerformance`` with
+one increment per sub_topic, so stats are read from the rollup instead
+of by replaying quiz history. ``rebuild`` recomputes the rollup from history,
+e.g. after ``manage.py regrade`` or a change of ``SCORING_MODE``.
+"""
+from collections import defaultdict
+from typing import Optional
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import scoring
+from .models import QuizHistory, TopicPerformance
+from .question_bank import normalize_key
+
+
+def _add(user_id: int, domain: str, sub_domain: str, sub_topic: str, day, questions: int,
+         answered: int, credit: float) -> None:
+    rows = TopicPerformance.objects.filter(
+        user_id=user_id, domain=domain, sub_domain=sub_domain, sub_topic=sub_topic, day=day,
+    )
+    increments = dict(
+        questions=F('questions') + questions, answered=F('answered') + answered, credit=F('credit') + credit,
+    )
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            TopicPerformance.objects.create(
+                user_id=user_id, domain=domain, sub_domain=sub_domain, sub_topic=sub_topic, day=day,
+                questions=questions, answered=answered, credit=credit,
+            )
+    except IntegrityError:
+        # Another completion created the row first.
+        rows.update(**increments)
+
+
+def record_quiz(quiz: QuizHistory, mode: Optional[str] = None) -> None:
+    """Add a just-completed quiz to its user's rollup; call it once per quiz."""
+    questions, answers = quiz.questions, quiz.user_answers
+    credits = scoring.question_credit(questions, answers, mode)
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    for i, question in enumerate(questions):
+        sub_topic = question.get('sub_topic', '') if isinstance(question, dict) else ''
+        total = totals[normalize_key(sub_topic)[:200]]
+        total[0] += 1
+        total[1] += bool(i < len(answers) and answers[i])
+        total[2] += float(credits[i])
+
+    day = timezone.localdate(quiz.updated_at)
+    domain, sub_domain = normalize_key(quiz.domain), normalize_key(quiz.sub_domain)
+    for sub_topic, (count, answered, credit) in sorted(totals.items()):
+        _add(quiz.user_id, domain, sub_domain, sub_topic, day, count, answered, credit)
+
+
+def rebuild(user=None, mode: Optional[str] = None, chunk_size: int = 2000) -> int:
+    """
+    Recompute the rollup (for ``user``, or everyone) from completed quizzes,
+    streaming them in chunks.
+
+    Returns:
+        int: the number of rollup rows written.
+    """
+    quizzes = QuizHistory.objects.filter(status='completed')
+    if user is not None:
+        quizzes = quizzes.filter(user=user)
+    rows = quizzes.only('id', 'user_id', 'domain', 'sub_domain', 'updated_at').order_by('id')
+
+    keys = scoring.AnswerKeys()
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    for batch in scoring.chunked(rows.iterator(chunk_size=chunk_size), chunk_size):
+        ids = np.array([quiz.id for quiz in batch], dtype=np.int64)
+        quiz_ids, question_ids, answer_keys, selected = keys.answers(ids.tolist())
+        credits = scoring.credit(answer_keys, selected, mode)
+        groups = [
+            (quiz.user_id, normalize_key(quiz.domain), normalize_key(quiz.sub_domain),
+             timezone.localdate(quiz.updated_at))
+            for quiz in batch
+        ]
+        for position, question_id, mask, earned in zip(np.searchsorted(ids, quiz_ids).tolist(),
+                                                       question_ids.tolist(), selected.tolist(), credits.tolist()):
+            user_id, domain, sub_domain, day = groups[position]
+            sub_topic = normalize_key(keys.sub_topics[question_id])[:200]
+            total = totals[(user_id, domain, sub_domain, sub_topic, day)]
+            total[0] += 1
+            total[1] += bool(mask)
+            total[2] += earned
+
+    with transaction.atomic():
+        existing = TopicPerformance.objects.all()
+        if user is not None:
+            existing = existing.filter(user=user)
+        existing.delete()
+        TopicPerformance.objects.bulk_create([
+            TopicPerformance(user_id=user_id, domain=domain, sub_domain=sub_domain, sub_topic=sub_topic, day=day,
+                             questions=count, answered=answered, credit=credit)
+            for (user_id, domain, sub_domain, sub_topic, day), (count, answered, credit) in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def stats(user, domain: Optional[str] = None, sub_domain: Optional[str] = None, since=None) -> list:
+    """
+    ``user``'s accuracy per topic and sub_topic, with a per-day series,
+    read from the rollup in one query.
+    """
+    rows = TopicPerformance.objects.filter(user=user)
+    if domain:
+        rows = rows.filter(domain=normalize_key(domain))
+    if sub_domain:
+        rows = rows.filter(sub_domain=normalize_key(sub_domain))
+    if since is not None:
+        rows = rows.filter(day__gte=since)
+
+    topics = {}
+    for row in rows.order_by('domain', 'sub_domain', 'sub_topic', 'day').values(
+            'domain', 'sub_domain', 'sub_topic', 'day', 'questions', 'answered', 'credit'):
+        key = (row['domain'], row['sub_domain'], row['sub_topic'])
+        topic = topics.setdefault(key, {
+            'domain': key[0], 'sub_domain': key[1], 'sub_topic': key[2],
+            'questions': 0, 'answered': 0, 'credit': 0.0, 'days': [],
+        })
+        topic['questions'] += row['questions']
+        topic['answered'] += row['answered']
+        topic['credit'] += row['credit']
+        topic['days'].append({
+            'day': row['day'].isoformat(), 'questions': row['questions'],
+            'accuracy': scoring.percentage(row['credit'], row['questions']),
+        })
+    for topic in topics.values():
+        topic['accuracy'] = scoring.percentage(topic.pop('credit'), topic['questions'])
+    return list(topics.values())
+
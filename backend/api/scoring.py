@@ -0,0 +1,147 @@
+"""
+Quiz scoring over option bitmasks.
+
+A question's answer key is the bitmask of its correct options, built once
+per question (``answer_key``); answers are already stored as bitmasks
+(``QuizHistoryQuestion.selected``). Scoring a quiz, or a whole chunk of
+quizzes, is then a few NumPy operations over two integer arrays.
+
+Modes:
+
+- ``exact``: a question counts only if exactly the correct options were chosen
+- ``partial``: (right picks - wrong picks) / correct options, floored at 0
+- ``jaccard``: right picks / options that were either picked or correct
+"""
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .models import Question, QuizHistoryQuestion, answer_mask
+
+MODES = ('exact', 'partial', 'jaccard')
+
+_POPCOUNT_16 = np.array([bin(i).count('1') for i in range(1 << 16)], dtype=np.int64)
+
+
+def _popcount(masks: np.ndarray) -> np.ndarray:
+    masks = masks.astype(np.uint64)
+    return sum(_POPCOUNT_16[(masks >> np.uint64(shift)) & np.uint64(0xFFFF)] for shift in (0, 16, 32, 48))
+
+
+def answer_key(question) -> int:
+    """Bitmask of a question's correct options (0 if none of them is an option)."""
+    if not isinstance(question, dict):
+        return 0
+    return answer_mask(question.get('options', []), question.get('correct_answers', []))
+
+
+def credit(keys: np.ndarray, selected: np.ndarray, mode: Optional[str] = None) -> np.ndarray:
+    """
+    Per-question credit in [0, 1] for answer ``keys`` and ``selected`` masks
+    (unanswered = 0). A question with an empty key earns nothing.
+    """
+    mode = mode or settings.SCORING_MODE
+    keys = np.asarray(keys, dtype=np.int64)
+    selected = np.asarray(selected, dtype=np.int64)
+    valid = keys != 0
+    if mode == 'exact':
+        return (valid & (keys == selected)).astype(np.float64)
+
+    right = _popcount(keys & selected)
+    if mode == 'partial':
+        wrong = _popcount(selected & ~keys)
+        earned = np.maximum(right - wrong, 0) / np.maximum(_popcount(keys), 1)
+    elif mode == 'jaccard':
+        earned = right / np.maximum(_popcount(keys | selected), 1)
+    else:
+        raise ValueError(f"Unknown scoring mode {mode!r}; expected one of {', '.join(MODES)}")
+    return np.where(valid, earned, 0.0)
+
+
+def percentage(earned: float, total: int) -> float:
+    return round(float(earned) / total * 100, 2) if total > 0 else 0
+
+
+def score_masks(keys: Iterable[int], selected: Iterable[int], mode: Optional[str] = None) -> float:
+    """Percentage score of one quiz from its answer keys and selected masks."""
+    keys = np.fromiter(keys, dtype=np.int64)
+    selected = np.fromiter(selected, dtype=np.int64)
+    return percentage(credit(keys, selected, mode).sum(), len(keys))
+
+
+def score_many(quiz_index: np.ndarray, keys: np.ndarray, selected: np.ndarray, quizzes: int,
+               mode: Optional[str] = None) -> List[float]:
+    """
+    Scores for many quizzes at once from flat per-question arrays, where
+    ``quiz_index[i]`` says which of the ``quizzes`` question i belongs to.
+    """
+    earned = np.bincount(quiz_index, weights=credit(keys, selected, mode), minlength=quizzes)
+    totals = np.bincount(quiz_index, minlength=quizzes)
+    return [percentage(e, t) for e, t in zip(earned, totals)]
+
+
+def question_credit(questions, user_answers, mode: Optional[str] = None) -> np.ndarray:
+    """Per-question credit for ``user_answers`` (lists of chosen option strings, matched case-insensitively)."""
+    selected = []
+    for i, question in enumerate(questions):
+        answer = user_answers[i] if i < len(user_answers) else None
+        if isinstance(answer, str):
+            answer = [answer]
+        options = question.get('options', []) if isinstance(question, dict) else []
+        selected.append(answer_mask(options, answer or []))
+    keys = np.fromiter((answer_key(q) for q in questions), dtype=np.int64, count=len(questions))
+    return credit(keys, np.array(selected, dtype=np.int64), mode)
+
+
+def calculate_score(questions, user_answers, mode: Optional[str] = None) -> float:
+    """Percentage score for ``user_answers``; see ``question_credit``."""
+    return percentage(question_credit(questions, user_answers, mode).sum(), len(questions))
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class AnswerKeys:
+    """Answer keys and sub_topics of stored questions, each loaded once, for bulk jobs."""
+
+    def __init__(self):
+        self.keys = {}
+        self.sub_topics = {}
+
+    def load(self, question_ids: Iterable[int]) -> None:
+        missing = set(question_ids) - self.keys.keys()
+        if missing:
+            for question_id, content in Question.objects.filter(id__in=missing).values_list('id', 'content'):
+                self.keys[question_id] = answer_key(content)
+                self.sub_topics[question_id] = content.get('sub_topic', '') if isinstance(content, dict) else ''
+
+    def answers(self, quiz_ids: List[int]):
+        """
+        Every answered-or-not question of ``quiz_ids``, as flat arrays.
+
+        Returns:
+            tuple: (quiz ids, question ids, answer keys, selected masks), one
+            entry per question; unanswered questions have a mask of 0.
+        """
+        rows = list(
+            QuizHistoryQuestion.objects.filter(quiz_id__in=quiz_ids)
+            .values_list('quiz_id', 'question_id', 'selected').order_by()
+        )
+        quizzes, questions, masks = zip(*rows) if rows else ((), (), ())
+        self.load(questions)
+        count = len(rows)
+        return (
+            np.fromiter(quizzes, dtype=np.int64, count=count),
+            np.fromiter(questions, dtype=np.int64, count=count),
+            np.fromiter((self.keys[q] for q in questions), dtype=np.int64, count=count),
+            np.fromiter((mask or 0 for mask in masks), dtype=np.int64, count=count),
+        )
@@ -8,6 +8,10 @@ class QuizGenerationSerializer(serializers.Serializer):
     level = serializers.ChoiceField(
         choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')]
     )
+    mode = serializers.ChoiceField(
+        choices=[('sync', 'Sync'), ('async', 'Async')], default='sync',
+        help_text="'async' queues a generation job and returns its job_id immediately."
+    )
 class GeneratedQuestionSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     question = serializers.CharField()
@@ -15,7 +19,18 @@ class GeneratedQuestionSerializer(serializers.Serializer):
     correct_answers = serializers.ListField(child=serializers.CharField())
     explanation = serializers.CharField()
 
+class QuizHistorySummarySerializer(serializers.ModelSerializer):
+    """List view of a quiz: no questions or answers."""
+    class Meta:
+        model = QuizHistory
+        fields = ['id', 'domain', 'sub_domain', 'score', 'status', 'created_at', 'updated_at']
+
+
 class QuizHistorySerializer(serializers.ModelSerializer):
+    # Stored as normalized Question rows and answer bitmasks; exposed in the original inline shape.
+    questions = serializers.JSONField(read_only=True)
+    user_answers = serializers.JSONField(read_only=True)
+
     class Meta:
         model = QuizHistory
         fields = [
@@ -25,6 +40,19 @@ class QuizHistorySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['user']
 
+class AnswerSerializer(serializers.Serializer):
+    index = serializers.IntegerField(min_value=0, help_text="Position of the question in the quiz.")
+    selected = serializers.IntegerField(
+        min_value=0, max_value=32767,
+        help_text="Chosen options as a bitmask: bit i set means options[i] is selected."
+    )
+
 class ResumeQuizSerializer(serializers.Serializer):
     domain = serializers.CharField(max_length=100)
     sub_domain = serializers.CharField(max_length=100)
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    domain = serializers.CharField(max_length=100, required=False, allow_blank=True, default='',
+                                   help_text="Leave empty for the global board.")
+    by = serializers.ChoiceField(choices=[('best', 'Best'), ('average', 'Average')], default='best')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
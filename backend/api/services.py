@@ -1,8 +1,37 @@
+import asyncio
+import hashlib
 import os
-from typing import List
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
-from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError
+
+from .dedup import NearDuplicateIndex
+from .instrumentation import (
+    GenerationRecord,
+    LLMOutputError,
+    arecord_generation,
+    is_schema_error,
+    record_generation,
+    registry,
+)
+from .resilience import (
+    CircuitBreaker,
+    RetryPolicy,
+    TransientLLMError,
+    counts_against_provider,
+    is_retryable,
+)
+from .streaming import parse_question_stream
 
 
 load_dotenv()
@@ -17,44 +46,549 @@ class QuizQuestion(BaseModel):
 class QuizQuestionSet(BaseModel):
     """Model for a collection of quiz questions"""
     questions: List[QuizQuestion] = Field(description="List of generated quiz questions")
-class AIService:
+    _usage: dict = PrivateAttr(default_factory=dict)
+
+    @property
+    def usage(self) -> dict:
+        """Token usage reported by the backend: input_tokens, output_tokens, truncated."""
+        return self._usage
+
+
+@dataclass(frozen=True)
+class QuizSpec:
+    """What a single generation call is asked for."""
+    domain: str
+    sub_domain: str
+    level: str
+    number_of_questions: int
+    focus: str = ""
+
+
+# Each shard of a large quiz is steered towards a different angle on the topic
+# so that merged shards cover distinct sub_topics instead of repeating each other.
+SHARD_FOCUS_AREAS = [
+    "core concepts and definitions",
+    "practical usage and reading code or examples",
+    "common mistakes, pitfalls and edge cases",
+    "best practices and design trade-offs",
+    "internals, performance and how things work under the hood",
+    "comparisons with related ideas and alternatives",
+]
+
+
+def normalize_text(value: str) -> str:
+    return " ".join(str(value).split()).lower()
+
+
+class LLMBackend:
     """
-    AI Service using Gemini 2.0 Flash model with LangChain structured output.
+    Base class for question generators.
+
+    Backends are built once per process and shared between requests, so they
+    must hold no per-request state.
     """
+    name = ""
+    model_name = ""
+
+    def generate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        raise NotImplementedError
+
+    async def agenerate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        """Async ``generate``; backends without a native async client run it in a thread."""
+        return await sync_to_async(self.generate, thread_sensitive=False)(prompt, spec)
+
+    def generate_many(self, prompts: List[str], specs: List[QuizSpec], max_concurrency: int) -> list:
+        """
+        Run several generations concurrently.
+
+        Returns one entry per prompt, in order: a QuizQuestionSet or the
+        exception that call raised.
+        """
+        def run(args):
+            try:
+                return self.generate(*args)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(prompts)))) as pool:
+            return list(pool.map(run, zip(prompts, specs)))
+
+    def stream(self, prompt: str, spec: QuizSpec) -> Iterator[str]:
+        """
+        Yield the model's raw JSON output as text chunks.
+
+        Backends without native streaming produce the whole set in one chunk.
+        """
+        yield self.generate(prompt, spec).model_dump_json()
+
+
+class GeminiBackend(LLMBackend):
+    """Gemini 2.0 Flash through LangChain structured output."""
+    name = "gemini"
+    model_name = "gemini-2.0-flash"
 
     def __init__(self):
-        self.api_key = os.getenv("API_KEY")
-        if not self.api_key:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        api_key = os.getenv("API_KEY")
+        if not api_key:
             raise ValueError("API_KEY not found in environment variables")
 
+        # The client keeps its HTTP transport, so connections are reused for
+        # as long as the backend lives.
         self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=self.api_key,
+            model=self.model_name,
+            google_api_key=api_key,
             temperature=0.7,
             top_p=0.95,
             max_output_tokens=8192
         )
-        self.structured_llm = self.llm.with_structured_output(QuizQuestionSet)
+        # include_raw keeps the AIMessage so token usage and truncation are visible.
+        self.structured_llm = self.llm.with_structured_output(QuizQuestionSet, include_raw=True)
 
-    def generate_quiz_questions(self, domain: str, sub_domain: str, number_of_questions: int, level: str) -> List[dict]:
-        """
-        Generate quiz questions using Gemini LLM with structured output.
+    @staticmethod
+    def parse_output(output: dict) -> QuizQuestionSet:
+        raw = output.get("raw")
+        usage = dict(getattr(raw, "usage_metadata", None) or {})
+        finish_reason = str((getattr(raw, "response_metadata", None) or {}).get("finish_reason", ""))
+        usage["truncated"] = "MAX_TOKENS" in finish_reason.upper()
 
-        Args:
-            domain (str): Main domain (e.g., "Python", "AI", "Networking")
-            sub_domain (str): Specific sub-topic (e.g., "Lists", "OOP", "CNNs")
-            number_of_questions (int): Number of questions to generate
-            level (str): Difficulty level ("easy", "medium", "hard")
+        parsed = output.get("parsed")
+        if parsed is None or output.get("parsing_error") is not None:
+            raise LLMOutputError(
+                f"Model output did not match the quiz schema: {output.get('parsing_error')}", usage
+            )
+        parsed.usage.update(usage)
+        return parsed
 
-        Returns:
-            List[dict]: List of structured quiz questions
-        """
+    def generate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        return self.parse_output(self.structured_llm.invoke(prompt))
+
+    async def agenerate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        return self.parse_output(await self.structured_llm.ainvoke(prompt))
+
+    def generate_many(self, prompts: List[str], specs: List[QuizSpec], max_concurrency: int) -> list:
+        outputs = self.structured_llm.batch(
+            prompts,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+        results = []
+        for output in outputs:
+            try:
+                results.append(output if isinstance(output, Exception) else self.parse_output(output))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def stream(self, prompt: str, spec: QuizSpec) -> Iterator[str]:
+        # Structured output only returns once the whole object is parsed, so
+        # streaming goes through the plain chat model and is parsed by us.
+        for chunk in self.llm.stream(prompt):
+            content = chunk.content
+            if isinstance(content, list):
+                content = "".join(
+                    part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+                )
+            if content:
+                yield content
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic offline backend for tests and benchmarks.
+
+    The same sequence of calls always yields the same questions; repeated
+    calls for one spec move on to new questions so pools can still fill up.
+    ``FAKE_LLM_LATENCY`` adds a fixed delay per call.
+    """
+    name = "fake"
+    model_name = "fake-quiz-model"
+
+    def __init__(self, latency: Optional[float] = None):
+        self.latency = settings.FAKE_LLM_LATENCY if latency is None else latency
+        self._calls = Counter()
+        self._lock = threading.Lock()
+
+    def _next_call(self, spec: QuizSpec) -> int:
+        with self._lock:
+            call = self._calls[spec]
+            self._calls[spec] += 1
+        return call
+
+    @staticmethod
+    def with_usage(prompt: str, result: QuizQuestionSet) -> QuizQuestionSet:
+        # Rough 4-characters-per-token estimate, so benchmarks see plausible numbers.
+        result.usage.update({
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(result.model_dump_json()) // 4,
+            "truncated": False,
+        })
+        return result
+
+    def build_questions(self, spec: QuizSpec, call: int) -> QuizQuestionSet:
+        questions = []
+        for n in range(1, spec.number_of_questions + 1):
+            seed = f"{spec.domain}|{spec.sub_domain}|{spec.level}|{spec.focus}|{call}|{n}"
+            rng = random.Random(hashlib.sha256(seed.encode("utf-8")).hexdigest())
+            options = [f"{spec.sub_domain} option {rng.randrange(10 ** 6)}-{i}" for i in range(4)]
+            correct = rng.sample(options, rng.choice([1, 1, 2]))
+            questions.append(QuizQuestion(
+                id=n,
+                question=f"[{spec.level}] {spec.domain}/{spec.sub_domain} question {call}.{n}: which holds for "
+                         + " ".join(f"x{rng.randrange(10 ** 6)}" for _ in range(6)) + "?",
+                options=options,
+                correct_answers=correct,
+                explanation=f"The answer follows from {spec.sub_domain} fundamentals.",
+                sub_topic=f"{spec.sub_domain} concept {rng.randrange(5)}",
+            ))
+        return QuizQuestionSet(questions=questions)
+
+    def generate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        call = self._next_call(spec)
+        if self.latency:
+            time.sleep(self.latency)
+        return self.with_usage(prompt, self.build_questions(spec, call))
+
+    async def agenerate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        call = self._next_call(spec)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.with_usage(prompt, self.build_questions(spec, call))
+
+    def stream(self, prompt: str, spec: QuizSpec) -> Iterator[str]:
+        # Latency is spread over the questions and each one is split in two
+        # chunks, so consumers see partial objects like they do with Gemini.
+        call = self._next_call(spec)
+        questions = self.build_questions(spec, call).questions
+        yield '{"questions": ['
+        for n, question in enumerate(questions):
+            if self.latency:
+                time.sleep(self.latency / len(questions))
+            text = ("," if n else "") + question.model_dump_json()
+            yield text[:len(text) // 2]
+            yield text[len(text) // 2:]
+        yield "]}"
+
+
+class FaultyBackend(FakeBackend):
+    """
+    ``FakeBackend`` that injects provider faults, to exercise the resilience
+    layer offline.
+
+    Each call has one outcome: ``"error"`` (raises ``TransientLLMError``),
+    ``"slow"`` (answers after ``slow_latency`` seconds), ``"malformed"`` (the
+    output fails schema validation) or ``"ok"``. Outcomes are drawn at the
+    ``FAULTY_LLM_*`` rates, or taken in order from ``faults`` when given;
+    once that script runs out every call succeeds.
+    """
+    name = "faulty"
+
+    def __init__(self, faults: Optional[Iterable[str]] = None, failure_rate: Optional[float] = None,
+                 slow_rate: Optional[float] = None, malformed_rate: Optional[float] = None,
+                 slow_latency: Optional[float] = None, latency: Optional[float] = None, seed: int = 0):
+        super().__init__(latency)
+        self.scripted = faults is not None
+        self._script = deque(faults or ())
+        self._rates = [
+            ("error", settings.FAULTY_LLM_FAILURE_RATE if failure_rate is None else failure_rate),
+            ("slow", settings.FAULTY_LLM_SLOW_RATE if slow_rate is None else slow_rate),
+            ("malformed", settings.FAULTY_LLM_MALFORMED_RATE if malformed_rate is None else malformed_rate),
+        ]
+        self.slow_latency = settings.FAULTY_LLM_SLOW_LATENCY if slow_latency is None else slow_latency
+        self._rng = random.Random(seed)
+
+    def next_fault(self) -> str:
+        with self._lock:
+            if self.scripted:
+                return self._script.popleft() if self._script else "ok"
+            roll = self._rng.random()
+        for fault, rate in self._rates:
+            if roll < rate:
+                return fault
+            roll -= rate
+        return "ok"
+
+    @staticmethod
+    def malformed(result: QuizQuestionSet) -> LLMOutputError:
+        return LLMOutputError("Model output did not match the quiz schema: injected fault", result.usage)
+
+    def generate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        fault = self.next_fault()
+        if fault == "error":
+            raise TransientLLMError("Injected provider failure")
+        if fault == "slow":
+            time.sleep(self.slow_latency)
+        result = super().generate(prompt, spec)
+        if fault == "malformed":
+            raise self.malformed(result)
+        return result
+
+    async def agenerate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        fault = self.next_fault()
+        if fault == "error":
+            raise TransientLLMError("Injected provider failure")
+        if fault == "slow":
+            await asyncio.sleep(self.slow_latency)
+        result = await super().agenerate(prompt, spec)
+        if fault == "malformed":
+            raise self.malformed(result)
+        return result
+
+    def stream(self, prompt: str, spec: QuizSpec) -> Iterator[str]:
+        fault = self.next_fault()
+        if fault == "error":
+            raise TransientLLMError("Injected provider failure")
+        if fault == "slow":
+            time.sleep(self.slow_latency)
+        if fault == "malformed":
+            yield '{"questions": [{"id": 1, "question": null, "options": "n/a"}]}'
+            return
+        yield from super().stream(prompt, spec)
+
+
+_call_pool = None
+_call_pool_lock = threading.Lock()
+
+
+def _get_call_pool() -> ThreadPoolExecutor:
+    # Shared by every ResilientBackend so rebuilt services do not leak threads.
+    global _call_pool
+    if _call_pool is None:
+        with _call_pool_lock:
+            if _call_pool is None:
+                _call_pool = ThreadPoolExecutor(
+                    max_workers=max(8, settings.LLM_MAX_CONCURRENCY * 4),
+                    thread_name_prefix='quizgen-llm',
+                )
+    return _call_pool
+
+
+class ResilientBackend(LLMBackend):
+    """
+    Wraps another backend with retries, hedging, a timeout and a circuit breaker.
+
+    - Transient failures are retried with jittered backoff (``LLM_RETRY_*``).
+    - A call still running after the ``LLM_HEDGE_PERCENTILE`` latency of
+      recent calls gets a duplicate request; whichever answers first wins.
+    - An attempt running longer than ``LLM_CALL_TIMEOUT`` seconds fails.
+    - Repeated provider failures open a circuit breaker, after which calls
+      raise ``CircuitOpenError`` immediately (``LLM_CIRCUIT_*``).
+
+    Streams are retried only if they fail before their first chunk, and are
+    neither hedged nor timed out.
+    """
+
+    def __init__(self, inner: LLMBackend, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, hedge_after: Optional[float] = None,
+                 timeout: Optional[float] = None):
+        self.inner = inner
+        self.name = inner.name
+        self.model_name = inner.model_name
+        self.retry = retry or RetryPolicy(
+            settings.LLM_RETRY_ATTEMPTS, settings.LLM_RETRY_BASE_DELAY, settings.LLM_RETRY_MAX_DELAY
+        )
+        self.breaker = breaker or CircuitBreaker(
+            settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RESET_TIMEOUT
+        )
+        self.hedge_after = hedge_after
+        self.timeout = settings.LLM_CALL_TIMEOUT if timeout is None else timeout
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a call is hedged, or None while there is too little latency history."""
+        if self.hedge_after is not None:
+            return self.hedge_after
+        percentile = settings.LLM_HEDGE_PERCENTILE
+        if not percentile or registry.count("llm_call_ms", backend=self.name) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return registry.percentile("llm_call_ms", percentile, backend=self.name) / 1000
+
+    def _settle(self, error: BaseException) -> None:
+        if counts_against_provider(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    def _backoff(self, attempt: int) -> float:
+        registry.increment("llm_retries", backend=self.name)
+        return self.retry.delay(attempt)
+
+    def _timed_generate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        started = time.perf_counter()
+        result = self.inner.generate(prompt, spec)
+        registry.observe("llm_call_ms", (time.perf_counter() - started) * 1000, backend=self.name)
+        return result
+
+    async def _timed_agenerate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        started = time.perf_counter()
+        result = await self.inner.agenerate(prompt, spec)
+        registry.observe("llm_call_ms", (time.perf_counter() - started) * 1000, backend=self.name)
+        return result
 
-        prompt = f"""
+    def _wait_budget(self, started: float, hedged: bool, hedge_at: Optional[float]) -> float:
+        elapsed = time.monotonic() - started
+        budget = self.timeout - elapsed
+        if not hedged and hedge_at is not None:
+            budget = min(budget, hedge_at - elapsed)
+        return max(0.0, budget)
+
+    def _attempt(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        """One call, plus a hedged duplicate if it runs long; the first success wins."""
+        started = time.monotonic()
+        hedge_at = self.hedge_delay()
+        pool = _get_call_pool()
+        pending = {pool.submit(self._timed_generate, prompt, spec)}
+        hedged = False
+        error = None
+        while pending:
+            done, pending = wait(pending, self._wait_budget(started, hedged, hedge_at), FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+            if time.monotonic() - started >= self.timeout:
+                break
+            if pending and not hedged and hedge_at is not None and time.monotonic() - started >= hedge_at:
+                hedged = True
+                registry.increment("llm_hedges", backend=self.name)
+                pending.add(pool.submit(self._timed_generate, prompt, spec))
+        if not pending:
+            raise error
+        for future in pending:
+            future.cancel()
+        raise TimeoutError(f"LLM call took longer than {self.timeout:g}s")
+
+    async def _aattempt(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        started = time.monotonic()
+        hedge_at = self.hedge_delay()
+        pending = {asyncio.ensure_future(self._timed_agenerate(prompt, spec))}
+        hedged = False
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=self._wait_budget(started, hedged, hedge_at), return_when=FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if time.monotonic() - started >= self.timeout:
+                    break
+                if pending and not hedged and hedge_at is not None and time.monotonic() - started >= hedge_at:
+                    hedged = True
+                    registry.increment("llm_hedges", backend=self.name)
+                    pending.add(asyncio.ensure_future(self._timed_agenerate(prompt, spec)))
+            if not pending:
+                raise error
+            raise TimeoutError(f"LLM call took longer than {self.timeout:g}s")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def generate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        for attempt in range(self.retry.attempts):
+            self.breaker.allow()
+            try:
+                result = self._attempt(prompt, spec)
+            except Exception as e:
+                self._settle(e)
+                if not is_retryable(e) or attempt + 1 == self.retry.attempts:
+                    raise
+                time.sleep(self._backoff(attempt))
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def agenerate(self, prompt: str, spec: QuizSpec) -> QuizQuestionSet:
+        for attempt in range(self.retry.attempts):
+            self.breaker.allow()
+            try:
+                result = await self._aattempt(prompt, spec)
+            except Exception as e:
+                self._settle(e)
+                if not is_retryable(e) or attempt + 1 == self.retry.attempts:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stream(self, prompt: str, spec: QuizSpec) -> Iterator[str]:
+        for attempt in range(self.retry.attempts):
+            self.breaker.allow()
+            started = False
+            try:
+                for chunk in self.inner.stream(prompt, spec):
+                    started = True
+                    yield chunk
+            except GeneratorExit:
+                # The consumer had enough; the provider was answering fine.
+                self.breaker.record_success()
+                raise
+            except Exception as e:
+                self._settle(e)
+                if started or not is_retryable(e) or attempt + 1 == self.retry.attempts:
+                    raise
+                time.sleep(self._backoff(attempt))
+            else:
+                self.breaker.record_success()
+                return
+
+
+def with_resilience(backend: LLMBackend) -> LLMBackend:
+    """Wrap ``backend`` in ``ResilientBackend`` unless ``LLM_RESILIENCE_ENABLED`` is off."""
+    return ResilientBackend(backend) if settings.LLM_RESILIENCE_ENABLED else backend
+
+
+_backend_registry: Dict[str, Callable[[], LLMBackend]] = {}
+
+
+def register_backend(name: str, factory: Callable[[], LLMBackend]) -> None:
+    """Make a backend selectable through the ``LLM_BACKEND`` setting."""
+    _backend_registry[name] = factory
+
+
+def create_backend(name: str) -> LLMBackend:
+    try:
+        factory = _backend_registry[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown LLM backend '{name}'. Available: {', '.join(sorted(_backend_registry))}"
+        )
+    return factory()
+
+
+register_backend(GeminiBackend.name, GeminiBackend)
+register_backend(FakeBackend.name, FakeBackend)
+register_backend(FaultyBackend.name, FaultyBackend)
+
+
+class AIService:
+    """
+    Quiz question generation on top of a pluggable LLM backend.
+
+    Use ``get_ai_service()`` rather than constructing this per request. The
+    backend named by ``LLM_BACKEND`` is wrapped in ``ResilientBackend``; one
+    passed in explicitly is used as is.
+    """
+
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        self.backend = backend or with_resilience(create_backend(settings.LLM_BACKEND))
+
+    def build_prompt(self, domain: str, sub_domain: str, number_of_questions: int, level: str,
+                     focus: str = "") -> str:
+        focus_requirement = (
+            f"\n        - Focus this set on {focus}; pick sub_topics that fit this focus."
+            if focus else ""
+        )
+        return f"""
         You are an expert educational content creator.
 
         TASK:
-        Generate {number_of_questions} {level}-level multiple choice questions on the topic "{sub_domain}" 
+        Generate {number_of_questions} {level}-level multiple choice questions on the topic "{sub_domain}"
         from the domain "{domain}".
 
         REQUIREMENTS:
@@ -65,15 +599,238 @@ class AIService:
         - Include a sub_topic field that identifies the specific concept or theme of the question.
         - Vary between conceptual and applied questions.
         - Ensure the questions strictly match the difficulty level: {level}.
-        - Return data strictly matching the defined JSON schema.
+        - Return data strictly matching the defined JSON schema.{focus_requirement}
+        """
+
+    def build_stream_prompt(self, domain: str, sub_domain: str, number_of_questions: int, level: str) -> str:
+        return self.build_prompt(domain, sub_domain, number_of_questions, level) + """
+        OUTPUT FORMAT:
+        Respond with JSON only, no prose or markdown, shaped as
+        {"questions": [{"id": 1, "question": "...", "options": ["...", "...", "...", "..."],
+        "correct_answers": ["..."], "explanation": "...", "sub_topic": "..."}]}
+        """
+
+    def plan_shards(self, domain: str, sub_domain: str, number_of_questions: int, level: str) -> List[QuizSpec]:
+        """Split a request into evenly sized shards of at most ``LLM_SHARD_SIZE`` questions."""
+        shard_count = max(1, -(-number_of_questions // max(1, settings.LLM_SHARD_SIZE)))
+        if shard_count == 1:
+            return [QuizSpec(domain, sub_domain, level, number_of_questions)]
+
+        base, extra = divmod(number_of_questions, shard_count)
+        specs = []
+        for i in range(shard_count):
+            focus = SHARD_FOCUS_AREAS[i % len(SHARD_FOCUS_AREAS)]
+            if i >= len(SHARD_FOCUS_AREAS):
+                focus = f"{focus} (part {i // len(SHARD_FOCUS_AREAS) + 1})"
+            specs.append(QuizSpec(domain, sub_domain, level, base + (1 if i < extra else 0), focus))
+        return specs
+
+    def build_shard_prompts(self, specs: List[QuizSpec]) -> List[str]:
+        return [
+            self.build_prompt(s.domain, s.sub_domain, s.number_of_questions, s.level, s.focus)
+            for s in specs
+        ]
+
+    def new_record(self, domain: str, sub_domain: str, level: str, number_of_questions: int,
+                   mode: str) -> GenerationRecord:
+        return GenerationRecord(
+            backend=self.backend.name,
+            model_name=self.backend.model_name,
+            domain=domain,
+            sub_domain=sub_domain,
+            level=level,
+            mode=mode,
+            requested=number_of_questions,
+        )
+
+    @staticmethod
+    def collect_shards(record: GenerationRecord, results: list) -> list:
+        """Fold shard usage and failures into ``record``; re-raise if every shard failed."""
+        record.shards = len(results)
+        failures = []
+        for result in results:
+            if isinstance(result, Exception):
+                failures.append(result)
+                record.failed_shards += 1
+                record.schema_failures += int(is_schema_error(result))
+                record.add_usage(getattr(result, "usage", None) or {})
+            else:
+                record.add_usage(result.usage)
+        if len(failures) == len(results):
+            raise failures[0]
+        return results
+
+    @staticmethod
+    def merge_shards(results: list) -> List[dict]:
+        """Concatenate shard results, dropping repeated questions and renumbering ids from 1."""
+        merged = []
+        seen = set()
+        for result in results:
+            if isinstance(result, Exception):
+                continue
+            for question in result.questions:
+                key = normalize_text(question.question)
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append({**question.model_dump(), "id": len(merged) + 1})
+        return merged
+
+    @staticmethod
+    def drop_near_duplicates(questions: List[dict],
+                             exclude_index: Optional[NearDuplicateIndex] = None) -> List[dict]:
+        """
+        Remove reworded repeats within ``questions`` and of anything in
+        ``exclude_index``, renumbering the survivors from 1.
+        """
+        seen = NearDuplicateIndex()
+        kept = []
+        for question in questions:
+            if exclude_index is not None and exclude_index.contains_near_duplicate(question):
+                continue
+            if not seen.add_if_new(question):
+                continue
+            kept.append({**question, "id": len(kept) + 1})
+        return kept
+
+    def generate_quiz_questions(self, domain: str, sub_domain: str, number_of_questions: int, level: str,
+                                exclude_index: Optional[NearDuplicateIndex] = None) -> List[dict]:
         """
+        Generate quiz questions using the configured LLM backend with structured output.
+
+        Args:
+            domain (str): Main domain (e.g., "Python", "AI", "Networking")
+            sub_domain (str): Specific sub-topic (e.g., "Lists", "OOP", "CNNs")
+            number_of_questions (int): Number of questions to generate
+            level (str): Difficulty level ("easy", "medium", "hard")
+            exclude_index (NearDuplicateIndex): Optional questions to avoid; near-duplicates
+                of these (and of each other) are dropped from the result
+
+        Returns:
+            List[dict]: List of structured quiz questions
+        """
+        specs = self.plan_shards(domain, sub_domain, number_of_questions, level)
+        prompts = self.build_shard_prompts(specs)
+        record = self.new_record(domain, sub_domain, level, number_of_questions, mode="sync")
 
         try:
-            result: QuizQuestionSet = self.structured_llm.invoke(prompt)
-            return [q.model_dump() for q in result.questions]
+            if len(specs) == 1:
+                try:
+                    results = [self.backend.generate(prompts[0], specs[0])]
+                except Exception as e:
+                    results = [e]
+            else:
+                # Shards run concurrently, so latency is bounded by the slowest one
+                # and a malformed shard only costs its own questions.
+                results = self.backend.generate_many(prompts, specs, settings.LLM_MAX_CONCURRENCY)
+            questions = self.drop_near_duplicates(
+                self.merge_shards(self.collect_shards(record, results)), exclude_index
+            )
 
         except Exception as e:
+            record_generation(record.finish(error=e))
             return {
                 "error": f"Error generating quiz: {str(e)}",
                 "questions": []
             }
+
+        record_generation(record.finish(returned=len(questions)))
+        return questions
+
+    async def agenerate_quiz_questions(self, domain: str, sub_domain: str, number_of_questions: int,
+                                       level: str,
+                                       exclude_index: Optional[NearDuplicateIndex] = None) -> List[dict]:
+        """Async ``generate_quiz_questions``; awaits the backend instead of holding a thread."""
+        specs = self.plan_shards(domain, sub_domain, number_of_questions, level)
+        prompts = self.build_shard_prompts(specs)
+        record = self.new_record(domain, sub_domain, level, number_of_questions, mode="async")
+        semaphore = asyncio.Semaphore(max(1, settings.LLM_MAX_CONCURRENCY))
+
+        async def run(prompt, spec):
+            async with semaphore:
+                return await self.backend.agenerate(prompt, spec)
+
+        try:
+            results = await asyncio.gather(
+                *(run(p, s) for p, s in zip(prompts, specs)), return_exceptions=True
+            )
+            questions = self.drop_near_duplicates(
+                self.merge_shards(self.collect_shards(record, results)), exclude_index
+            )
+
+        except Exception as e:
+            await arecord_generation(record.finish(error=e))
+            return {
+                "error": f"Error generating quiz: {str(e)}",
+                "questions": []
+            }
+
+        await arecord_generation(record.finish(returned=len(questions)))
+        return questions
+
+    def stream_quiz_questions(self, domain: str, sub_domain: str, number_of_questions: int,
+                              level: str) -> Iterator[dict]:
+        """
+        Yield questions one at a time as the model produces them.
+
+        Each item is validated against ``QuizQuestion`` as soon as its JSON
+        object is complete; invalid items are skipped and ids are renumbered
+        from 1. Backend errors propagate to the caller.
+        """
+        prompt = self.build_stream_prompt(domain, sub_domain, number_of_questions, level)
+        spec = QuizSpec(domain, sub_domain, level, number_of_questions)
+        record = self.new_record(domain, sub_domain, level, number_of_questions, mode="stream")
+
+        count = 0
+        error = None
+        try:
+            for item in parse_question_stream(self.backend.stream(prompt, spec)):
+                try:
+                    question = QuizQuestion(**{**item, "id": count + 1})
+                except (TypeError, ValidationError):
+                    record.schema_failures += 1
+                    continue
+                count += 1
+                yield question.model_dump()
+                if count == number_of_questions:
+                    break
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            record_generation(record.finish(returned=count, error=error))
+
+
+_shared_service: Optional[AIService] = None
+_shared_service_lock = threading.Lock()
+
+
+def get_ai_service() -> AIService:
+    """Process-wide AIService, built on first use."""
+    global _shared_service
+    service = _shared_service
+    if service is None:
+        with _shared_service_lock:
+            if _shared_service is None:
+                _shared_service = AIService()
+            service = _shared_service
+    return service
+
+
+def reset_ai_service() -> None:
+    """Drop the shared service so the next call rebuilds it from settings."""
+    global _shared_service
+    with _shared_service_lock:
+        _shared_service = None
+
+
+def circuit_state() -> Optional[str]:
+    """Circuit breaker state of the shared service, or None if it has no breaker or is not built yet."""
+    breaker = getattr(getattr(_shared_service, "backend", None), "breaker", None)
+    return breaker.state if breaker is not None else None
+
+
+@receiver(setting_changed)
+def _reset_on_backend_change(setting, **kwargs):
+    if setting == "FAKE_LLM_LATENCY" or setting.startswith(("LLM_", "FAULTY_LLM_")):
+        reset_ai_service()
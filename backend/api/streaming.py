@@ -0,0 +1,98 @@
+import json
+from typing import Iterable, Iterator, List
+
+from rest_framework.renderers import BaseRenderer
+
+
+class QuestionStreamParser:
+    """
+    Incrementally pull complete question objects out of streamed JSON.
+
+    Accepts either ``{"questions": [{...}, ...]}`` or a bare ``[{...}, ...]``,
+    with or without surrounding markdown fences. Each object in the array is
+    returned as soon as its closing brace arrives; nothing before the first
+    ``[`` is interpreted.
+    """
+
+    def __init__(self):
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item: List[str] = []
+
+    def feed(self, chunk: str) -> List[dict]:
+        items = []
+        for char in chunk:
+            if self._done:
+                break
+            if not self._in_array:
+                if char == "[":
+                    self._in_array = True
+                continue
+
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._item = [char]
+                elif char == "]":
+                    self._done = True
+                continue
+
+            self._item.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        item = json.loads("".join(self._item))
+                    except ValueError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                    self._item = []
+        return items
+
+
+def parse_question_stream(chunks: Iterable[str]) -> Iterator[dict]:
+    """Yield question dicts from an iterable of raw text chunks."""
+    parser = QuestionStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+
+def encode_ndjson(event: str, data: dict) -> str:
+    return json.dumps({"event": event, **data}) + "\n"
+
+
+def encode_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Lets DRF negotiate ``application/x-ndjson`` for streaming views."""
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b"" if data is None else (json.dumps(data) + "\n").encode("utf-8")
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF negotiate ``text/event-stream`` for streaming views."""
+    media_type = "text/event-stream"
+    format = "sse"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b"" if data is None else encode_sse("error", data).encode("utf-8")
@@ -1,8 +1,43 @@
 
-from django.test import TestCase, Client
+import csv
+import gzip
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 import json
 
+from . import admission, compression, jobs, leaderboard, prewarm, progress, question_bank, scoring
+from .concurrency import SingleFlight
+from .dedup import NearDuplicateIndex
+from .instrumentation import LLMOutputError, registry
+from .models import (
+	BankQuestion, GenerationJob, GenerationLog, LeaderboardEntry, Question, QuizHistory, TopicPerformance,
+)
+from .resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from .services import (
+	AIService, FakeBackend, FaultyBackend, QuizQuestion, QuizSpec, ResilientBackend, get_ai_service,
+)
+from .streaming import QuestionStreamParser
+
 class GenerateQuizAPITest(TestCase):
 	def setUp(self):
 		self.client = Client()
@@ -26,3 +61,1007 @@ class GenerateQuizAPITest(TestCase):
 		bad_payload = {"domain": "python"}  # missing required fields
 		response = self.client.post(self.url, data=json.dumps(bad_payload), content_type='application/json')
 		self.assertNotEqual(response.status_code, 200)
+
+
+def make_question(n, sub_topic="basics"):
+	return {
+		"id": n,
+		"question": f"What does snippet {n} print?",
+		"options": [f"{n}-a", f"{n}-b", f"{n}-c", f"{n}-d"],
+		"correct_answers": [f"{n}-a"],
+		"explanation": "Because.",
+		"sub_topic": sub_topic,
+	}
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, QUESTION_BANK_LOW_WATER_MARK=0)
+class QuestionBankTest(TestCase):
+	def setUp(self):
+		question_bank.reset_topic_indexes()
+		self.user = User.objects.create_user(username="alice", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.url = reverse('generate-quiz')
+		self.payload = {"domain": "Python", "sub_domain": "classes", "number_of_questions": 3, "level": "easy"}
+
+	def test_quiz_served_from_bank_without_llm(self):
+		question_bank.store_questions("python", "classes", "easy", [make_question(n, f"t{n % 2}") for n in range(1, 6)])
+		with mock.patch("api.question_bank.get_ai_service") as get_ai_service:
+			response = self.client.post(self.url, self.payload, format="json")
+		get_ai_service.assert_not_called()
+		self.assertEqual(response.status_code, 200)
+		questions = response.json()["questions"]
+		self.assertEqual([q["id"] for q in questions], [1, 2, 3])
+		self.assertEqual({q["sub_topic"] for q in questions}, {"t0", "t1"})
+
+	def test_seen_questions_are_skipped_and_shortfall_generated(self):
+		question_bank.store_questions("python", "classes", "easy", [make_question(n) for n in range(1, 4)])
+		QuizHistory.objects.create(
+			user=self.user, domain="python", sub_domain="classes",
+			questions=[make_question(1), make_question(2)], status="completed",
+		)
+		with mock.patch("api.question_bank.get_ai_service") as get_ai_service:
+			get_ai_service.return_value.generate_quiz_questions.return_value = [make_question(7), make_question(8)]
+			response = self.client.post(self.url, self.payload, format="json")
+		get_ai_service.return_value.generate_quiz_questions.assert_called_once_with(
+			domain="Python", sub_domain="classes", number_of_questions=2, level="easy"
+		)
+		texts = [q["question"] for q in response.json()["questions"]]
+		self.assertEqual(texts, [make_question(n)["question"] for n in (3, 7, 8)])
+		self.assertEqual(question_bank.pool_size("python", "classes", "easy"), 5)
+
+
+@override_settings(LLM_BACKEND="fake", FAKE_LLM_LATENCY=0)
+class SharedAIServiceTest(TestCase):
+	def test_service_is_built_once_and_shared(self):
+		service = get_ai_service()
+		self.assertIs(get_ai_service(), service)
+		self.assertIsInstance(service.backend, ResilientBackend)
+		self.assertIsInstance(service.backend.inner, FakeBackend)
+
+	def test_fake_backend_is_deterministic(self):
+		first = AIService(FakeBackend()).generate_quiz_questions("python", "classes", 3, "easy")
+		second = AIService(FakeBackend()).generate_quiz_questions("python", "classes", 3, "easy")
+		self.assertEqual(first, second)
+		self.assertEqual(len(first), 3)
+		for question in first:
+			QuizQuestion(**question)
+			self.assertTrue(set(question["correct_answers"]) <= set(question["options"]))
+
+	def test_unknown_backend_is_rejected(self):
+		with self.settings(LLM_BACKEND="missing"):
+			with self.assertRaises(ValueError):
+				get_ai_service()
+
+
+class FlakyShardBackend(FakeBackend):
+	"""Fails every shard steered at pitfalls, to check partial results survive."""
+
+	def generate(self, prompt, spec):
+		if "pitfalls" in spec.focus:
+			raise ValueError("malformed output")
+		return super().generate(prompt, spec)
+
+
+@override_settings(LLM_SHARD_SIZE=5, LLM_MAX_CONCURRENCY=4)
+class ShardedGenerationTest(TestCase):
+	def test_large_quiz_is_split_merged_and_renumbered(self):
+		service = AIService(FakeBackend(latency=0))
+		specs = service.plan_shards("python", "classes", 12, "easy")
+		self.assertEqual([s.number_of_questions for s in specs], [4, 4, 4])
+		self.assertEqual(len({s.focus for s in specs}), 3)
+
+		questions = service.generate_quiz_questions("python", "classes", 12, "easy")
+		self.assertEqual([q["id"] for q in questions], list(range(1, 13)))
+		self.assertEqual(len({q["question"] for q in questions}), 12)
+
+	def test_failed_shard_only_loses_its_questions(self):
+		service = AIService(FlakyShardBackend(latency=0))
+		questions = service.generate_quiz_questions("python", "classes", 15, "easy")
+		self.assertEqual(len(questions), 10)
+		self.assertEqual([q["id"] for q in questions], list(range(1, 11)))
+
+
+class QuestionStreamParserTest(TestCase):
+	def test_objects_are_emitted_as_soon_as_they_close(self):
+		document = '```json\n{"questions": [{"question": "Is \\"{x}\\" a set?", "options": ["[a]", "}"]}, {"question": "b"}]}\n```'
+		parser = QuestionStreamParser()
+		emitted = []
+		for i, char in enumerate(document):
+			for item in parser.feed(char):
+				emitted.append((i, item))
+		self.assertEqual([item["question"] for _, item in emitted], ['Is "{x}" a set?', "b"])
+		first_close = document.index('"}"]}') + 4
+		self.assertEqual(emitted[0][0], first_close)
+
+
+@override_settings(LLM_BACKEND="fake", FAKE_LLM_LATENCY=0, BACKGROUND_TASKS_EAGER=True,
+				   QUESTION_BANK_LOW_WATER_MARK=0)
+class StreamingGenerateQuizTest(TestCase):
+	def setUp(self):
+		question_bank.reset_topic_indexes()
+		self.user = User.objects.create_user(username="bob", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.url = reverse('generate-quiz-stream')
+		self.payload = {"domain": "python", "sub_domain": "lists", "number_of_questions": 4, "level": "easy"}
+
+	def read_events(self, response):
+		return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+	def test_questions_stream_and_are_persisted(self):
+		question_bank.store_questions("python", "lists", "easy", [make_question(1)])
+		response = self.client.post(self.url, self.payload, format="json")
+		self.assertEqual(response["Content-Type"], "application/x-ndjson")
+		events = self.read_events(response)
+		self.assertEqual([e["event"] for e in events], ["quiz", "question", "question", "question", "question", "done"])
+		self.assertEqual([e["question"]["id"] for e in events[1:5]], [1, 2, 3, 4])
+		self.assertEqual(events[1]["question"]["question"], make_question(1)["question"])
+
+		quiz = QuizHistory.objects.get(id=events[0]["quiz_id"])
+		self.assertEqual(quiz.questions, [e["question"] for e in events[1:5]])
+		self.assertEqual(question_bank.pool_size("python", "lists", "easy"), 4)
+
+	def test_server_sent_events_format(self):
+		response = self.client.post(self.url, self.payload, format="json", HTTP_ACCEPT="text/event-stream")
+		self.assertEqual(response["Content-Type"], "text/event-stream")
+		body = b"".join(response.streaming_content).decode()
+		self.assertTrue(body.startswith("event: quiz\ndata: "))
+		self.assertEqual(body.count("event: question\n"), 4)
+
+	def test_disconnect_before_first_question_frees_the_topic(self):
+		response = self.client.post(self.url, self.payload, format="json")
+		first = json.loads(next(iter(response.streaming_content)))
+		self.assertEqual(first["event"], "quiz")
+		response.close()
+		self.assertFalse(QuizHistory.objects.filter(id=first["quiz_id"]).exists())
+
+		# An empty quiz left behind some other way is replaced, not resumed.
+		stale = QuizHistory.objects.create(user=self.user, domain="python", sub_domain="lists")
+		resume = self.client.post(reverse('resume-quiz'), {"domain": "python", "sub_domain": "lists"}, format="json")
+		self.assertEqual(resume.status_code, 404)
+		events = self.read_events(self.client.post(self.url, self.payload, format="json"))
+		self.assertEqual((events[0]["resumed"], events[-1]["event"]), (False, "done"))
+		stale.refresh_from_db()
+		self.assertEqual(stale.status, "abandoned")
+
+
+@override_settings(LLM_BACKEND="fake", FAKE_LLM_LATENCY=0, BACKGROUND_TASKS_EAGER=True,
+				   QUESTION_BANK_LOW_WATER_MARK=0)
+class AsyncQuizViewsTest(TransactionTestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="carol", password="pass12345")
+		token = RefreshToken.for_user(self.user).access_token
+		self.auth = {"Authorization": f"Bearer {token}"}
+		self.client = AsyncClient()
+		self.payload = {"domain": "python", "sub_domain": "dicts", "number_of_questions": 7, "level": "medium"}
+
+	async def test_job_status_long_polls(self):
+		job = await GenerationJob.objects.acreate(user=self.user, domain="python", sub_domain="dicts", level="medium",
+												  number_of_questions=3)
+		await sync_to_async(jobs.run_generation_job)(job.id)
+		response = await self.client.get(reverse('async-generation-job', args=[job.id]), {"wait": 60}, headers=self.auth)
+		self.assertEqual((response.status_code, response.json()["status"]), (200, "succeeded"))
+		self.assertEqual(len(response.json()["questions"]), 3)
+
+	async def test_generate_then_resume_and_complete(self):
+		response = await self.client.post(reverse('async-generate-quiz'), self.payload, content_type="application/json", headers=self.auth)
+		self.assertEqual(response.status_code, 200)
+		data = response.json()
+		self.assertEqual([q["id"] for q in data["questions"]], list(range(1, 8)))
+
+		response = await self.client.post(reverse('async-resume-quiz'), {"domain": "python", "sub_domain": "dicts"},
+										  content_type="application/json", headers=self.auth)
+		self.assertEqual(response.json()["quiz_id"], data["quiz_id"])
+
+		answers = [q["correct_answers"] for q in data["questions"]]
+		response = await self.client.post(reverse('async-mark-complete', args=[data["quiz_id"]]),
+										  {"user_answers": answers}, content_type="application/json", headers=self.auth)
+		self.assertEqual(response.json()["score"], 100.0)
+
+		response = await self.client.get(reverse('async-quiz-history'), headers=self.auth)
+		self.assertEqual([q["status"] for q in response.json()["results"]], ["completed"])
+
+	async def test_record_answer(self):
+		response = await self.client.post(reverse('async-generate-quiz'), self.payload, content_type="application/json", headers=self.auth)
+		quiz_id = response.json()["quiz_id"]
+		response = await self.client.patch(reverse('async-record-answer', args=[quiz_id]), {"index": 0, "selected": 1},
+										   content_type="application/json", headers=self.auth)
+		self.assertEqual(response.status_code, 204)
+		quiz = await QuizHistory.objects.with_questions().aget(id=quiz_id)
+		self.assertEqual(quiz.user_answers, [quiz.questions[0]["options"][:1]])
+
+	async def test_requires_authentication(self):
+		response = await AsyncClient().post(reverse('async-generate-quiz'), self.payload, content_type="application/json")
+		self.assertEqual(response.status_code, 401)
+		response = await self.client.post(reverse('async-save-progress', args=[999]), {}, content_type="application/json", headers=self.auth)
+		self.assertEqual(response.status_code, 404)
+
+
+class SingleFlightTest(TestCase):
+	def test_concurrent_identical_calls_share_one_execution(self):
+		flight = SingleFlight()
+		calls = []
+		release = threading.Event()
+
+		def generate():
+			calls.append(1)
+			release.wait(2)
+			return ["shared"]
+
+		with ThreadPoolExecutor(max_workers=8) as pool:
+			futures = [pool.submit(flight.do, ("python", "classes", "easy", 5), generate) for _ in range(8)]
+			time.sleep(0.1)
+			release.set()
+			results = [f.result() for f in futures]
+		self.assertEqual(len(calls), 1)
+		self.assertTrue(all(r is results[0] for r in results))
+
+
+@override_settings(LLM_BACKEND="fake", FAKE_LLM_LATENCY=0, BACKGROUND_TASKS_EAGER=True,
+				   QUESTION_BANK_LOW_WATER_MARK=0)
+class GenerationJobTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="dave", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.payload = {"domain": "python", "sub_domain": "sets", "number_of_questions": 3, "level": "hard", "mode": "async"}
+
+	def test_async_mode_returns_job_then_quiz(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			response = self.client.post(reverse('generate-quiz'), self.payload, format="json")
+		self.assertEqual(response.status_code, 202)
+		job_id = response.json()["job_id"]
+
+		response = self.client.get(reverse('generation-job', args=[job_id]), {"wait": 1})
+		data = response.json()
+		self.assertEqual(data["status"], "succeeded")
+		self.assertEqual(len(data["questions"]), 3)
+		self.assertEqual(QuizHistory.objects.get(id=data["quiz_id"]).user, self.user)
+
+	def test_stale_jobs_are_requeued_then_failed(self):
+		# A worker that died mid-run: running, last heartbeat long ago.
+		long_ago = timezone.now() - timedelta(hours=1)
+		job = GenerationJob.objects.create(user=self.user, domain="python", sub_domain="sets", level="hard",
+										   number_of_questions=3, status="running", attempts=1, heartbeat_at=long_ago)
+		data = self.client.get(reverse('generation-job', args=[job.id])).json()
+		self.assertEqual((data["status"], len(data["questions"])), ("succeeded", 3))
+		self.assertEqual(GenerationJob.objects.get(id=job.id).attempts, 2)
+
+		job = GenerationJob.objects.create(user=self.user, domain="python", sub_domain="maps", level="hard",
+										   number_of_questions=3, status="running", attempts=2, heartbeat_at=long_ago)
+		data = self.client.get(reverse('generation-job', args=[job.id])).json()
+		self.assertEqual((data["status"], data["error"]), ("failed", "The worker running this job stopped responding."))
+
+		fresh = GenerationJob.objects.create(user=self.user, domain="python", sub_domain="sets", level="hard",
+											 number_of_questions=3, status="running", attempts=1,
+											 heartbeat_at=timezone.now())
+		self.assertEqual(self.client.get(reverse('generation-job', args=[fresh.id])).json()["status"], "running")
+
+	def test_other_users_cannot_see_job(self):
+		job = GenerationJob.objects.create(user=self.user, domain="a", sub_domain="b", level="easy", number_of_questions=1)
+		other = APIClient()
+		other.force_authenticate(User.objects.create_user(username="eve", password="pass12345"))
+		self.assertEqual(other.get(reverse('generation-job', args=[job.id])).status_code, 404)
+
+
+class NearDuplicateIndexTest(TestCase):
+	original = {
+		"question": "Which keyword is used to define a generator function that produces values lazily in Python?",
+		"options": ["yield", "return", "lambda", "async"],
+	}
+
+	def test_reworded_question_is_detected(self):
+		index = NearDuplicateIndex()
+		index.add(self.original, key="q1")
+		reworded = {
+			"question": "Which keyword is used to define a generator function that produces values lazily in Python 3?",
+			"options": ["return", "yield", "async", "lambda"],
+		}
+		unrelated = {
+			"question": "What is the time complexity of looking up a key in a Python dict on average?",
+			"options": ["O(1)", "O(n)", "O(log n)", "O(n log n)"],
+		}
+		self.assertEqual(index.query(reworded), ["q1"])
+		self.assertFalse(index.contains_near_duplicate(unrelated))
+
+	def test_ai_service_drops_near_duplicates(self):
+		exclude = NearDuplicateIndex()
+		exclude.add(self.original)
+		copy = {**self.original, "id": 1, "correct_answers": ["yield"], "explanation": "", "sub_topic": "generators"}
+		other = {**make_question(9), "id": 2}
+		kept = AIService.drop_near_duplicates([copy, other, {**other, "id": 3}], exclude)
+		self.assertEqual(kept, [{**other, "id": 1}])
+
+
+@override_settings(GENERATION_LOG_ENABLED=True)
+class GenerationInstrumentationTest(TestCase):
+	def setUp(self):
+		registry.reset()
+
+	def test_successful_and_failed_generations_are_recorded(self):
+		AIService(FakeBackend(latency=0)).generate_quiz_questions("python", "loops", 3, "easy")
+		AIService(FlakyShardBackend(latency=0)).generate_quiz_questions("python", "loops", 15, "hard")
+
+		ok, partial = GenerationLog.objects.order_by("id")
+		self.assertEqual((ok.outcome, ok.requested, ok.returned, ok.backend), ("ok", 3, 3, "fake"))
+		self.assertGreater(ok.output_tokens, 0)
+		self.assertEqual((partial.outcome, partial.shards, partial.failed_shards, partial.returned), ("partial", 3, 1, 10))
+
+		counters = {(c["name"], c["labels"].get("outcome")): c["value"] for c in registry.snapshot()["counters"]}
+		self.assertEqual(counters[("llm_generations", "ok")], 1)
+		self.assertEqual(counters[("llm_questions_returned", None)], 13)
+
+	def test_schema_errors_are_classified(self):
+		class BrokenBackend(FakeBackend):
+			def generate(self, prompt, spec):
+				raise LLMOutputError("missing field 'options'", {"output_tokens": 12, "truncated": True})
+
+		result = AIService(BrokenBackend(latency=0)).generate_quiz_questions("python", "loops", 2, "easy")
+		self.assertIn("error", result)
+		log = GenerationLog.objects.get()
+		self.assertEqual((log.outcome, log.schema_failures, log.truncated, log.output_tokens), ("schema_error", 1, True, 12))
+
+		out = StringIO()
+		call_command("generation_stats", stdout=out)
+		self.assertIn("python", out.getvalue())
+
+
+class ResilientBackendTest(TestCase):
+	def setUp(self):
+		registry.reset()
+
+	def resilient(self, faults, attempts=3, **kwargs):
+		inner = FaultyBackend(faults, latency=0, slow_latency=kwargs.pop("slow_latency", 1.0))
+		return ResilientBackend(inner, retry=RetryPolicy(attempts, base_delay=0), **kwargs)
+
+	def counter(self, name):
+		return sum(c["value"] for c in registry.snapshot()["counters"] if c["name"] == name)
+
+	def test_transient_and_malformed_responses_are_retried(self):
+		backend = self.resilient(["error", "malformed"])
+		questions = AIService(backend).generate_quiz_questions("python", "loops", 3, "easy")
+		self.assertEqual(len(questions), 3)
+		self.assertEqual(self.counter("llm_retries"), 2)
+		self.assertEqual(backend.breaker.state, CircuitBreaker.CLOSED)
+
+	def test_slow_call_is_hedged(self):
+		backend = self.resilient(["slow"], hedge_after=0.05)
+		started = time.monotonic()
+		questions = AIService(backend).generate_quiz_questions("python", "loops", 3, "easy")
+		self.assertLess(time.monotonic() - started, 0.5)
+		self.assertEqual(len(questions), 3)
+		self.assertEqual(self.counter("llm_hedges"), 1)
+
+	def test_attempts_time_out(self):
+		backend = self.resilient(["slow"], attempts=1, timeout=0.1, slow_latency=0.5)
+		with self.assertRaises(TimeoutError):
+			backend.generate("prompt", QuizSpec("python", "loops", "easy", 3))
+
+	async def test_async_calls_are_retried_and_hedged(self):
+		backend = self.resilient(["error", "slow"], hedge_after=0.05)
+		questions = await AIService(backend).agenerate_quiz_questions("python", "loops", 3, "easy")
+		self.assertEqual(len(questions), 3)
+		self.assertEqual((self.counter("llm_retries"), self.counter("llm_hedges")), (1, 1))
+
+	def test_breaker_opens_then_lets_one_trial_through(self):
+		now = [0.0]
+		breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+		breaker.record_failure()
+		breaker.allow()
+		breaker.record_failure()
+		with self.assertRaises(CircuitOpenError):
+			breaker.allow()
+
+		now[0] = 10
+		self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+		breaker.allow()
+		with self.assertRaises(CircuitOpenError):
+			breaker.allow()
+		breaker.record_success()
+		self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+@override_settings(
+	LLM_BACKEND="faulty", FAULTY_LLM_FAILURE_RATE=1, FAULTY_LLM_SLOW_RATE=0, FAULTY_LLM_MALFORMED_RATE=0,
+	LLM_RETRY_ATTEMPTS=2, LLM_RETRY_BASE_DELAY=0, LLM_CIRCUIT_FAILURE_THRESHOLD=2,
+	BACKGROUND_TASKS_EAGER=True, QUESTION_BANK_LOW_WATER_MARK=0,
+)
+class DegradedProviderTest(TestCase):
+	def setUp(self):
+		question_bank.reset_topic_indexes()
+		self.user = User.objects.create_user(username="carol", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		bank = [make_question(n) for n in range(1, 4)]
+		question_bank.store_questions("python", "loops", "easy", bank)
+		QuizHistory.objects.create(user=self.user, domain="python", sub_domain="loops", questions=bank, status="completed")
+
+	def test_open_circuit_serves_seen_bank_questions(self):
+		payload = {"domain": "python", "sub_domain": "loops", "number_of_questions": 3, "level": "easy"}
+		response = self.client.post(reverse('generate-quiz'), payload, format="json")
+		self.assertEqual(response.status_code, 200)
+		texts = sorted(q["question"] for q in response.json()["questions"])
+		self.assertEqual(texts, sorted(make_question(n)["question"] for n in range(1, 4)))
+
+		backend = get_ai_service().backend
+		self.assertEqual(backend.breaker.state, CircuitBreaker.OPEN)
+		with self.assertRaises(CircuitOpenError):
+			backend.generate("prompt", QuizSpec("python", "loops", "easy", 3))
+
+
+@override_settings(
+	LLM_BACKEND="fake", FAKE_LLM_LATENCY=0, BACKGROUND_TASKS_EAGER=True, QUESTION_BANK_LOW_WATER_MARK=0,
+	GENERATION_BUCKET_CAPACITY=10, GENERATION_BUCKET_REFILL_PER_MINUTE=60, GENERATION_MAX_IN_FLIGHT=2,
+)
+class AdmissionControlTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		question_bank.reset_topic_indexes()
+		self.user = User.objects.create_user(username="dave", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def generate(self, sub_domain, number_of_questions):
+		payload = {"domain": "python", "sub_domain": sub_domain, "number_of_questions": number_of_questions, "level": "easy"}
+		return self.client.post(reverse('generate-quiz'), payload, format="json")
+
+	def test_budget_is_weighted_by_question_count(self):
+		self.assertEqual(self.generate("loops", 8).status_code, 200)
+		response = self.generate("classes", 5)
+		self.assertEqual(response.status_code, 429)
+		self.assertEqual(response["Retry-After"], "3")
+		self.assertEqual(self.generate("classes", 2).status_code, 200)
+		# Resuming an existing quiz costs nothing.
+		self.assertEqual(self.generate("loops", 8).json()["message"], "Incomplete quiz found. Resuming...")
+
+	def test_global_cap_on_generations_in_flight(self):
+		pool = admission.generation_slots()
+		held = [pool.acquire(), pool.acquire()]
+		response = self.generate("loops", 2)
+		self.assertEqual((response.status_code, response["Retry-After"]), (429, "5"))
+
+		pool.release(held[0])
+		self.assertEqual(self.generate("loops", 2).status_code, 200)
+		self.assertEqual(pool.in_use(), 1)
+
+	def test_stream_releases_its_slot_if_the_quiz_cannot_be_created(self):
+		payload = {"domain": "python", "sub_domain": "loops", "number_of_questions": 2, "level": "easy"}
+		with mock.patch.object(QuizHistory.objects, "get_or_create", side_effect=IntegrityError("race")):
+			with self.assertRaises(IntegrityError):
+				self.client.post(reverse('generate-quiz-stream'), payload, format="json")
+		self.assertEqual(admission.generation_slots().in_use(), 0)
+
+	def test_token_bucket_refills_over_time(self):
+		bucket = admission.TokenBucket(capacity=10, refill_per_second=2)
+		self.assertEqual(bucket.consume("k", 10, now=100.0), 0)
+		self.assertEqual(bucket.consume("k", 4, now=101.0), 1.0)
+		self.assertEqual(bucket.consume("k", 4, now=102.0), 0)
+
+
+class QuestionStorageTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="erin", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def test_shared_questions_are_stored_once(self):
+		QuizHistory.objects.create(
+			user=self.user, domain="python", sub_domain="loops", questions=[make_question(1), make_question(2)], status="completed",
+		)
+		placeholder = {"question": "Placeholder question 2", "correct_answers": ["N/A"]}
+		quiz = QuizHistory.objects.create(
+			user=self.user, domain="python", sub_domain="loops", questions=[{**make_question(1), "id": 5}, placeholder],
+		)
+		self.assertEqual(Question.objects.count(), 3)
+		self.assertEqual(Question.objects.filter(quiz_links__quiz__user=self.user).distinct().count(), 3)
+
+		quiz = QuizHistory.objects.get(id=quiz.id)
+		self.assertEqual(quiz.questions, [{**make_question(1), "id": 5}, placeholder])
+
+		quiz.questions = [make_question(3)]
+		quiz.save()
+		quiz.refresh_from_db()
+		self.assertEqual(quiz.questions, [make_question(3)])
+
+	def test_history_keeps_inline_shape_without_per_quiz_queries(self):
+		for n in range(3):
+			QuizHistory.objects.create(user=self.user, domain="python", sub_domain=f"t{n}", questions=[make_question(n)])
+		with self.assertNumQueries(2):
+			data = self.client.get(reverse('quiz-history'), {"include": "questions"}).json()["results"]
+		self.assertEqual(sorted(q["questions"][0]["question"] for q in data),
+						 [make_question(n)["question"] for n in range(3)])
+
+
+@override_settings(LLM_BACKEND="fake", FAKE_LLM_LATENCY=0, BACKGROUND_TASKS_EAGER=True, QUESTION_BANK_LOW_WATER_MARK=0)
+class IncompleteQuizUniquenessTest(TestCase):
+	def setUp(self):
+		question_bank.reset_topic_indexes()
+		self.user = User.objects.create_user(username="frank", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def test_only_one_incomplete_quiz_per_topic(self):
+		QuizHistory.objects.create(user=self.user, domain="python", sub_domain="loops", questions=[], status="incomplete")
+		with self.assertRaises(IntegrityError), transaction.atomic():
+			QuizHistory.objects.create(user=self.user, domain="python", sub_domain="loops", questions=[], status="incomplete")
+		QuizHistory.objects.create(user=self.user, domain="python", sub_domain="loops", questions=[], status="completed")
+
+	def test_lost_creation_race_resumes_the_winner(self):
+		payload = {"domain": "python", "sub_domain": "loops", "number_of_questions": 2, "level": "easy"}
+		real_assemble = question_bank.assemble_quiz
+
+		def assemble_while_another_request_wins(**kwargs):
+			winner = QuizHistory.objects.create(
+				user=self.user, domain="python", sub_domain="loops", questions=[make_question(9)],
+			)
+			self.winner_id = winner.id
+			return real_assemble(**kwargs)
+
+		with mock.patch("api.question_bank.assemble_quiz", side_effect=assemble_while_another_request_wins):
+			response = self.client.post(reverse('generate-quiz'), payload, format="json")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.json()["quiz_id"], self.winner_id)
+		self.assertEqual(QuizHistory.objects.filter(status="incomplete").count(), 1)
+
+	def test_history_is_newest_first(self):
+		for sub_domain in ("a", "b", "c"):
+			QuizHistory.objects.create(user=self.user, domain="python", sub_domain=sub_domain, questions=[])
+		data = self.client.get(reverse('quiz-history')).json()["results"]
+		self.assertEqual([q["sub_domain"] for q in data], ["c", "b", "a"])
+
+
+class QuizHistoryPaginationTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="grace", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		questions = [make_question(n) for n in range(10)]
+		for n in range(25):
+			QuizHistory.objects.create(
+				user=self.user, domain="python", sub_domain=f"t{n}", questions=questions,
+				user_answers=[["x"]] * 10, status="completed", score=n,
+			)
+
+	def test_cursor_pages_cover_history_once(self):
+		url, seen = reverse('quiz-history') + "?page_size=10", []
+		while url:
+			with self.assertNumQueries(1):
+				page = self.client.get(url).json()
+			seen += [q["score"] for q in page["results"]]
+			url = page["next"]
+		self.assertEqual(seen, [float(n) for n in range(24, -1, -1)])
+
+	def test_summary_leaves_out_questions_and_answers(self):
+		summary = self.client.get(reverse('quiz-history'), {"page_size": 25})
+		full = self.client.get(reverse('quiz-history'), {"page_size": 25, "include": "questions"})
+		item = summary.json()["results"][0]
+		self.assertEqual(set(item), {"id", "domain", "sub_domain", "score", "status", "created_at", "updated_at"})
+		self.assertLess(len(summary.content), 200 * 25)
+		self.assertLess(len(summary.content) * 10, len(full.content))
+		self.assertEqual(len(full.json()["results"][0]["questions"]), 10)
+
+	def test_summary_is_one_aggregate_query(self):
+		QuizHistory.objects.create(user=self.user, domain="python", sub_domain="open", questions=[make_question(1)])
+		with self.assertNumQueries(1):
+			data = self.client.get(reverse('quiz-history-summary')).json()
+		self.assertEqual(data, {"total": 26, "completed": 25, "incomplete": 1,
+								"max_score": 24.0, "min_score": 0.0, "average_score": 12.0})
+
+	def test_status_filter_and_detail(self):
+		QuizHistory.objects.create(user=self.user, domain="python", sub_domain="open", questions=[make_question(1)])
+		results = self.client.get(reverse('quiz-history'), {"status": "incomplete"}).json()["results"]
+		self.assertEqual([q["sub_domain"] for q in results], ["open"])
+
+		detail = self.client.get(reverse('quiz-detail', args=[results[0]["id"]])).json()
+		self.assertEqual(detail["questions"], [make_question(1)])
+		other = User.objects.create_user(username="heidi", password="pass12345")
+		self.client.force_authenticate(other)
+		self.assertEqual(self.client.get(reverse('quiz-detail', args=[results[0]["id"]])).status_code, 404)
+
+
+class AnswerProgressTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="heidi", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.questions = [make_question(n) for n in range(1, 5)]
+		self.quiz = QuizHistory.objects.create(user=self.user, domain="python", sub_domain="sets", questions=self.questions)
+
+	def test_one_answer_is_one_row_update(self):
+		url = reverse('record-answer', args=[self.quiz.id])
+		# The answer's row, then the quiz's updated_at (its ETag).
+		with self.assertNumQueries(2):
+			response = self.client.patch(url, {"index": 1, "selected": 0b0110}, format="json")
+		self.assertEqual(response.status_code, 204)
+
+		self.quiz.refresh_from_db()
+		self.assertEqual(self.quiz.user_answers, [[], ["2-b", "2-c"]])
+		response = self.client.post(reverse('resume-quiz'), {"domain": "python", "sub_domain": "sets"}, format="json")
+		self.assertEqual(response.json()["user_answers"], [[], ["2-b", "2-c"]])
+
+	def test_rejects_bad_index_other_users_and_completed_quizzes(self):
+		url = reverse('record-answer', args=[self.quiz.id])
+		self.assertEqual(self.client.patch(url, {"index": 4, "selected": 1}, format="json").status_code, 404)
+		self.assertEqual(self.client.patch(url, {"index": 0, "selected": -1}, format="json").status_code, 400)
+
+		other = APIClient()
+		other.force_authenticate(User.objects.create_user(username="ivan", password="pass12345"))
+		self.assertEqual(other.patch(url, {"index": 0, "selected": 1}, format="json").status_code, 404)
+
+		QuizHistory.objects.filter(id=self.quiz.id).update(status="completed")
+		self.assertEqual(self.client.patch(url, {"index": 0, "selected": 1}, format="json").status_code, 404)
+
+	def test_full_answer_arrays_are_still_accepted(self):
+		self.client.post(reverse('save-progress', args=[self.quiz.id]),
+						 {"user_answers": [["1-A "], None, ["3-c", "not an option"]], "current_question_index": 2}, format="json")
+		self.quiz.refresh_from_db()
+		self.assertEqual(self.quiz.user_answers, [["1-a"], [], ["3-c"]])
+		self.assertEqual(self.quiz.current_question_index, 2)
+
+		self.client.patch(reverse('record-answer', args=[self.quiz.id]), {"index": 1, "selected": 1}, format="json")
+		response = self.client.post(reverse('mark-complete', args=[self.quiz.id]), {}, format="json")
+		self.assertEqual(response.json()["user_answers"], [["1-a"], ["2-a"], ["3-c"]])
+
+
+@override_settings(PROGRESS_WRITE_BEHIND=True, PROGRESS_FLUSH_INTERVAL=3600)
+class WriteBehindProgressTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		progress.flush()
+		self.user = User.objects.create_user(username="judy", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.quiz = QuizHistory.objects.create(user=self.user, domain="python", sub_domain="tuples",
+											   questions=[make_question(n) for n in range(1, 5)])
+
+	def stored(self):
+		quiz = QuizHistory.objects.get(id=self.quiz.id)
+		return quiz.current_question_index, quiz.user_answers
+
+	def test_saves_coalesce_in_the_buffer_until_flushed(self):
+		for index in range(3):
+			self.client.post(reverse('save-progress', args=[self.quiz.id]), {"current_question_index": index}, format="json")
+		self.client.patch(reverse('record-answer', args=[self.quiz.id]), {"index": 0, "selected": 1}, format="json")
+		self.client.patch(reverse('record-answer', args=[self.quiz.id]), {"index": 2, "selected": 4}, format="json")
+		self.assertEqual(self.stored(), (0, []))
+		self.assertEqual(progress.pending_count(), 1)
+
+		response = self.client.post(reverse('resume-quiz'), {"domain": "python", "sub_domain": "tuples"}, format="json").json()
+		self.assertEqual((response["current_question_index"], response["user_answers"]), (2, [["1-a"], [], ["3-c"]]))
+
+		self.assertEqual(progress.flush(), 1)
+		self.assertEqual(self.stored(), (2, [["1-a"], [], ["3-c"]]))
+		self.assertEqual(progress.pending_count(), 0)
+
+	def test_completion_flushes_first(self):
+		self.client.patch(reverse('record-answer', args=[self.quiz.id]), {"index": 1, "selected": 2}, format="json")
+		response = self.client.post(reverse('mark-complete', args=[self.quiz.id]), {}, format="json").json()
+		self.assertEqual(response["user_answers"], [[], ["2-b"]])
+		self.assertEqual(progress.pending_count(), 0)
+		self.assertEqual(self.client.patch(reverse('record-answer', args=[self.quiz.id]), {"index": 1, "selected": 1},
+										   format="json").status_code, 404)
+
+	def test_save_during_flush_is_kept(self):
+		progress.buffer_answer(self.quiz.id, 0, 1)
+		bulk_update = QuizHistory.objects.bulk_update
+
+		def save_meanwhile(*args, **kwargs):
+			progress.buffer_answer(self.quiz.id, 1, 1)
+			return bulk_update(*args, **kwargs)
+
+		with mock.patch.object(QuizHistory.objects, 'bulk_update', side_effect=save_meanwhile):
+			progress.flush()
+		self.assertEqual(self.stored()[1], [["1-a"]])
+		self.assertEqual(progress.pending_count(), 1)
+		progress.flush()
+		self.assertEqual(self.stored()[1], [["1-a"], ["2-a"]])
+
+
+class ScoringTest(TestCase):
+	def test_modes(self):
+		# Correct options are a and c (0b0101).
+		keys, selected = [0b0101] * 4 + [0], [0b0101, 0b0001, 0b0111, 0, 0]
+		self.assertEqual(scoring.credit(keys, selected, "exact").tolist(), [1, 0, 0, 0, 0])
+		self.assertEqual(scoring.credit(keys, selected, "partial").tolist(), [1, 0.5, 0.5, 0, 0])
+		self.assertEqual(scoring.credit(keys, selected, "jaccard").round(3).tolist(), [1, 0.5, 0.667, 0, 0])
+		with self.assertRaises(ValueError):
+			scoring.credit(keys, selected, "bogus")
+
+	def test_calculate_score_matches_options_case_insensitively(self):
+		questions = [make_question(n) for n in range(4)]
+		self.assertEqual(scoring.calculate_score(questions, [["0-A"], [" 1-a "], ["2-b"]]), 50.0)
+		self.assertEqual(scoring.calculate_score([], []), 0)
+
+	def test_regrade_rescores_history_after_an_answer_key_fix(self):
+		user = User.objects.create_user(username="ken", password="pass12345")
+		questions = [make_question(n) for n in range(2)]
+		for n in range(5):
+			QuizHistory.objects.create(user=user, domain="python", sub_domain=f"t{n}", questions=questions,
+									   user_answers=[["0-b"], ["1-a"]], status="completed", score=50.0)
+		QuizHistory.objects.create(user=user, domain="python", sub_domain="open", questions=questions,
+								   user_answers=[["0-b"]])
+
+		question = Question.objects.get(fingerprint=Question.fingerprint_for({k: v for k, v in questions[0].items() if k != "id"}))
+		question.content = {**question.content, "correct_answers": ["0-b"]}
+		question.save()
+
+		out = StringIO()
+		call_command("regrade", "--chunk-size", "2", stdout=out)
+		self.assertIn("Rescored 5 quizzes", out.getvalue())
+		self.assertEqual(set(QuizHistory.objects.values_list("score", flat=True)), {100.0, None})
+
+
+class PerformanceRollupTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="leo", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+
+	def complete(self, sub_domain, answers):
+		questions = [make_question(n, sub_topic="Loops" if n % 2 else "Slicing") for n in range(4)]
+		quiz = QuizHistory.objects.create(user=self.user, domain="Python", sub_domain=sub_domain, questions=questions)
+		return self.client.post(reverse('mark-complete', args=[quiz.id]), {"user_answers": answers}, format="json")
+
+	def stats(self, query=""):
+		with self.assertNumQueries(1):
+			return self.client.get(reverse('performance-stats') + query).json()["topics"]
+
+	def test_completion_updates_rollup_incrementally(self):
+		self.complete("lists", [["0-a"], ["1-a"], ["2-b"]])
+		quiz_id = self.complete("lists", [["0-a"], [], ["2-a"], ["3-a"]]).json()["id"]
+		self.client.post(reverse('mark-complete', args=[quiz_id]), {}, format="json")
+
+		topics = {t["sub_topic"]: t for t in self.stats("?domain=python")}
+		self.assertEqual(TopicPerformance.objects.count(), 2)
+		self.assertEqual((topics["loops"]["questions"], topics["loops"]["answered"], topics["loops"]["accuracy"]), (4, 2, 50.0))
+		self.assertEqual((topics["slicing"]["questions"], topics["slicing"]["accuracy"]), (4, 75.0))
+		self.assertEqual([d["questions"] for d in topics["loops"]["days"]], [4])
+		self.assertEqual(self.stats("?sub_domain=dicts"), [])
+		self.assertEqual(self.client.get(reverse('performance-stats') + "?days=0").status_code, 400)
+
+	def test_rebuild_matches_incremental_rollup(self):
+		self.complete("lists", [["0-a"], ["1-a"], ["2-b"]])
+		self.complete("dicts", [["0-b"], ["1-a"]])
+		before = self.stats()
+		TopicPerformance.objects.all().delete()
+		out = StringIO()
+		call_command("rebuild_rollups", "--chunk-size", "1", stdout=out)
+		self.assertIn("Wrote 4 rollup rows", out.getvalue())
+		self.assertEqual(self.stats(), before)
+
+	def test_migration_backfills_quizzes_completed_before_the_rollup(self):
+		self.complete("lists", [["0-a"], ["1-a"], ["2-b"]])
+		self.complete("dicts", [["0-b"], [], ["2-a"], ["3-a"]])
+		before = self.stats()
+		TopicPerformance.objects.all().delete()
+		import_module("api.migrations.0018_backfill_topic_performance").forwards(django_apps, None)
+		self.assertEqual(self.stats(), before)
+
+
+class LeaderboardTest(TestCase):
+	def setUp(self):
+		self.users = [User.objects.create_user(username=name, password="pass12345") for name in ("mia", "ned", "ola")]
+		self.questions = [make_question(n) for n in range(4)]
+
+	def complete(self, user, domain, correct):
+		client = APIClient()
+		client.force_authenticate(user)
+		quiz = QuizHistory.objects.create(user=user, domain=domain, sub_domain="basics", questions=self.questions)
+		answers = [[f"{n}-a" if n < correct else f"{n}-b"] for n in range(4)]
+		client.post(reverse('mark-complete', args=[quiz.id]), {"user_answers": answers}, format="json")
+		return client
+
+	def test_boards_update_on_completion(self):
+		mia, ned, ola = self.users
+		self.complete(mia, "Python", 4)
+		self.complete(mia, "python", 2)
+		self.complete(ned, "Python", 3)
+		client = self.complete(ola, "SQL", 4)
+
+		# Top-K and the user's own entry; ola has no python entry, so no rank count.
+		with self.assertNumQueries(2):
+			board = client.get(reverse('leaderboard'), {"domain": "python", "by": "average"}).json()
+		self.assertEqual([(e["username"], e["rank"], e["average_score"]) for e in board["top"]],
+						 [("mia", 1, 75.0), ("ned", 1, 75.0)])
+		self.assertIsNone(board["me"])
+
+		with self.assertNumQueries(3):
+			board = client.get(reverse('leaderboard'), {"limit": 2}).json()
+		self.assertEqual([(e["username"], e["rank"]) for e in board["top"]], [("mia", 1), ("ola", 1)])
+		self.assertEqual(board["me"], {"rank": 1, "username": "ola", "quizzes": 1, "best_score": 100.0, "average_score": 100.0})
+		self.assertEqual(leaderboard.rank_of(ned)["rank"], 3)
+		self.assertEqual(client.get(reverse('leaderboard'), {"by": "worst"}).status_code, 400)
+
+	def test_rebuild_matches_incremental_boards(self):
+		for user, correct in zip(self.users, (1, 3, 2)):
+			self.complete(user, "python", correct)
+			self.complete(user, "sql", 4 - correct)
+		before = sorted(LeaderboardEntry.objects.values_list("domain", "user_id", "quizzes", "best_score", "average_score"))
+		LeaderboardEntry.objects.all().delete()
+		call_command("rebuild_leaderboards", stdout=StringIO())
+		self.assertEqual(sorted(LeaderboardEntry.objects.values_list("domain", "user_id", "quizzes", "best_score", "average_score")), before)
+
+	def test_migration_backfills_quizzes_completed_before_the_boards(self):
+		self.complete(self.users[0], "python", 3)
+		self.complete(self.users[0], "Python", 1)
+		self.complete(self.users[1], "sql", 4)
+		before = sorted(LeaderboardEntry.objects.values_list("domain", "user_id", "quizzes", "best_score", "average_score"))
+		LeaderboardEntry.objects.all().delete()
+		import_module("api.migrations.0019_backfill_leaderboard").forwards(django_apps, None)
+		self.assertEqual(sorted(LeaderboardEntry.objects.values_list("domain", "user_id", "quizzes", "best_score", "average_score")), before)
+		self.assertEqual(leaderboard.rank_of(self.users[0], "python")["rank"], 1)
+
+
+class TransferTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="pia", password="pass12345")
+
+	def test_export_history_streams_each_quiz(self):
+		questions = [make_question(n) for n in range(3)]
+		QuizHistory.objects.create(user=self.user, domain="Python", sub_domain="lists", questions=questions,
+								   user_answers=[["0-a"], [], ["2-b", "2-c"]])
+		QuizHistory.objects.create(user=self.user, domain="SQL", sub_domain="joins", questions=questions[:1])
+
+		out, err = StringIO(), StringIO()
+		# One cursor over the quizzes, plus their question links once per chunk.
+		with self.assertNumQueries(3):
+			call_command("export_quiz_history", "-", "--chunk-size", "1", stdout=out, stderr=err)
+		records = [json.loads(line) for line in out.getvalue().splitlines()]
+		self.assertEqual([r["domain"] for r in records], ["Python", "SQL"])
+		self.assertEqual(records[0]["questions"], questions)
+		self.assertEqual(records[0]["user_answers"], [["0-a"], [], ["2-b", "2-c"]])
+		self.assertIn("Exported 2 quizzes", err.getvalue())
+
+		out = StringIO()
+		call_command("export_quiz_history", "-", "--format", "csv", "--domain", "python", stdout=out, stderr=StringIO())
+		rows = list(csv.DictReader(StringIO(out.getvalue())))
+		self.assertEqual([(r["position"], r["user_answer"]) for r in rows], [("0", '["0-a"]'), ("1", "[]"), ("2", '["2-b", "2-c"]')])
+		self.assertEqual(json.loads(rows[1]["options"]), questions[1]["options"])
+
+	def test_import_round_trips_through_export(self):
+		good = {k: v for k, v in make_question(1).items() if k != "id"}
+		lines = [
+			json.dumps({"domain": "Python ", "sub_domain": "Lists", "level": "easy",
+						"questions": [good, make_question(2), {**make_question(3), "correct_answers": ["nope"]}]}),
+			"not json",
+			json.dumps({"domain": "python", "sub_domain": "lists", "level": "expert", "questions": [good]}),
+			json.dumps({"domain": "python", "sub_domain": "lists", "level": "easy", "questions": [good, {"question": "?"}]}),
+		]
+		with open(self.tmp("sets.ndjson"), "w") as f:
+			f.write("\n".join(lines))
+		out, err = StringIO(), StringIO()
+		call_command("import_questions", self.tmp("sets.ndjson"), "--batch-size", "1", stdout=out, stderr=err)
+		self.assertIn("added 2, already in the bank 1, invalid 4", out.getvalue())
+		self.assertIn("line 1: correct_answers", err.getvalue())
+		self.assertIn("line 4: options: Field required", err.getvalue())
+		self.assertEqual(set(BankQuestion.objects.values_list("domain", "sub_domain", "level", "sub_topic")),
+						 {("python", "lists", "easy", "basics")})
+
+		for fmt in ("ndjson", "csv"):
+			path = self.tmp(f"bank.{fmt}")
+			call_command("export_question_bank", path, stdout=StringIO())
+			BankQuestion.objects.all().delete()
+			call_command("import_questions", path, stdout=out)
+			self.assertEqual(BankQuestion.objects.count(), 2)
+			self.assertEqual(Question.objects.count(), 2)
+
+		with self.assertRaisesMessage(CommandError, "Too many invalid questions"):
+			call_command("import_questions", self.tmp("sets.ndjson"), "--max-errors", "1", stdout=StringIO(), stderr=StringIO())
+
+	def tmp(self, name):
+		if not hasattr(self, "tmpdir"):
+			self.tmpdir = tempfile.TemporaryDirectory()
+			self.addCleanup(self.tmpdir.cleanup)
+		return os.path.join(self.tmpdir.name, name)
+
+
+@override_settings(LLM_BACKEND="fake", FAKE_LLM_LATENCY=0, LLM_SHARD_SIZE=5)
+class PrewarmTest(TransactionTestCase):
+	def setUp(self):
+		self.tmpdir = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmpdir.cleanup)
+		self.catalog = os.path.join(self.tmpdir.name, "catalog.json")
+		with open(self.catalog, "w") as f:
+			json.dump([{"domain": "Python", "sub_domains": ["Lists", "Dicts"], "levels": ["easy"]},
+					   {"domain": "python ", "sub_domain": "lists", "levels": ["easy", "hard"]}], f)
+		question_bank.reset_topic_indexes()
+		self.addCleanup(question_bank.reset_topic_indexes)
+
+	def test_read_catalog(self):
+		with open(self.catalog) as f:
+			self.assertEqual([t.key for t in prewarm.read_catalog(f)], ["python/lists/easy", "python/dicts/easy", "python/lists/hard"])
+		with self.assertRaisesMessage(prewarm.CatalogError, "entry 1: levels"):
+			prewarm.read_catalog(StringIO('[{"domain": "x", "sub_domain": "y", "levels": ["expert"]}]'))
+
+	def test_fills_each_pool_and_resumes_from_checkpoint(self):
+		out = StringIO()
+		call_command("prewarm_catalog", self.catalog, "--questions", "5", "--batch-size", "5", "--workers", "2", stdout=out)
+		self.assertIn("Done: 3/3 topics (0 already done), 0 failed, 0 short of target", out.getvalue())
+		for sub_domain, level in (("lists", "easy"), ("dicts", "easy"), ("lists", "hard")):
+			self.assertGreaterEqual(question_bank.pool_size("python", sub_domain, level), 5)
+		with open(self.catalog + ".done") as f:
+			self.assertEqual(len(f.read().split()), 3)
+
+		out = StringIO()
+		call_command("prewarm_catalog", self.catalog, "--dry-run", stdout=out)
+		self.assertIn("0 of 3 topics to prewarm", out.getvalue())
+		with mock.patch("api.prewarm.get_ai_service") as get_ai_service:
+			call_command("prewarm_catalog", self.catalog, "--questions", "5", stdout=StringIO())
+		get_ai_service.assert_not_called()
+
+	def test_failed_topics_are_reported_and_left_for_the_next_run(self):
+		limiter = prewarm.RateLimiter(per_minute=6000, burst=1)
+		topics = [prewarm.Topic("Go", "channels", "easy")]
+		checkpoint = prewarm.Checkpoint(os.path.join(self.tmpdir.name, "go.done"))
+		with mock.patch("api.prewarm.get_ai_service") as get_ai_service:
+			get_ai_service.return_value.generate_quiz_questions.return_value = {"error": "quota exceeded", "questions": []}
+			stats = prewarm.prewarm(topics, 3, 1, 3, checkpoint, limiter, RetryPolicy(attempts=2, base_delay=0))
+		self.assertEqual(get_ai_service.return_value.generate_quiz_questions.call_count, 2)
+		self.assertEqual((stats.done, stats.failed, stats.failures), (0, 1, {"go/channels/easy": "quota exceeded"}))
+		self.assertNotIn(topics[0], prewarm.Checkpoint(checkpoint.path))
+
+
+class ConditionalGetTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		progress.flush()
+		self.user = User.objects.create_user(username="kim", password="pass12345")
+		self.client = APIClient()
+		self.client.force_authenticate(self.user)
+		self.quiz = QuizHistory.objects.create(user=self.user, domain="python", sub_domain="lists",
+											   questions=[make_question(n) for n in range(1, 21)])
+		self.resume = reverse('resume-quiz') + "?domain=python&sub_domain=lists"
+
+	def test_unchanged_quiz_is_not_modified(self):
+		response = self.client.get(self.resume)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(len(response.json()["questions"]), 20)
+		self.assertIn("Last-Modified", response)
+
+		# Only the quiz lookup; its questions are not loaded.
+		with self.assertNumQueries(1):
+			cached = self.client.get(self.resume, HTTP_IF_NONE_MATCH=response["ETag"])
+		self.assertEqual((cached.status_code, cached.content, cached["ETag"]), (304, b"", response["ETag"]))
+		self.assertEqual(self.client.get(self.resume, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304)
+
+		self.client.patch(reverse('record-answer', args=[self.quiz.id]), {"index": 0, "selected": 1}, format="json")
+		changed = self.client.get(self.resume, HTTP_IF_NONE_MATCH=response["ETag"])
+		self.assertEqual(changed.status_code, 200)
+		self.assertEqual(changed.json()["user_answers"], [["1-a"]])
+		self.assertNotEqual(changed["ETag"], response["ETag"])
+
+	def test_history_and_detail(self):
+		# Scores change as regrade changes them, without touching updated_at.
+		for score, url in enumerate((reverse('quiz-history') + "?include=questions",
+									 reverse('quiz-detail', args=[self.quiz.id])), 1):
+			etag = self.client.get(url)["ETag"]
+			self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+			QuizHistory.objects.filter(id=self.quiz.id).update(score=score)
+			self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+		other_page = self.client.get(reverse('quiz-history') + "?status=completed")["ETag"]
+		self.assertNotEqual(self.client.get(reverse('quiz-history'))["ETag"], other_page)
+
+	@override_settings(PROGRESS_WRITE_BEHIND=True)
+	def test_buffered_progress_changes_the_etag(self):
+		response = self.client.get(self.resume)
+		self.client.patch(reverse('record-answer', args=[self.quiz.id]), {"index": 1, "selected": 2}, format="json")
+		changed = self.client.get(self.resume, HTTP_IF_NONE_MATCH=response["ETag"],
+								  HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+		self.assertEqual(changed.status_code, 200)
+		self.assertNotIn("Last-Modified", changed)
+		progress.flush()
+
+	def test_large_responses_are_compressed(self):
+		plain = self.client.get(self.resume)
+		response = self.client.get(self.resume, HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+		self.assertEqual(response["Content-Encoding"], "gzip")
+		self.assertEqual(gzip.decompress(response.content), plain.content)
+		self.assertLess(len(response.content) * 3, len(plain.content))
+		self.assertEqual(response["ETag"], "W/" + plain["ETag"])
+		self.assertEqual(self.client.get(self.resume, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+		small = self.client.get(reverse('quiz-history'), HTTP_ACCEPT_ENCODING="gzip")
+		self.assertFalse(small.has_header("Content-Encoding"))
+		self.assertEqual(compression.choose_encoding("identity, gzip;q=0"), None)
+		self.assertEqual(compression.choose_encoding("*"), "br" if compression.brotli else "gzip")
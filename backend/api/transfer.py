@@ -0,0 +1,312 @@
+"""
+Streaming export of quiz history and the question bank, and bulk import of
+question sets.
+
+Exports read rows in chunks through ``iterator()`` and write each record as
+it is produced, so memory stays flat however many rows there are. Two
+formats are written:
+
+- ``ndjson``: one JSON object per line; a quiz with its questions and
+  answers, or a set of questions for one topic and level
+- ``csv``: flat, one row per question, for spreadsheets and columnar tools;
+  list-valued columns hold JSON
+
+Imports read either format back, validate every question against
+``QuizQuestion`` and add them to the bank with ``bulk_create`` in batches.
+"""
+import csv
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import IO, Iterable, Iterator, List, Tuple
+
+from django.db import transaction
+from pydantic import ValidationError
+
+from . import scoring
+from .models import BankQuestion, Question, QuizHistoryQuestion, decode_answers, join_question
+from .question_bank import normalize_key, question_fingerprint, reset_topic_indexes
+from .services import QuizQuestion
+
+FORMATS = ('ndjson', 'csv')
+
+HISTORY_COLUMNS = [
+    'quiz_id', 'username', 'domain', 'sub_domain', 'status', 'score', 'current_question_index',
+    'created_at', 'updated_at', 'position', 'item_id', 'question', 'options', 'correct_answers',
+    'explanation', 'sub_topic', 'user_answer',
+]
+QUESTION_FIELDS = ['question', 'options', 'correct_answers', 'explanation', 'sub_topic']
+BANK_COLUMNS = ['domain', 'sub_domain', 'level', *QUESTION_FIELDS]
+LEVELS = {level for level, _ in BankQuestion.LEVEL_CHOICES}
+
+
+def format_for(path: str, fmt=None) -> str:
+    """``fmt`` if given, else ``csv`` for a .csv path and ``ndjson`` otherwise."""
+    if fmt:
+        return fmt
+    return 'csv' if str(path).lower().endswith('.csv') else 'ndjson'
+
+
+def _cell(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return '' if value is None else value
+
+
+def write_ndjson(records: Iterable[dict], stream: IO[str]) -> int:
+    """Write one JSON object per line; returns the number written."""
+    count = 0
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        count += 1
+    return count
+
+
+def write_csv(rows: Iterable[dict], columns: List[str], stream: IO[str]) -> int:
+    """Write rows under a header of ``columns``; returns the number written."""
+    writer = csv.DictWriter(stream, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow({column: _cell(row.get(column)) for column in columns})
+        count += 1
+    return count
+
+
+# ---------- Quiz history ----------
+
+QUIZ_FIELDS = {
+    'quiz_id': 'id', 'username': 'user__username', 'domain': 'domain', 'sub_domain': 'sub_domain',
+    'status': 'status', 'score': 'score', 'current_question_index': 'current_question_index',
+    'created_at': 'created_at', 'updated_at': 'updated_at',
+}
+
+
+def quiz_records(quizzes, chunk_size: int = 2000) -> Iterator[dict]:
+    """
+    ``quizzes`` in id order as NDJSON records, each with its questions and
+    answers.
+
+    Reads plain values rather than model instances, ``chunk_size`` quizzes
+    at a time plus one query per chunk for their questions.
+    """
+    rows = quizzes.order_by('id').values_list(*QUIZ_FIELDS.values()).iterator(chunk_size=chunk_size)
+    for batch in scoring.chunked(rows, chunk_size):
+        links = defaultdict(list)
+        for quiz_id, item_id, selected, content in (
+                QuizHistoryQuestion.objects.filter(quiz_id__in=[row[0] for row in batch])
+                .order_by('quiz_id', 'position').values_list('quiz_id', 'item_id', 'selected', 'question__content')):
+            links[quiz_id].append((item_id, selected, content))
+        for row in batch:
+            record = dict(zip(QUIZ_FIELDS, row))
+            record['created_at'] = record['created_at'].isoformat()
+            record['updated_at'] = record['updated_at'].isoformat()
+            quiz_links = links.get(record['quiz_id'], [])
+            contents = [content for _, _, content in quiz_links]
+            record['questions'] = [join_question(content, item_id) for item_id, _, content in quiz_links]
+            record['user_answers'] = decode_answers(contents, [selected for _, selected, _ in quiz_links])
+            yield record
+
+
+def quiz_rows(record: dict) -> Iterator[dict]:
+    """A quiz record as CSV rows, one per question."""
+    record = dict(record)
+    questions, answers = record.pop('questions'), record.pop('user_answers')
+    for position, question in enumerate(questions):
+        question = question if isinstance(question, dict) else {'question': question}
+        yield {
+            **record,
+            **{name: question.get(name) for name in QUESTION_FIELDS},
+            'position': position,
+            'item_id': question.get('id'),
+            'user_answer': answers[position] if position < len(answers) else [],
+        }
+
+
+def export_history(quizzes, fmt: str, stream: IO[str], chunk_size: int = 2000) -> int:
+    """
+    Stream ``quizzes`` to ``stream``.
+
+    Returns:
+        int: the number of records (ndjson) or rows (csv) written.
+    """
+    records = quiz_records(quizzes, chunk_size)
+    if fmt == 'csv':
+        return write_csv((row for record in records for row in quiz_rows(record)), HISTORY_COLUMNS, stream)
+    return write_ndjson(records, stream)
+
+
+# ---------- Question bank ----------
+
+def _bank_rows(entries, chunk_size: int) -> Iterator[dict]:
+    rows = (entries.order_by('domain', 'sub_domain', 'level', 'id')
+            .values_list('domain', 'sub_domain', 'level', 'question__content')
+            .iterator(chunk_size=chunk_size))
+    for domain, sub_domain, level, content in rows:
+        yield {'domain': domain, 'sub_domain': sub_domain, 'level': level,
+               **(content if isinstance(content, dict) else {'question': content})}
+
+
+def bank_sets(entries, set_size: int = 500, chunk_size: int = 2000) -> Iterator[dict]:
+    """The bank as question sets of up to ``set_size`` questions sharing a topic and level."""
+    topic = lambda row: (row['domain'], row['sub_domain'], row['level'])
+    for (domain, sub_domain, level), rows in groupby(_bank_rows(entries, chunk_size), key=topic):
+        for batch in scoring.chunked(rows, set_size):
+            yield {
+                'domain': domain, 'sub_domain': sub_domain, 'level': level,
+                'questions': [{name: row.get(name) for name in QUESTION_FIELDS} for row in batch],
+            }
+
+
+def export_bank(entries, fmt: str, stream: IO[str], chunk_size: int = 2000) -> int:
+    """
+    Stream the ``BankQuestion`` rows in ``entries`` to ``stream``, in a form
+    ``import_questions`` reads back.
+
+    Returns:
+        int: the number of question sets (ndjson) or rows (csv) written.
+    """
+    if fmt == 'csv':
+        return write_csv(_bank_rows(entries, chunk_size), BANK_COLUMNS, stream)
+    return write_ndjson(bank_sets(entries, chunk_size=chunk_size), stream)
+
+
+# ---------- Import ----------
+
+class InvalidRecord(ValueError):
+    """A malformed line or question in an import file."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    added: int = 0
+    errors: List[InvalidRecord] = field(default_factory=list)
+
+    @property
+    def skipped(self) -> int:
+        """Valid questions the bank already held."""
+        return self.read - len(self.errors) - self.added
+
+
+def _list_cell(value):
+    if isinstance(value, str) and value.startswith('['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def read_ndjson(stream: IO[str]) -> Iterator[Tuple[int, dict, object]]:
+    """``(line, topic, question)`` for every question of every set in an NDJSON file."""
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as e:
+            yield line, {}, InvalidRecord(line, f"not JSON ({e})")
+            continue
+        if not isinstance(record, dict) or not isinstance(record.get('questions'), list):
+            yield line, {}, InvalidRecord(line, "expected an object with a 'questions' list")
+            continue
+        topic = {key: record.get(key) for key in ('domain', 'sub_domain', 'level')}
+        for question in record['questions']:
+            yield line, topic, question
+
+
+def read_csv(stream: IO[str]) -> Iterator[Tuple[int, dict, object]]:
+    """``(line, topic, question)`` for every row of a CSV file with ``BANK_COLUMNS``."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        line = reader.line_num
+        topic = {key: row.get(key) for key in ('domain', 'sub_domain', 'level')}
+        question = {name: _list_cell(row.get(name)) for name in QUESTION_FIELDS if row.get(name) is not None}
+        yield line, topic, question
+
+
+def validate(line: int, topic: dict, question) -> Tuple[tuple, dict]:
+    """
+    Check one imported question.
+
+    Returns:
+        tuple: ((domain, sub_domain, level), content) with the topic normalized
+        and the content as ``QuizQuestion`` dumps it, minus its per-quiz id.
+
+    Raises:
+        InvalidRecord: if the topic or the question is invalid.
+    """
+    domain, sub_domain = normalize_key(topic.get('domain') or ''), normalize_key(topic.get('sub_domain') or '')
+    level = str(topic.get('level') or '').strip().lower()
+    if not domain or not sub_domain:
+        raise InvalidRecord(line, "domain and sub_domain are required")
+    if len(domain) > 100 or len(sub_domain) > 100:
+        raise InvalidRecord(line, "domain and sub_domain are limited to 100 characters")
+    if level not in LEVELS:
+        raise InvalidRecord(line, f"level must be one of {', '.join(sorted(LEVELS))}")
+    if not isinstance(question, dict):
+        raise InvalidRecord(line, "each question must be an object")
+    try:
+        parsed = QuizQuestion.model_validate({'id': 0, **question})
+    except ValidationError as e:
+        raise InvalidRecord(line, "; ".join(
+            f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+    if not parsed.correct_answers or not set(parsed.correct_answers) <= set(parsed.options):
+        raise InvalidRecord(line, "correct_answers must be a non-empty subset of options")
+    return (domain, sub_domain, level), parsed.model_dump(exclude={'id'})
+
+
+def _add_batch(batch: List[Tuple[tuple, dict]]) -> None:
+    with transaction.atomic():
+        question_ids = Question.objects.ids_for_many([content for _, content in batch])
+        BankQuestion.objects.bulk_create([
+            BankQuestion(domain=domain, sub_domain=sub_domain, level=level,
+                         sub_topic=normalize_key(content['sub_topic'])[:200],
+                         fingerprint=question_fingerprint(content), question_id=question_id)
+            for ((domain, sub_domain, level), content), question_id in zip(batch, question_ids)
+        ], ignore_conflicts=True)
+
+
+def import_questions(items: Iterable[Tuple[int, dict, object]], batch_size: int = 5000,
+                     max_errors: int = 100) -> ImportResult:
+    """
+    Add questions from ``read_ndjson`` / ``read_csv`` to the bank in batches
+    of ``batch_size``, one transaction each.
+
+    Invalid questions are collected in the result and skipped; past
+    ``max_errors`` of them the import stops with the last one raised,
+    leaving earlier batches in place. Questions the bank already holds for
+    the same topic and level are skipped. Unlike questions from the LLM,
+    imported ones are not checked for near-duplicates.
+    """
+    result = ImportResult()
+    before = BankQuestion.objects.count()
+    batch = []
+    try:
+        for line, topic, question in items:
+            result.read += 1
+            if isinstance(question, InvalidRecord):
+                result.errors.append(question)
+            else:
+                try:
+                    batch.append(validate(line, topic, question))
+                except InvalidRecord as e:
+                    result.errors.append(e)
+            if len(result.errors) > max_errors:
+                raise result.errors[-1]
+            if len(batch) == batch_size:
+                _add_batch(batch)
+                batch = []
+        if batch:
+            _add_batch(batch)
+    finally:
+        result.added = BankQuestion.objects.count() - before
+        # The in-process near-duplicate indexes don't know about the new rows.
+        reset_topic_indexes()
+    return result
@@ -1,19 +1,45 @@
 from django.urls import path
 from .views import (
     generate_quiz,
+    generate_quiz_stream,
+    generation_job_status,
+    llm_metrics,
     get_quiz_history,
+    quiz_history_summary,
+    get_quiz_detail,
     resume_quiz,
     mark_quiz_complete,
     save_quiz_progress,
+    record_answer,
+    performance_stats,
+    get_leaderboard,
 )
+from api import async_views
 from api.swagger import schema_view
 
 urlpatterns = [
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('generate-quiz/', generate_quiz, name='generate-quiz'),
+    path('generate-quiz/stream/', generate_quiz_stream, name='generate-quiz-stream'),
+    path('generation-jobs/<uuid:job_id>/', generation_job_status, name='generation-job'),
     path('quiz-history/', get_quiz_history, name='quiz-history'),
+    path('quiz-history/summary/', quiz_history_summary, name='quiz-history-summary'),
+    path('quiz-history/<int:quiz_id>/', get_quiz_detail, name='quiz-detail'),
     path('resume-quiz/', resume_quiz, name='resume-quiz'),
     path('save-progress/<int:quiz_id>/', save_quiz_progress, name='save-progress'),
     path('save-quiz-progress/<int:quiz_id>/', save_quiz_progress, name='save-quiz-progress'),
+    path('answer/<int:quiz_id>/', record_answer, name='record-answer'),
     path('mark-complete/<int:quiz_id>/', mark_quiz_complete, name='mark-complete'),
+    path('stats/', performance_stats, name='performance-stats'),
+    path('leaderboard/', get_leaderboard, name='leaderboard'),
+    path('llm-metrics/', llm_metrics, name='llm-metrics'),
+
+    # ASGI-native variants; same request/response shapes as above.
+    path('async/generate-quiz/', async_views.generate_quiz, name='async-generate-quiz'),
+    path('async/generation-jobs/<uuid:job_id>/', async_views.generation_job_status, name='async-generation-job'),
+    path('async/quiz-history/', async_views.get_quiz_history, name='async-quiz-history'),
+    path('async/resume-quiz/', async_views.resume_quiz, name='async-resume-quiz'),
+    path('async/save-progress/<int:quiz_id>/', async_views.save_quiz_progress, name='async-save-progress'),
+    path('async/answer/<int:quiz_id>/', async_views.record_answer, name='async-record-answer'),
+    path('async/mark-complete/<int:quiz_id>/', async_views.mark_quiz_complete, name='async-mark-complete'),
 ]
@@ -1,12 +1,43 @@
+from datetime import timedelta
+
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .serializers import QuizGenerationSerializer, QuizHistorySerializer, ResumeQuizSerializer
-from .models import QuizHistory
-from .services import AIService
+from django.utils import timezone
+from .serializers import (
+    AnswerSerializer,
+    LeaderboardQuerySerializer,
+    QuizGenerationSerializer,
+    QuizHistorySerializer,
+    QuizHistorySummarySerializer,
+    ResumeQuizSerializer,
+)
+from .models import GenerationJob, QuizHistory, QuizHistoryQuestion
+from . import admission, conditional, jobs, leaderboard, progress, question_bank, rollups
+from .instrumentation import registry
+from .pagination import QuizHistoryPagination
+from .scoring import calculate_score
+from .services import circuit_state
+from .streaming import EventStreamRenderer, NDJSONRenderer, encode_ndjson, encode_sse
+from user.authentication import ClaimsJWTAuthentication
+
+
+def _resumed_quiz_response(quiz):
+    progress.overlay([quiz])
+    return Response({
+        "message": "Incomplete quiz found. Resuming...",
+        "quiz_id": quiz.id,
+        "questions": quiz.questions,
+        "user_answers": quiz.user_answers or [],
+        "current_question_index": quiz.current_question_index or 0,
+    }, status=status.HTTP_200_OK)
 
 
 # ---------- Generate Quiz ----------
@@ -20,56 +51,56 @@ def generate_quiz(request):
     data = serializer.validated_data
 
     # Check for incomplete quiz
-    existing_quiz = QuizHistory.objects.filter(
-        user=request.user,
-        domain=data['domain'],
-        sub_domain=data['sub_domain'],
-        status='incomplete'
-    ).first()
+    topic = QuizHistory.objects.filter(user=request.user, domain=data['domain'], sub_domain=data['sub_domain'])
+    existing_quiz = topic.resumable().first()
 
     if existing_quiz:
+        return _resumed_quiz_response(existing_quiz)
+    topic.abandon_empty()
+
+    if data['mode'] == 'async':
+        # Queued jobs are bounded by the worker pool, so only the user's budget applies.
+        admission.charge(request.user, data['number_of_questions'])
+        job = jobs.enqueue_generation(
+            user=request.user,
+            domain=data['domain'],
+            sub_domain=data['sub_domain'],
+            level=data['level'],
+            number_of_questions=data['number_of_questions'],
+        )
         return Response({
-            "message": "Incomplete quiz found. Resuming...",
-            "quiz_id": existing_quiz.id,
-            "questions": existing_quiz.questions,
-            "user_answers": existing_quiz.user_answers or [],
-            "current_question_index": existing_quiz.current_question_index or 0,
-        }, status=status.HTTP_200_OK)
-
-    # Generate new quiz
-    ai_service = AIService()
-    result = ai_service.generate_quiz_questions(
-        domain=data['domain'],
-        sub_domain=data['sub_domain'],
-        number_of_questions=data['number_of_questions'],
-        level=data['level']
-    )
+            "message": "Quiz generation queued.",
+            "job_id": str(job.id),
+            "status": job.status,
+        }, status=status.HTTP_202_ACCEPTED)
+
+    # Assemble new quiz from the question bank (LLM only for the shortfall)
+    with admission.admit(request.user, data['number_of_questions']):
+        result = question_bank.assemble_quiz(
+            user=request.user,
+            domain=data['domain'],
+            sub_domain=data['sub_domain'],
+            level=data['level'],
+            number_of_questions=data['number_of_questions'],
+        )
 
     if isinstance(result, dict) and 'error' in result:
         return Response(result, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     # Ensure the number of questions matches requested
-    questions = result if isinstance(result, list) else []
-    num_required = data['number_of_questions']
-
-    while len(questions) < num_required:
-        questions.append({
-            "question": f"Placeholder question {len(questions)+1}",
-            "question_type": "single",
-            "correct_answer": "N/A",
-            "correct_answers": ["N/A"],
-            "explanation": "Auto-generated placeholder."
-        })
-
-    quiz = QuizHistory.objects.create(
+    questions = question_bank.pad_with_placeholders(result, data['number_of_questions'])
+
+    quiz, created = QuizHistory.objects.get_or_create(
         user=request.user,
         domain=data['domain'],
         sub_domain=data['sub_domain'],
-        questions=questions,
-        user_answers=[],
-        current_question_index=0,
-        status='incomplete'
+        status='incomplete',
+        defaults={'questions': questions, 'user_answers': [], 'current_question_index': 0},
     )
+    if not created:
+        # A concurrent request for the same topic won the race; only one
+        # incomplete quiz may exist per topic, so resume that one.
+        return _resumed_quiz_response(quiz)
 
     return Response({
         "message": "New quiz generated.",
@@ -81,6 +112,142 @@ def generate_quiz(request):
 
 
 
+# ---------- Generation Job Status ----------
+# Each waiting request holds a worker thread here; the async variant of this
+# view long-polls for longer without one.
+MAX_JOB_WAIT_SECONDS = 5
+
+
+@api_view(['GET'])
+@authentication_classes([ClaimsJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def generation_job_status(request, job_id):
+    """
+    Poll a queued generation job. ``?wait=<seconds>`` long-polls until the
+    job finishes (capped at 5s; 25s on ``async/generation-jobs/``).
+    """
+    job = get_object_or_404(GenerationJob.objects.select_related('quiz'), id=job_id, user=request.user)
+
+    try:
+        wait = min(float(request.query_params.get('wait', 0)), MAX_JOB_WAIT_SECONDS)
+    except ValueError:
+        return Response({"wait": ["A number of seconds is required."]}, status=status.HTTP_400_BAD_REQUEST)
+    job = jobs.recover_if_stale(job)
+    if wait > 0:
+        job = jobs.wait_for_job(job, wait)
+
+    return Response(jobs.job_payload(job), status=status.HTTP_200_OK)
+
+
+# ---------- Generate Quiz (streaming) ----------
+def _resumed_quiz_events(quiz):
+    yield 'quiz', {"quiz_id": quiz.id, "resumed": True,
+                   "user_answers": quiz.user_answers or [],
+                   "current_question_index": quiz.current_question_index or 0}
+    for index, question in enumerate(quiz.questions):
+        yield 'question', {"index": index, "question": question}
+    yield 'done', {"quiz_id": quiz.id, "count": len(quiz.questions)}
+
+
+def _new_quiz_events(quiz, user, data):
+    try:
+        yield 'quiz', {"quiz_id": quiz.id, "resumed": False,
+                       "user_answers": [], "current_question_index": 0}
+        error = None
+        try:
+            for question in question_bank.iter_quiz_questions(
+                user=user,
+                domain=data['domain'],
+                sub_domain=data['sub_domain'],
+                level=data['level'],
+                number_of_questions=data['number_of_questions'],
+            ):
+                question = {'id': len(quiz.questions) + 1, **question}
+                # Persist before emitting so the question can be answered (and
+                # resumed) while the rest are still being generated.
+                quiz.append_question(question)
+                quiz.save(update_fields=['updated_at'])
+                yield 'question', {"index": question['id'] - 1, "question": question}
+        except Exception as e:
+            error = f"Error generating quiz: {str(e)}"
+
+        if not quiz.questions:
+            yield 'error', {"error": error or "No questions could be generated."}
+            return
+        if error:
+            yield 'error', {"error": error, "partial": True}
+        yield 'done', {"quiz_id": quiz.id, "count": len(quiz.questions)}
+    finally:
+        # Also reached when the client disconnects (the generator is closed):
+        # an empty quiz would otherwise hold the topic's one incomplete slot.
+        if not quiz.questions:
+            QuizHistory.objects.filter(id=quiz.id).delete()
+
+
+def _encoded(events, encode):
+    # Closing the response closes ``events`` too, so their cleanup runs on disconnect.
+    try:
+        for event, payload in events:
+            yield encode(event, payload)
+    finally:
+        events.close()
+
+
+@swagger_auto_schema(method='post', request_body=QuizGenerationSerializer)
+@api_view(['POST'])
+@renderer_classes([NDJSONRenderer, EventStreamRenderer, JSONRenderer])
+@permission_classes([IsAuthenticated])
+def generate_quiz_stream(request):
+    """
+    Stream a quiz question by question as NDJSON, or as Server-Sent Events
+    when the client accepts ``text/event-stream``.
+
+    Emits a ``quiz`` event with the quiz_id first, then one ``question`` event
+    per question as soon as it is validated, then ``done`` (or ``error``).
+    """
+    serializer = QuizGenerationSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    topic = QuizHistory.objects.filter(user=request.user, domain=data['domain'], sub_domain=data['sub_domain'])
+    existing_quiz = topic.resumable().first()
+
+    if existing_quiz:
+        events = _resumed_quiz_events(existing_quiz)
+    else:
+        topic.abandon_empty()
+        ticket = admission.admit(request.user, data['number_of_questions'])
+        try:
+            # Created up front so the client has a quiz_id before the first question.
+            quiz, created = QuizHistory.objects.get_or_create(
+                user=request.user,
+                domain=data['domain'],
+                sub_domain=data['sub_domain'],
+                status='incomplete',
+                defaults={'questions': [], 'user_answers': [], 'current_question_index': 0},
+            )
+        except Exception:
+            ticket.release()
+            raise
+        if created:
+            # The slot is held until the stream finishes or the client goes away.
+            events = ticket.releasing(_new_quiz_events(quiz, request.user, data))
+        else:
+            ticket.release()
+            events = _resumed_quiz_events(quiz)
+
+    if request.accepted_renderer.format == 'sse':
+        encode, content_type = encode_sse, EventStreamRenderer.media_type
+    else:
+        encode, content_type = encode_ndjson, NDJSONRenderer.media_type
+
+    response = StreamingHttpResponse(_encoded(events, encode), content_type=content_type)
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ---------- Save Quiz Progress ----------
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -91,14 +258,65 @@ def save_quiz_progress(request, quiz_id):
     quiz = get_object_or_404(QuizHistory, id=quiz_id, user=request.user)
     data = request.data
 
-    quiz.user_answers = data.get('user_answers', quiz.user_answers)
+    if progress.write_behind():
+        progress.buffer_progress(quiz.id, data.get('current_question_index'), data.get('user_answers'))
+        return Response({"message": "Progress saved successfully."}, status=status.HTTP_200_OK)
+
+    if 'user_answers' in data:
+        quiz.user_answers = data['user_answers']
     quiz.current_question_index = data.get('current_question_index', quiz.current_question_index)
     quiz.save(update_fields=['user_answers', 'current_question_index', 'updated_at'])
 
     return Response({"message": "Progress saved successfully."}, status=status.HTTP_200_OK)
 
 
+# ---------- Record One Answer ----------
+def answer_row(user, quiz_id, index):
+    """The row holding the answer to question ``index`` of one of ``user``'s incomplete quizzes."""
+    return QuizHistoryQuestion.objects.filter(
+        quiz_id=quiz_id, quiz__user=user, quiz__status='incomplete', position=index,
+    )
+
+
+@swagger_auto_schema(method='patch', request_body=AnswerSerializer)
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated])
+def record_answer(request, quiz_id):
+    """
+    Record the answer to one question, as a bitmask over its options.
+
+    Only that question's row is written; the rest of the quiz is untouched.
+    """
+    serializer = AnswerSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    row = answer_row(request.user, quiz_id, data['index'])
+    if progress.write_behind():
+        found = row.exists()
+        if found:
+            progress.buffer_answer(quiz_id, data['index'], data['selected'])
+    else:
+        found = row.update(selected=data['selected'])
+        if found:
+            # Keeps the quiz's ETag and Last-Modified current.
+            QuizHistory.objects.filter(id=quiz_id).update(updated_at=timezone.now())
+    if not found:
+        return Response({"message": "No such question in an incomplete quiz."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # ---------- Mark Quiz Complete ----------
+def save_completion(quiz, newly_completed: bool) -> None:
+    """Save a completed quiz and, the first time it completes, add it to the rollups and leaderboards."""
+    with transaction.atomic():
+        quiz.save()
+        if newly_completed:
+            rollups.record_quiz(quiz)
+            leaderboard.record_score(quiz)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_quiz_complete(request, quiz_id):
@@ -107,27 +325,17 @@ def mark_quiz_complete(request, quiz_id):
     """
     quiz = get_object_or_404(QuizHistory, id=quiz_id, user=request.user)
     data = request.data
+    if progress.write_behind() and progress.flush([quiz.id]):
+        quiz.refresh_from_db()
+    newly_completed = quiz.status != 'completed'
 
     if 'user_answers' in data:
-        user_answers = data['user_answers']
-        quiz.user_answers = user_answers
-
-        total_questions = len(quiz.questions)
-        correct_count = 0
-
-        for i, question in enumerate(quiz.questions):
-            if i < len(user_answers):
-                normalize = lambda arr: set(str(a).strip().lower() for a in arr)
-                user_ans = normalize(user_answers[i])
-                correct_ans = normalize(question.get('correct_answers', []))
-                if user_ans == correct_ans:
-                    correct_count += 1
-
-        quiz.score = round((correct_count / total_questions) * 100, 2) if total_questions > 0 else 0
+        quiz.user_answers = data['user_answers']
+    quiz.score = calculate_score(quiz.questions, quiz.user_answers)
 
     quiz.status = 'completed'
     quiz.current_question_index = len(quiz.questions)
-    quiz.save()
+    save_completion(quiz, newly_completed)
 
     serializer = QuizHistorySerializer(quiz)
     return Response({
@@ -137,48 +345,195 @@ def mark_quiz_complete(request, quiz_id):
 
 
 # ---------- Get Quiz History ----------
+def paginate_quiz_history(request, user):
+    """
+    One cursor page of ``user``'s quizzes, newest first, and its paginator.
+
+    Summaries only (the questions are not loaded) unless ``?include=questions``
+    asks for the full quizzes. ``domain``, ``sub_domain`` and ``status``
+    filter the list.
+    """
+    params = request.query_params
+    quizzes = QuizHistory.objects.filter(user=user)
+    for field in ('domain', 'sub_domain', 'status'):
+        if params.get(field):
+            quizzes = quizzes.filter(**{field: params[field]})
+
+    if params.get('include') == 'questions':
+        quizzes = quizzes.with_questions()
+    else:
+        quizzes = quizzes.only(*QuizHistorySummarySerializer.Meta.fields)
+
+    paginator = QuizHistoryPagination()
+    return paginator.paginate_queryset(quizzes, request), paginator
+
+
+def render_quiz_history(request, page, paginator):
+    """The page from ``paginate_quiz_history`` as ``{"next", "previous", "results"}``."""
+    serializer_class = QuizHistorySummarySerializer
+    if request.query_params.get('include') == 'questions':
+        progress.overlay(page)
+        serializer_class = QuizHistorySerializer
+    return {
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
+        "results": serializer_class(page, many=True).data,
+    }
+
+
+def quiz_history_page(request, user):
+    """One cursor page of ``user``'s quizzes; see ``paginate_quiz_history``."""
+    return render_quiz_history(request, *paginate_quiz_history(request, user))
+
+
 @api_view(['GET'])
+@authentication_classes([ClaimsJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_quiz_history(request):
-    domain = request.query_params.get('domain')
-    sub_domain = request.query_params.get('sub_domain')
+    """
+    The user's quizzes, newest first, paginated by cursor (``?cursor=``,
+    ``?page_size=`` up to 100). Summaries only unless ``?include=questions``.
+    Answers 304 to a conditional GET when the page has not changed.
+    """
+    page, paginator = paginate_quiz_history(request, request.user)
+    validators = conditional.quiz_validators(
+        page, f"{request.get_full_path()}|{paginator.has_next}|{paginator.has_previous}")
+    return (conditional.not_modified(request, validators)
+            or conditional.tag(Response(render_quiz_history(request, page, paginator), status=status.HTTP_200_OK),
+                                   validators))
+
+
+@api_view(['GET'])
+@authentication_classes([ClaimsJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def quiz_history_summary(request):
+    """Counts and score extremes over all of the user's quizzes, in one aggregate query."""
+    totals = QuizHistory.objects.filter(user=request.user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        max_score=Max('score'),
+        min_score=Min('score'),
+        average_score=Avg('score'),
+    )
+    return Response({
+        "total": totals['total'],
+        "completed": totals['completed'],
+        "incomplete": totals['total'] - totals['completed'],
+        "max_score": totals['max_score'] or 0,
+        "min_score": totals['min_score'] or 0,
+        "average_score": round(totals['average_score'] or 0, 1),
+    }, status=status.HTTP_200_OK)
+
 
-    quizzes = QuizHistory.objects.filter(user=request.user)
-    if domain:
-        quizzes = quizzes.filter(domain=domain)
-    if sub_domain:
-        quizzes = quizzes.filter(sub_domain=sub_domain)
+@api_view(['GET'])
+@authentication_classes([ClaimsJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_quiz_detail(request, quiz_id):
+    """One quiz in full, including its questions and answers."""
+    quiz = get_object_or_404(QuizHistory, id=quiz_id, user=request.user)
+    validators = conditional.quiz_validators([quiz])
+    response = conditional.not_modified(request, validators)
+    if response is None:
+        progress.overlay([quiz])
+        response = conditional.tag(Response(QuizHistorySerializer(quiz).data, status=status.HTTP_200_OK), validators)
+    return response
+
+
+# ---------- Performance Stats ----------
+@api_view(['GET'])
+@authentication_classes([ClaimsJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def performance_stats(request):
+    """
+    Accuracy per topic and sub_topic, each with a per-day series, read from
+    the performance rollups. Optional ``domain``, ``sub_domain`` and
+    ``days`` (only the last N days) filters.
+    """
+    params = request.query_params
+    since = None
+    if params.get('days'):
+        try:
+            days = int(params['days'])
+        except ValueError:
+            days = 0
+        if days < 1:
+            return Response({"days": ["Must be a positive integer."]}, status=status.HTTP_400_BAD_REQUEST)
+        since = timezone.localdate() - timedelta(days=days - 1)
+
+    topics = rollups.stats(request.user, params.get('domain'), params.get('sub_domain'), since)
+    return Response({"topics": topics}, status=status.HTTP_200_OK)
+
+
+# ---------- Leaderboard ----------
+@swagger_auto_schema(method='get', query_serializer=LeaderboardQuerySerializer)
+@api_view(['GET'])
+@authentication_classes([ClaimsJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_leaderboard(request):
+    """
+    Top users by best or average score on a domain's board (or the global
+    one), plus the requesting user's own rank.
+    """
+    serializer = LeaderboardQuerySerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
 
-    serializer = QuizHistorySerializer(quizzes, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response({
+        "domain": data['domain'],
+        "by": data['by'],
+        "top": leaderboard.top(data['domain'], data['by'], data['limit']),
+        "me": leaderboard.rank_of(request.user, data['domain'], data['by']),
+    }, status=status.HTTP_200_OK)
 
 
 # ---------- Resume Quiz ----------
-@api_view(['POST'])
+@api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def resume_quiz(request):
     """
-    Resume the last incomplete quiz.
+    Resume the last incomplete quiz, by ``domain`` and ``sub_domain`` in the
+    body (POST) or query string (GET). A conditional GET for a quiz that has
+    not changed gets a 304 without its questions being loaded.
     """
-    serializer = ResumeQuizSerializer(data=request.data)
+    serializer = ResumeQuizSerializer(data=request.query_params if request.method == 'GET' else request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     data = serializer.validated_data
-    quiz = QuizHistory.objects.filter(
+    quiz = QuizHistory.objects.resumable().filter(
         user=request.user,
         domain=data['domain'],
         sub_domain=data['sub_domain'],
-        status='incomplete'
     ).first()
 
     if not quiz:
         return Response({"message": "No incomplete quiz found."}, status=status.HTTP_404_NOT_FOUND)
 
-    return Response({
+    validators = conditional.quiz_validators([quiz])
+    response = conditional.not_modified(request, validators)
+    if response is not None:
+        return response
+    progress.overlay([quiz])
+    return conditional.tag(Response({
         "quiz_id": quiz.id,
         "questions": quiz.questions,
         "user_answers": quiz.user_answers or [],
         "current_question_index": quiz.current_question_index or 0,
         "status": quiz.status,
+    }, status=status.HTTP_200_OK), validators)
+
+
+# ---------- LLM Metrics ----------
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def llm_metrics(request):
+    """
+    In-process LLM generation metrics (counts, latency percentiles, tokens,
+    retries and hedges) for this worker since it started, plus the state of
+    its circuit breaker.
+    """
+    return Response({
+        **registry.snapshot(),
+        "circuit": circuit_state(),
     }, status=status.HTTP_200_OK)
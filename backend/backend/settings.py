@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import environ
 import os
 from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
 # Initialize environ
 env = environ.Env()
 
@@ -74,6 +76,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,6 +86,13 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
 ]
 
+# Responses of at least COMPRESSION_MIN_SIZE bytes are compressed with brotli
+# (if the optional `brotli` package is installed and the client accepts it) or
+# gzip, at the given levels.
+COMPRESSION_MIN_SIZE = env.int('COMPRESSION_MIN_SIZE', default=1024)
+COMPRESSION_GZIP_LEVEL = env.int('COMPRESSION_GZIP_LEVEL', default=6)
+COMPRESSION_BROTLI_QUALITY = env.int('COMPRESSION_BROTLI_QUALITY', default=5)
+
 ROOT_URLCONF = 'backend.urls'
 CORS_ALLOW_ALL_ORIGINS = True
 TEMPLATES = [
@@ -106,7 +116,7 @@ from datetime import timedelta
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -121,22 +131,178 @@ SIMPLE_JWT = {
     "ALGORITHM": "HS256",
     # Optionally set your signing key; by default Django SECRET_KEY is used
     # "SIGNING_KEY": SECRET_KEY,
+    "TOKEN_REFRESH_SERIALIZER": "user.serializers.FastTokenRefreshSerializer",
+}
+
+# LLM backend used for question generation: "gemini", or "fake" for an
+# offline deterministic generator (tests, benchmarks), or "faulty" for the fake
+# one with injected failures, slow and malformed responses.
+LLM_BACKEND = env('LLM_BACKEND', default='gemini')
+FAKE_LLM_LATENCY = env.float('FAKE_LLM_LATENCY', default=0.0)
+# Requests for more than LLM_SHARD_SIZE questions are split into shards that
+# are generated concurrently (at most LLM_MAX_CONCURRENCY at a time).
+LLM_SHARD_SIZE = env.int('LLM_SHARD_SIZE', default=5)
+LLM_MAX_CONCURRENCY = env.int('LLM_MAX_CONCURRENCY', default=4)
+# Calls to the backend are retried with jittered backoff, hedged with a
+# duplicate request once they pass the LLM_HEDGE_PERCENTILE latency of recent
+# calls (0 disables), and abandoned after LLM_CALL_TIMEOUT seconds. After
+# LLM_CIRCUIT_FAILURE_THRESHOLD consecutive provider failures the circuit opens
+# for LLM_CIRCUIT_RESET_TIMEOUT seconds and quizzes are served from the bank.
+LLM_RESILIENCE_ENABLED = env.bool('LLM_RESILIENCE_ENABLED', default=True)
+LLM_RETRY_ATTEMPTS = env.int('LLM_RETRY_ATTEMPTS', default=3)
+LLM_RETRY_BASE_DELAY = env.float('LLM_RETRY_BASE_DELAY', default=0.5)
+LLM_RETRY_MAX_DELAY = env.float('LLM_RETRY_MAX_DELAY', default=8.0)
+LLM_HEDGE_PERCENTILE = env.float('LLM_HEDGE_PERCENTILE', default=95)
+LLM_HEDGE_MIN_SAMPLES = env.int('LLM_HEDGE_MIN_SAMPLES', default=20)
+LLM_CALL_TIMEOUT = env.float('LLM_CALL_TIMEOUT', default=20.0)
+LLM_CIRCUIT_FAILURE_THRESHOLD = env.int('LLM_CIRCUIT_FAILURE_THRESHOLD', default=5)
+LLM_CIRCUIT_RESET_TIMEOUT = env.float('LLM_CIRCUIT_RESET_TIMEOUT', default=30.0)
+# Fault rates for LLM_BACKEND="faulty" (the fake backend with injected faults).
+FAULTY_LLM_FAILURE_RATE = env.float('FAULTY_LLM_FAILURE_RATE', default=0.2)
+FAULTY_LLM_SLOW_RATE = env.float('FAULTY_LLM_SLOW_RATE', default=0.1)
+FAULTY_LLM_MALFORMED_RATE = env.float('FAULTY_LLM_MALFORMED_RATE', default=0.1)
+FAULTY_LLM_SLOW_LATENCY = env.float('FAULTY_LLM_SLOW_LATENCY', default=5.0)
+# Every generation feeds api.instrumentation's in-process metrics; with this on
+# it is also written to the GenerationLog table (see `manage.py generation_stats`).
+GENERATION_LOG_ENABLED = env.bool('GENERATION_LOG_ENABLED', default=True)
+
+# Question bank
+# Quizzes are assembled from the pool; the LLM is only called for shortfalls
+# and to refill a topic once it drops to the low-water mark.
+QUESTION_BANK_LOW_WATER_MARK = env.int('QUESTION_BANK_LOW_WATER_MARK', default=40)
+QUESTION_BANK_REFILL_BATCH = env.int('QUESTION_BANK_REFILL_BATCH', default=20)
+
+# Background work (async generation jobs, question bank refills) runs on a
+# bounded in-process worker pool. Eager mode runs it inline instead (tests).
+BACKGROUND_WORKERS = env.int('BACKGROUND_WORKERS', default=4)
+BACKGROUND_TASKS_EAGER = env.bool('BACKGROUND_TASKS_EAGER', default=False)
+# A running generation job refreshes its heartbeat every
+# GENERATION_JOB_HEARTBEAT_INTERVAL seconds. When polled, a job running with no
+# heartbeat for GENERATION_JOB_STALE_AFTER seconds, or queued for
+# GENERATION_JOB_QUEUE_TIMEOUT seconds, is requeued, and failed once it has
+# been started GENERATION_JOB_MAX_ATTEMPTS times.
+GENERATION_JOB_HEARTBEAT_INTERVAL = env.float('GENERATION_JOB_HEARTBEAT_INTERVAL', default=10.0)
+GENERATION_JOB_STALE_AFTER = env.float('GENERATION_JOB_STALE_AFTER', default=60.0)
+GENERATION_JOB_QUEUE_TIMEOUT = env.float('GENERATION_JOB_QUEUE_TIMEOUT', default=600.0)
+GENERATION_JOB_MAX_ATTEMPTS = env.int('GENERATION_JOB_MAX_ATTEMPTS', default=2)
+
+# Cache
+# Admission control state lives here; use a shared cache (e.g.
+# CACHE_URL=redis://...) so limits hold across worker processes.
+CACHES = {
+    'default': env.cache_url('CACHE_URL', default='locmemcache://'),
 }
 
+# Authenticated requests read the token's user from the AUTH_CACHE_ALIAS
+# cache, where it is kept for AUTH_USER_CACHE_TTL seconds and dropped when
+# the user is saved. Use a shared cache (e.g. Redis) with several workers so
+# an edit in one is seen by all.
+AUTH_CACHE_ALIAS = env('AUTH_CACHE_ALIAS', default='default')
+AUTH_USER_CACHE_TTL = env.int('AUTH_USER_CACHE_TTL', default=60)
+
+# Refresh tokens are checked against a per-process Bloom filter of the
+# blacklisted jtis (sized for BLACKLIST_BLOOM_CAPACITY at
+# BLACKLIST_BLOOM_ERROR_RATE false positives), synced every
+# BLACKLIST_SYNC_INTERVAL seconds. The filter only spares the database query
+# when AUTH_CACHE_ALIAS is a shared cache (e.g. Redis), which carries logouts
+# to every worker at once; with a per-process cache each refresh is still
+# confirmed against the database.
+# Expired tokens are removed with `manage.py prune_tokens`.
+BLACKLIST_BLOOM_CAPACITY = env.int('BLACKLIST_BLOOM_CAPACITY', default=1_000_000)
+BLACKLIST_BLOOM_ERROR_RATE = env.float('BLACKLIST_BLOOM_ERROR_RATE', default=0.001)
+BLACKLIST_SYNC_INTERVAL = env.float('BLACKLIST_SYNC_INTERVAL', default=5.0)
+
+# Admission control for quiz generation. Each user has a token bucket of
+# GENERATION_BUCKET_CAPACITY questions refilling at
+# GENERATION_BUCKET_REFILL_PER_MINUTE; at most GENERATION_MAX_IN_FLIGHT
+# generations run at once across all workers. 0 disables either limit.
+ADMISSION_CACHE_ALIAS = env('ADMISSION_CACHE_ALIAS', default='default')
+GENERATION_BUCKET_CAPACITY = env.int('GENERATION_BUCKET_CAPACITY', default=60)
+GENERATION_BUCKET_REFILL_PER_MINUTE = env.float('GENERATION_BUCKET_REFILL_PER_MINUTE', default=2.0)
+GENERATION_MAX_IN_FLIGHT = env.int('GENERATION_MAX_IN_FLIGHT', default=16)
+# Slots expire after this many seconds in case a worker dies holding one.
+GENERATION_SLOT_TTL = env.int('GENERATION_SLOT_TTL', default=120)
+GENERATION_BUSY_RETRY_AFTER = env.int('GENERATION_BUSY_RETRY_AFTER', default=5)
+
+# How completed quizzes are scored: "exact" (all-or-nothing per question),
+# "partial" or "jaccard" (see api/scoring.py). `manage.py regrade` rescores
+# history after a change here or to an answer key.
+SCORING_MODE = env('SCORING_MODE', default='exact')
+
+# Write-behind for quiz progress (see api/progress.py). When on, progress
+# and answer saves go to the cache and reach the database in batches every
+# PROGRESS_FLUSH_INTERVAL seconds, on quiz completion and at shutdown.
+PROGRESS_WRITE_BEHIND = env.bool('PROGRESS_WRITE_BEHIND', default=False)
+PROGRESS_FLUSH_INTERVAL = env.float('PROGRESS_FLUSH_INTERVAL', default=2.0)
+PROGRESS_CACHE_ALIAS = env('PROGRESS_CACHE_ALIAS', default='default')
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# DATABASE_PROFILE picks the backend:
+# - "sqlite" (default): a local file, tuned for concurrent requests. WAL
+#   lets reads run alongside the single writer; IMMEDIATE transactions take
+#   the write lock up front, so they wait out SQLITE_BUSY_TIMEOUT instead of
+#   failing with "database is locked" when upgrading a read lock.
+# - "postgres": DATABASE_URL, with a psycopg 3 connection pool per process
+#   (DATABASE_POOL, needs psycopg[pool]) or persistent connections.
+DATABASE_PROFILE = env('DATABASE_PROFILE', default='sqlite')
+# Seconds a connection is kept for reuse across requests (0 = per request).
+DATABASE_CONN_MAX_AGE = env.int('DATABASE_CONN_MAX_AGE', default=60)
+
+if DATABASE_PROFILE == 'postgres':
+    _database = env.db_url('DATABASE_URL', default='postgres://quizgen@localhost:5432/quizgen')
+    if env.bool('DATABASE_POOL', default=True):
+        # Pooled connections are returned to the pool after each request;
+        # Django requires CONN_MAX_AGE = 0 alongside a pool.
+        _database['OPTIONS'] = {**_database.get('OPTIONS', {}), 'pool': {
+            'min_size': env.int('DATABASE_POOL_MIN_SIZE', default=2),
+            'max_size': env.int('DATABASE_POOL_MAX_SIZE', default=20),
+            'timeout': env.float('DATABASE_POOL_TIMEOUT', default=10.0),
+        }}
+        _database['CONN_MAX_AGE'] = 0
+    else:
+        _database['CONN_MAX_AGE'] = DATABASE_CONN_MAX_AGE
+        _database['CONN_HEALTH_CHECKS'] = True
+elif DATABASE_PROFILE == 'sqlite':
+    _database = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': env('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': env.float('SQLITE_BUSY_TIMEOUT', default=20.0),
+            'transaction_mode': env('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+            'init_command': (
+                f"PRAGMA journal_mode={env('SQLITE_JOURNAL_MODE', default='WAL')};"
+                f"PRAGMA synchronous={env('SQLITE_SYNCHRONOUS', default='NORMAL')};"
+                f"PRAGMA cache_size=-{env.int('SQLITE_CACHE_KIB', default=20000)};"
+                "PRAGMA temp_store=MEMORY;"
+            ),
+        },
     }
-}
+else:
+    raise ImproperlyConfigured(f"Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}; use 'sqlite' or 'postgres'.")
+
+DATABASES = {'default': _database}
 
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# Passwords are hashed with PBKDF2 at PASSWORD_PBKDF2_ITERATIONS (Django's
+# default); each login costs one hash, so this trades login latency and CPU
+# against brute-force cost. Stored hashes at another count are upgraded on
+# login. The other hashers only verify legacy hashes.
+PASSWORD_PBKDF2_ITERATIONS = env.int('PASSWORD_PBKDF2_ITERATIONS', default=1_000_000)
+PASSWORD_HASHERS = [
+    'user.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
@@ -0,0 +1,84 @@
+"""
+Sync (DRF, thread-per-request) vs async (ASGI-native) quiz generation.
+
+The sync path is served by a fixed pool of worker threads, like a threaded
+WSGI server; the async path keeps every request in flight on one event loop.
+With a fake LLM latency of L seconds and W workers, the sync path needs about
+``requests / W * L`` seconds while the async path approaches ``L``.
+
+    python -m benchmarks.async_views --requests 200 --workers 8 --latency 0.25
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import auth_headers, create_user, setup_django, summarize
+
+
+def payload(i, questions):
+    return {"domain": "bench", "sub_domain": f"topic-{i}", "number_of_questions": questions, "level": "easy"}
+
+
+def run_sync(requests, workers, headers, questions, offset):
+    from django.test import Client
+
+    def one(i):
+        started = time.perf_counter()
+        response = Client(headers=headers).post('/generate-quiz/', payload(offset + i, questions),
+                                                content_type='application/json')
+        assert response.status_code == 200, response.content
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(one, range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+def run_async(requests, headers, questions, offset):
+    from django.test import AsyncClient
+
+    async def one(i):
+        started = time.perf_counter()
+        response = await AsyncClient().post('/async/generate-quiz/', payload(offset + i, questions),
+                                            content_type='application/json', headers=headers)
+        assert response.status_code == 200, response.content
+        return time.perf_counter() - started
+
+    async def main():
+        return await asyncio.gather(*(one(i) for i in range(requests)))
+
+    started = time.perf_counter()
+    latencies = asyncio.run(main())
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=8, help='worker threads for the sync path')
+    parser.add_argument('--latency', type=float, default=0.25, help='fake LLM latency in seconds')
+    parser.add_argument('--questions', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django(
+        FAKE_LLM_LATENCY=args.latency,
+        QUESTION_BANK_LOW_WATER_MARK=0,
+        BACKGROUND_TASKS_EAGER=True,
+        # One user sends every request; admission control would turn most away.
+        GENERATION_BUCKET_CAPACITY=0,
+        GENERATION_MAX_IN_FLIGHT=0,
+    )
+    headers = auth_headers(create_user())
+
+    print(f"{args.requests} generate-quiz requests, fake LLM latency {args.latency}s, "
+          f"{args.questions} questions each")
+    latencies, wall = run_sync(args.requests, args.workers, headers, args.questions, offset=0)
+    print(summarize(f"sync ({args.workers} workers)", latencies, wall))
+    latencies, wall = run_async(args.requests, headers, args.questions, offset=args.requests)
+    print(summarize("async (1 event loop)", latencies, wall))
+
+
+if __name__ == '__main__':
+    main()
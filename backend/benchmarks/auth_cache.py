@@ -0,0 +1,44 @@
+"""
+Per-request cost of resolving the JWT's user: simplejwt's
+``JWTAuthentication`` (one query per request) versus the cached and the
+claims-based authentication classes.
+
+    python -m benchmarks.auth_cache --requests 2000
+"""
+import argparse
+import time
+
+from benchmarks.harness import auth_headers, create_user, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.request import Request
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    from user.authentication import CachedJWTAuthentication, ClaimsJWTAuthentication
+
+    headers = auth_headers(create_user())
+    request = Request(RequestFactory().get('/quiz-history/', headers=headers))
+    for label, authentication in (('JWTAuthentication', JWTAuthentication),
+                                  ('CachedJWTAuthentication', CachedJWTAuthentication),
+                                  ('ClaimsJWTAuthentication', ClaimsJWTAuthentication)):
+        authentication().authenticate(request)  # warm the cache
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                authentication().authenticate(request)
+            elapsed = time.perf_counter() - started
+        print(f"{label:<24} {elapsed / args.requests * 1e6:8.1f}us/request  "
+              f"{len(queries) / args.requests:.2f} queries/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+The quiz endpoints under concurrent load with each database profile.
+
+Every virtual user generates a quiz, answers each question, saves its
+position, completes the quiz and reads its history, all through the real
+URL routes. Profiles:
+
+- ``sqlite-default``: Django's SQLite defaults (rollback journal, FULL
+  sync, deferred transactions, 5s timeout, a connection per request)
+- ``sqlite-tuned``: the default ``DATABASE_PROFILE=sqlite`` settings (WAL,
+  NORMAL sync, IMMEDIATE transactions, busy timeout, persistent connections)
+- ``postgres-pool`` / ``postgres-persistent``: run only when DATABASE_URL
+  points at a PostgreSQL server the benchmark may create a test database on
+
+Each profile runs in its own process, since settings are read at startup.
+
+    python -m benchmarks.db_profiles --users 200 --workers 16
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import auth_headers, create_user, setup_django, summarize
+
+PROFILES = {
+    'sqlite-default': {
+        'DATABASE_PROFILE': 'sqlite', 'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_TRANSACTION_MODE': 'DEFERRED', 'SQLITE_BUSY_TIMEOUT': 5, 'DATABASE_CONN_MAX_AGE': 0,
+    },
+    'sqlite-tuned': {'DATABASE_PROFILE': 'sqlite'},
+    'postgres-pool': {'DATABASE_PROFILE': 'postgres', 'DATABASE_POOL': 'true'},
+    'postgres-persistent': {'DATABASE_PROFILE': 'postgres', 'DATABASE_POOL': 'false'},
+}
+
+# Keep the run about the database: no throttling, no background refills.
+WORKLOAD_ENV = {
+    'GENERATION_BUCKET_CAPACITY': 0, 'GENERATION_MAX_IN_FLIGHT': 0,
+    'QUESTION_BANK_LOW_WATER_MARK': 0, 'FAKE_LLM_LATENCY': 0,
+}
+
+
+def session(n, questions):
+    """One user's quiz, start to finish; returns per-request latencies and failures."""
+    from django.db import close_old_connections
+    from django.test import Client
+
+    user = create_user(f'bench{n}')
+    client = Client(headers=auth_headers(user), raise_request_exception=False)
+    latencies, failures = [], 0
+
+    def call(method, path, body=None):
+        nonlocal failures
+        started = time.perf_counter()
+        response = getattr(client, method)(path, body, content_type='application/json')
+        latencies.append(time.perf_counter() - started)
+        close_old_connections()
+        if response.status_code >= 400:
+            failures += 1
+            return None
+        return response.json() if response.content else {}
+
+    quiz = call('post', '/generate-quiz/', {"domain": "bench", "sub_domain": f"topic-{n}",
+                                            "number_of_questions": questions, "level": "easy"})
+    if quiz is None:
+        return latencies, failures
+    for index in range(len(quiz['questions'])):
+        call('patch', f"/answer/{quiz['quiz_id']}/", {"index": index, "selected": 1})
+        call('post', f"/save-progress/{quiz['quiz_id']}/", {"current_question_index": index})
+    call('post', f"/mark-complete/{quiz['quiz_id']}/", {})
+    call('get', '/quiz-history/')
+    return latencies, failures
+
+
+def run_profile(profile, users, workers, questions):
+    setup_django(**WORKLOAD_ENV, **PROFILES[profile])
+    from django.db import connection
+
+    connection.close()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda n: session(n, questions), range(users)))
+    wall = time.perf_counter() - started
+
+    latencies = [latency for result in results for latency in result[0]]
+    failures = sum(result[1] for result in results)
+    print(f"{summarize(profile, latencies, wall)} failed={failures}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='comma-separated subset of profiles')
+    parser.add_argument('--run', choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_profile(args.run, args.users, args.workers, args.questions)
+        return
+
+    for profile in args.profiles.split(','):
+        if profile.startswith('postgres') and not os.environ.get('DATABASE_URL'):
+            print(f"{profile:<28} skipped (set DATABASE_URL to a PostgreSQL server)")
+            continue
+        subprocess.run([
+            sys.executable, '-m', 'benchmarks.db_profiles', '--run', profile, '--users', str(args.users),
+            '--workers', str(args.workers), '--questions', str(args.questions),
+        ], check=False)
+
+
+if __name__ == '__main__':
+    main()
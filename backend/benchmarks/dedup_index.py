@@ -0,0 +1,61 @@
+"""
+Near-duplicate index build and lookup cost as the number of stored questions grows.
+
+    python -m benchmarks.dedup_index --sizes 10000 100000 200000
+"""
+import argparse
+import random
+import time
+
+from api.dedup import NearDuplicateIndex
+
+WORDS = (
+    "list tuple dict set class method function decorator generator iterator loop "
+    "exception module package import scope closure lambda string integer float "
+    "slice index key value return yield async await thread process memory"
+).split()
+
+
+def make_question(rng, n):
+    words = " ".join(rng.choice(WORDS) for _ in range(12))
+    return {
+        "question": f"Q{n}: which statement about {words} is true?",
+        "options": [" ".join(rng.choice(WORDS) for _ in range(4)) for _ in range(4)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for size in args.sizes:
+        questions = [make_question(rng, n) for n in range(size)]
+        index = NearDuplicateIndex()
+        started = time.perf_counter()
+        for n, question in enumerate(questions):
+            index.add(question, key=n)
+        build = time.perf_counter() - started
+
+        probes = [make_question(rng, size + n) for n in range(args.queries // 2)]
+        reworded = []
+        for question in rng.sample(questions, args.queries // 2):
+            # Reword slightly: swap the first two options and add a word.
+            options = list(question["options"])
+            options[0], options[1] = options[1], options[0]
+            reworded.append({"question": question["question"].replace("true", "correct"), "options": options})
+
+        started = time.perf_counter()
+        hits = sum(index.contains_near_duplicate(q) for q in reworded)
+        false_hits = sum(index.contains_near_duplicate(q) for q in probes)
+        per_query = (time.perf_counter() - started) / (len(reworded) + len(probes))
+
+        print(f"size={size:<8} build={build:6.2f}s ({build / size * 1e6:5.1f}us/question) "
+              f"query={per_query * 1e6:7.1f}us recall={hits / len(reworded):.3f} "
+              f"false_positive_rate={false_hits / len(probes):.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Shared setup for the benchmarks in this package.
+
+Benchmarks run in-process against a throwaway SQLite database (never the
+configured one) with the deterministic fake LLM backend, so they need no
+API key and no network. Run them from ``backend/``, e.g.::
+
+    python -m benchmarks.async_views --requests 200
+"""
+import os
+import statistics
+import tempfile
+
+
+def setup_django(**env):
+    """Configure Django for benchmarking and create a fresh test database."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    os.environ.setdefault('API_KEY', 'benchmark')
+    os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key-not-for-production')
+    os.environ.setdefault('LLM_BACKEND', 'fake')
+    for key, value in env.items():
+        os.environ[key] = str(value)
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    if settings.DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = os.path.join(
+            tempfile.mkdtemp(prefix='quizgen-bench-'), 'bench.sqlite3'
+        )
+    settings.ALLOWED_HOSTS = ['*']
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def create_user(username='bench'):
+    from django.contrib.auth.models import User
+
+    user, created = User.objects.get_or_create(username=username)
+    if created:
+        user.set_password('bench-password')
+        user.save()
+    return user
+
+
+def auth_headers(user):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+def summarize(label, latencies, wall_time):
+    """One formatted result line: throughput plus p50/p99 latency in milliseconds."""
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (
+        f"{label:<28} n={len(ordered):<6} wall={wall_time:7.2f}s "
+        f"rps={len(ordered) / wall_time:8.1f} "
+        f"p50={statistics.median(ordered) * 1000:8.1f}ms p99={p99 * 1000:8.1f}ms"
+    )
@@ -0,0 +1,113 @@
+"""
+Incomplete-quiz lookup and history listing over a large QuizHistory table,
+with and without the lookup indexes.
+
+    python -m benchmarks.history_indexes --rows 1000000 --users 200
+"""
+import argparse
+import datetime
+import random
+import time
+
+from benchmarks.harness import setup_django
+
+TOPICS = [(domain, f"topic-{n}") for domain in ("python", "java", "sql", "ml", "networking") for n in range(20)]
+
+
+def populate(rows, users):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+
+    from api.models import QuizHistory
+
+    User.objects.bulk_create([User(username=f"user{n}") for n in range(users)])
+    user_ids = list(User.objects.values_list('id', flat=True))
+    started = timezone.now() - datetime.timedelta(days=365)
+    rng = random.Random(0)
+    latest = {}
+    batch = []
+    for n in range(rows):
+        user_id, (domain, sub_domain) = rng.choice(user_ids), rng.choice(TOPICS)
+        batch.append(QuizHistory(
+            user_id=user_id, domain=domain, sub_domain=sub_domain, status='completed', score=50.0,
+            created_at=started + datetime.timedelta(seconds=n * 30),
+        ))
+        if len(batch) == 10000:
+            for quiz in QuizHistory.objects.bulk_create(batch):
+                latest[(quiz.user_id, quiz.domain, quiz.sub_domain)] = quiz.id
+            batch = []
+    for quiz in QuizHistory.objects.bulk_create(batch):
+        latest[(quiz.user_id, quiz.domain, quiz.sub_domain)] = quiz.id
+    # The newest quiz of every user and topic is the one still in progress.
+    ids = list(latest.values())
+    for i in range(0, len(ids), 500):
+        QuizHistory.objects.filter(id__in=ids[i:i + 500]).update(status='incomplete')
+    return user_ids
+
+
+def measure(label, user_ids, probes):
+    from django.db import connection
+
+    from api.models import QuizHistory
+
+    rng = random.Random(1)
+    cases = [(rng.choice(user_ids), *rng.choice(TOPICS)) for _ in range(probes)]
+
+    started = time.perf_counter()
+    for user_id, domain, sub_domain in cases:
+        QuizHistory.objects.filter(user_id=user_id, domain=domain, sub_domain=sub_domain, status='incomplete').first()
+    lookup = (time.perf_counter() - started) / probes
+
+    started = time.perf_counter()
+    for user_id, _, _ in cases:
+        list(QuizHistory.objects.filter(user_id=user_id).values_list('id', flat=True)[:50])
+    history = (time.perf_counter() - started) / probes
+
+    user_id, domain, sub_domain = cases[0]
+    with connection.cursor() as cursor:
+        plans = []
+        for queryset in (
+            QuizHistory.objects.filter(user_id=user_id, domain=domain, sub_domain=sub_domain, status='incomplete')[:1],
+            QuizHistory.objects.filter(user_id=user_id)[:50],
+        ):
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plans.append("; ".join(row[-1] for row in cursor.fetchall()))
+
+    print(f"{label:<16} incomplete lookup={lookup * 1000:8.3f}ms  history page={history * 1000:8.3f}ms")
+    print(f"{'':<16} plans: {plans[0]} | {plans[1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--probes', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    from api.models import QuizHistory
+
+    started = time.perf_counter()
+    user_ids = populate(args.rows, args.users)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    print(f"rows={args.rows} users={args.users} populated in {time.perf_counter() - started:.1f}s")
+
+    measure("with indexes", user_ids, args.probes)
+
+    meta = QuizHistory._meta
+    with connection.schema_editor() as editor:
+        for index in meta.indexes:
+            editor.remove_index(QuizHistory, index)
+        for constraint in meta.constraints:
+            editor.remove_constraint(QuizHistory, constraint)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    measure("without", user_ids, args.probes)
+
+
+if __name__ == '__main__':
+    main()
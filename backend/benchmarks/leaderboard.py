@@ -0,0 +1,87 @@
+"""
+Leaderboard reads from the rank table versus aggregating quiz history on
+every request.
+
+    python -m benchmarks.leaderboard --users 50000 --quizzes-per-user 4
+"""
+import argparse
+import random
+import time
+
+from benchmarks.harness import setup_django
+
+DOMAINS = ['python', 'java', 'sql', 'ml', 'networking']
+
+
+def populate(users, per_user):
+    from django.contrib.auth.models import User
+
+    from api.models import QuizHistory
+
+    User.objects.bulk_create([User(username=f"user{n}") for n in range(users)], batch_size=5000)
+    user_ids = list(User.objects.values_list('id', flat=True))
+    rng = random.Random(0)
+    batch = []
+    for user_id in user_ids:
+        for n in range(per_user):
+            batch.append(QuizHistory(user_id=user_id, domain=rng.choice(DOMAINS), sub_domain=f"t{n}",
+                                     status='completed', score=rng.randrange(0, 101, 10)))
+        if len(batch) >= 10000:
+            QuizHistory.objects.bulk_create(batch)
+            batch = []
+    QuizHistory.objects.bulk_create(batch)
+    return user_ids
+
+
+def timed(fn, probes):
+    started = time.perf_counter()
+    for i in range(probes):
+        fn(i)
+    return (time.perf_counter() - started) / probes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--quizzes-per-user', type=int, default=4)
+    parser.add_argument('--probes', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.db.models import Avg, Count, Max
+
+    from api import leaderboard
+    from api.models import QuizHistory
+
+    started = time.perf_counter()
+    user_ids = populate(args.users, args.quizzes_per_user)
+    print(f"users={args.users} quizzes={args.users * args.quizzes_per_user} populated in {time.perf_counter() - started:.1f}s")
+    started = time.perf_counter()
+    leaderboard.rebuild()
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    print(f"rebuild_leaderboards took {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(1)
+    probes = [(rng.choice(user_ids), rng.choice(DOMAINS)) for _ in range(args.probes)]
+    history = QuizHistory.objects.filter(status='completed')
+
+    def on_demand_top(i):
+        list(history.filter(domain=probes[i][1]).values('user_id')
+             .annotate(best=Max('score'), avg=Avg('score'), n=Count('id')).order_by('-best', 'user_id')[:10])
+
+    def on_demand_rank(i):
+        user_id, domain = probes[i]
+        per_user = history.filter(domain=domain).values('user_id').annotate(best=Max('score')).order_by()
+        for mine in per_user.filter(user_id=user_id):
+            per_user.filter(best__gt=mine['best']).count()
+
+    print(f"{'top-10':<10} history aggregate={timed(on_demand_top, args.probes):8.2f}ms  "
+          f"rank table={timed(lambda i: leaderboard.top(probes[i][1]), args.probes):8.3f}ms")
+    print(f"{'my rank':<10} history aggregate={timed(on_demand_rank, args.probes):8.2f}ms  "
+          f"rank table={timed(lambda i: leaderboard.rank_of(probes[i][0], probes[i][1]), args.probes):8.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Login cost: the old username-or-email lookup and triple authentication
+versus the single indexed lookup and single hash, at several PBKDF2 work
+factors.
+
+    python -m benchmarks.login --users 100000 --iterations 1000000,600000,260000
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.harness import setup_django
+
+
+def legacy_serializer():
+    from django.contrib.auth import authenticate
+    from django.contrib.auth.models import User
+    from rest_framework import serializers
+    from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+    from user.serializers import CustomTokenObtainPairSerializer
+
+    class LegacySerializer(CustomTokenObtainPairSerializer):
+        # CustomTokenObtainPairSerializer.validate before the single-query path.
+        def validate(self, attrs):
+            username_or_email = attrs.get("username")
+            user = (
+                User.objects.filter(username__iexact=username_or_email).first()
+                or User.objects.filter(email__iexact=username_or_email).first()
+            )
+            if not user:
+                raise serializers.ValidationError({"detail": "No username or email found."})
+            if not authenticate(username=user.username, password=attrs.get("password")):
+                raise serializers.ValidationError({"detail": "Incorrect password."})
+            attrs["username"] = user.username
+            return TokenObtainPairSerializer.validate(self, attrs)
+
+    return LegacySerializer
+
+
+def timed(fn, probes):
+    latencies = []
+    for i in range(probes):
+        started = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--iterations', default='1000000,600000,260000')
+    parser.add_argument('--probes', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from user.serializers import CustomTokenObtainPairSerializer, find_login_user
+
+    legacy = legacy_serializer()
+    for iterations in (int(n) for n in args.iterations.split(',')):
+        settings.PASSWORD_PBKDF2_ITERATIONS = iterations
+        User.objects.all().delete()
+        password = make_password('bench-password')
+        User.objects.bulk_create([User(username=f"User{n}", email=f"user{n}@example.com", password=password)
+                                  for n in range(args.users)], batch_size=5000)
+        # Log in by email, the old path's worst case (the username lookup misses first).
+        login = lambda serializer: lambda i: serializer(data={
+            'username': f"USER{i * 7919 % args.users}@example.com", 'password': 'bench-password',
+        }).is_valid(raise_exception=True)
+
+        with CaptureQueriesContext(connection) as old_queries:
+            login(legacy)(0)
+        with CaptureQueriesContext(connection) as new_queries:
+            login(CustomTokenObtainPairSerializer)(0)
+        old_ms, new_ms = timed(login(legacy), args.probes), timed(login(CustomTokenObtainPairSerializer), args.probes)
+        print(f"pbkdf2 {iterations:>9}: login p50 old={old_ms:7.1f}ms ({len(old_queries)} queries)  "
+              f"new={new_ms:7.1f}ms ({len(new_queries)} queries)  {1000 / new_ms:5.1f} logins/s/core")
+
+    lookup_old = timed(lambda i: User.objects.filter(username__iexact=f"x{i}").first()
+                       or User.objects.filter(email__iexact=f"USER{i}@example.com").first(), args.probes)
+    lookup_new = timed(lambda i: find_login_user(f"USER{i}@example.com"), args.probes)
+    print(f"lookup only ({args.users} users): old={lookup_old:.2f}ms  new={lookup_new:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Bytes on the wire for a typical 20-question quiz, as served by
+``resume-quiz`` and ``quiz-history?include=questions``: uncompressed,
+gzip, brotli (if installed) and as a 304 revalidation, with the server time
+of a full response versus a 304. The fake LLM's questions are more alike
+than real ones, so real payloads compress somewhat less.
+
+    python -m benchmarks.payloads --questions 20 --requests 200
+"""
+import argparse
+import time
+
+from benchmarks.harness import auth_headers, create_user, setup_django
+
+
+def timed(client, url, headers, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url, headers=headers)
+    return (time.perf_counter() - started) / requests * 1000, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--quizzes', type=int, default=10, help='quizzes in the history page')
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+
+    from api import compression
+    from api.models import QuizHistory
+    from api.question_bank import get_ai_service
+
+    user = create_user()
+    for n in range(args.quizzes):
+        questions = get_ai_service().generate_quiz_questions("python", f"topic {n}", args.questions, "medium")
+        QuizHistory.objects.create(user=user, domain="python", sub_domain=f"topic {n}",
+                                   questions=[{'id': i + 1, **q} for i, q in enumerate(questions)])
+
+    client, headers = Client(), auth_headers(user)
+    encodings = ['identity', 'gzip'] + (['br'] if compression.brotli else [])
+    for label, url in (('resume-quiz', '/resume-quiz/?domain=python&sub_domain=topic+0'),
+                       (f'history ({args.quizzes} quizzes)', f'/quiz-history/?include=questions&page_size={args.quizzes}')):
+        sizes = {}
+        for encoding in encodings:
+            response = client.get(url, headers={**headers, 'Accept-Encoding': encoding})
+            assert response.status_code == 200, response.status_code
+            sizes[encoding] = len(response.content)
+        full_ms, response = timed(client, url, {**headers, 'Accept-Encoding': 'gzip'}, args.requests)
+        revalidate_ms, not_modified = timed(client, url, {**headers, 'If-None-Match': response['ETag']}, args.requests)
+        assert not_modified.status_code == 304, not_modified.status_code
+
+        plain = sizes.pop('identity')
+        print(f"{label}: identity={plain}B  " + "  ".join(
+            f"{encoding}={size}B ({100 - size * 100 / plain:.0f}% saved)" for encoding, size in sizes.items()
+        ) + "  304=0B body")
+        print(f"{'':>{len(label)}}  server time: 200 (gzip) {full_ms:.2f}ms  304 {revalidate_ms:.2f}ms")
+    if not compression.brotli:
+        print("brotli not installed; pip install brotli to add it")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Catalog prewarm throughput by worker count, against the fake LLM with a
+fixed per-call latency.
+
+Each topic is filled with one generation, so with W workers and latency L
+a catalog of T topics should take about ``T / W * L`` seconds until the
+rate limit (if any) becomes the bound.
+
+    python -m benchmarks.prewarm --domains 10 --sub-domains 5 --latency 0.5
+"""
+import argparse
+
+from benchmarks.harness import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--domains', type=int, default=10)
+    parser.add_argument('--sub-domains', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.5, help='fake LLM latency in seconds')
+    parser.add_argument('--questions', type=int, default=5, help='questions per topic')
+    parser.add_argument('--workers', default='1,8,32', help='comma-separated worker counts')
+    parser.add_argument('--rate', type=float, default=0, help='provider requests per minute (0 = unlimited)')
+    args = parser.parse_args()
+
+    # One shard per topic, so each topic costs exactly one provider call.
+    setup_django(FAKE_LLM_LATENCY=args.latency, LLM_SHARD_SIZE=args.questions, LLM_HEDGE_PERCENTILE=0)
+    from api import prewarm
+
+    print(f"{args.domains * args.sub_domains * 3} topics, {args.questions} questions each, "
+          f"fake LLM latency {args.latency}s, rate {args.rate or 'unlimited'}/min")
+    for run, workers in enumerate(int(w) for w in args.workers.split(',')):
+        # A fresh catalog per run so earlier runs' pools don't count.
+        topics = [prewarm.Topic(f"domain {d}", f"topic {s} run {run}", level)
+                  for d in range(args.domains) for s in range(args.sub_domains) for level in prewarm.LEVELS]
+        limiter = prewarm.RateLimiter(args.rate, burst=workers) if args.rate else None
+        stats = prewarm.prewarm(topics, args.questions, workers, args.questions, limiter=limiter)
+        print(f"{workers:>3} workers  {stats.summary()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Concurrent progress saves against SQLite, written straight through versus
+buffered by the write-behind layer (``PROGRESS_WRITE_BEHIND``).
+
+Each request records one answer or moves the question index, as the quiz
+page does on every click. Straight through, every request takes SQLite's
+single write lock; buffered, requests only read and touch the cache, and
+one flush writes all quizzes.
+
+    python -m benchmarks.progress_writes --requests 2000 --workers 16 --quizzes 200
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import auth_headers, create_user, setup_django, summarize
+
+
+def run(requests, workers, quiz_ids, headers):
+    from django.db import close_old_connections
+    from django.test import Client
+
+    rng = random.Random(0)
+    plan = [(rng.choice(quiz_ids), rng.randrange(10), rng.random() < 0.8) for _ in range(requests)]
+
+    def one(step):
+        quiz_id, index, answer = step
+        started = time.perf_counter()
+        client = Client(headers=headers)
+        if answer:
+            response = client.patch(f'/answer/{quiz_id}/', {"index": index, "selected": 1 << (index % 4)},
+                                    content_type='application/json')
+        else:
+            response = client.post(f'/save-progress/{quiz_id}/', {"current_question_index": index},
+                                   content_type='application/json')
+        assert response.status_code in (200, 204), response.content
+        close_old_connections()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(one, plan))
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--quizzes', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django(PROGRESS_FLUSH_INTERVAL=3600)
+    from django.conf import settings
+    from django.db import connection
+
+    from api import progress
+    from api.models import QuizHistory
+    from api.services import FakeBackend, QuizSpec
+
+    user = create_user()
+    headers = auth_headers(user)
+    questions = [q.model_dump() for q in FakeBackend(latency=0).build_questions(QuizSpec('bench', 'x', 'easy', 10), 0).questions]
+    quiz_ids = [
+        QuizHistory.objects.create(user=user, domain='bench', sub_domain=f'topic-{n}', questions=questions).id
+        for n in range(args.quizzes)
+    ]
+    connection.close()
+
+    for write_behind in (False, True):
+        settings.PROGRESS_WRITE_BEHIND = write_behind
+        latencies, wall = run(args.requests, args.workers, quiz_ids, headers)
+        label = 'write-behind' if write_behind else 'write-through'
+        print(summarize(label, latencies, wall))
+        if write_behind:
+            pending = progress.pending_count()
+            started = time.perf_counter()
+            progress.flush()
+            print(f"{'':<28} flush of {pending} quizzes took {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+On-disk size of quiz questions: inline JSON per attempt versus normalized
+``Question`` rows plus the ordered join table.
+
+Quizzes draw their questions from a shared pool, as they do from the
+question bank, so the same question appears in many attempts.
+
+    python -m benchmarks.question_storage --quizzes 5000 --pool 500
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.harness import create_user, setup_django
+
+
+def table_bytes(cursor, prefix):
+    """Pages used by tables (and their indexes) whose name starts with ``prefix``."""
+    cursor.execute(
+        "SELECT COALESCE(SUM(s.pgsize), 0) FROM dbstat s JOIN sqlite_schema m ON s.name = m.name "
+        "WHERE m.tbl_name LIKE %s", [prefix + '%']
+    )
+    return cursor.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quizzes', type=int, default=5000)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--pool', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    from api.models import Question, QuizHistory
+    from api.services import FakeBackend, QuizSpec
+
+    user = create_user()
+    spec = QuizSpec('python', 'lists', 'medium', args.pool)
+    pool = [q.model_dump() for q in FakeBackend(latency=0).build_questions(spec, 0).questions]
+    rng = random.Random(0)
+
+    inline_bytes = 0
+    started = time.perf_counter()
+    for _ in range(args.quizzes):
+        questions = [{**q, 'id': i} for i, q in enumerate(rng.sample(pool, args.questions), start=1)]
+        inline_bytes += len(json.dumps(questions).encode('utf-8'))
+        # Completed, since a user may only have one incomplete quiz per topic.
+        QuizHistory.objects.create(user=user, domain='python', sub_domain='lists', questions=questions,
+                                   status='completed')
+    write = time.perf_counter() - started
+
+    with connection.cursor() as cursor:
+        normalized = table_bytes(cursor, 'api_question') + table_bytes(cursor, 'api_quizhistoryquestion')
+
+    probe = Question.objects.order_by('?').first()
+    started = time.perf_counter()
+    users = probe.quiz_links.values('quiz__user').distinct().count()
+    lookup = time.perf_counter() - started
+
+    print(f"quizzes={args.quizzes} questions/quiz={args.questions} pool={args.pool} "
+          f"write={write / args.quizzes * 1000:.2f}ms/quiz")
+    print(f"inline JSON  ~{inline_bytes / 1024:10.0f} KiB (payload only, before page overhead)")
+    print(f"normalized    {normalized / 1024:10.0f} KiB (api_question + join table, with indexes)")
+    print(f"quizzes using one question: {probe.quiz_links.count()} across {users} user(s) in {lookup * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
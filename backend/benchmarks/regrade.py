@@ -0,0 +1,84 @@
+"""
+Rescoring completed quizzes: ``manage.py regrade`` (chunked reads, NumPy
+scoring over answer bitmasks, ``bulk_update``) versus loading and saving
+each quiz and scoring it with the old per-question set comparison.
+
+    python -m benchmarks.regrade --quizzes 200000 --questions 10 --pool 2000
+"""
+import argparse
+import io
+import random
+import time
+
+from benchmarks.harness import create_user, setup_django
+
+
+def legacy_score(questions, user_answers):
+    """The scorer ``mark_quiz_complete`` used before api.scoring."""
+    correct_count = 0
+    for i, question in enumerate(questions):
+        if i < len(user_answers):
+            normalize = lambda arr: set(str(a).strip().lower() for a in arr)
+            if normalize(user_answers[i]) == normalize(question.get('correct_answers', [])):
+                correct_count += 1
+    return round((correct_count / len(questions)) * 100, 2) if questions else 0
+
+
+def populate(quizzes, questions, pool_size):
+    from api.models import Question, QuizHistory, QuizHistoryQuestion
+    from api.services import FakeBackend, QuizSpec
+
+    user = create_user()
+    spec = QuizSpec('python', 'lists', 'medium', pool_size)
+    contents = [q.model_dump(exclude={'id'}) for q in FakeBackend(latency=0).build_questions(spec, 0).questions]
+    pool = Question.objects.get_or_create_many(contents)
+    rng = random.Random(0)
+
+    for start in range(0, quizzes, 5000):
+        batch = QuizHistory.objects.bulk_create([
+            QuizHistory(user=user, domain='python', sub_domain=f'topic-{n}', status='completed', score=0)
+            for n in range(start, min(quizzes, start + 5000))
+        ])
+        QuizHistoryQuestion.objects.bulk_create([
+            QuizHistoryQuestion(quiz=quiz, question=question, position=position, item_id=position + 1,
+                                selected=1 << rng.randrange(4))
+            for quiz in batch
+            for position, question in enumerate(rng.sample(pool, questions))
+        ], batch_size=10000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quizzes', type=int, default=200000)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--pool', type=int, default=2000)
+    parser.add_argument('--legacy-sample', type=int, default=2000, help='quizzes timed on the per-quiz path')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+
+    from api.models import QuizHistory
+
+    started = time.perf_counter()
+    populate(args.quizzes, args.questions, args.pool)
+    print(f"quizzes={args.quizzes} questions/quiz={args.questions} populated in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    for quiz in QuizHistory.objects.with_questions()[:args.legacy_sample]:
+        quiz.score = legacy_score(quiz.questions, quiz.user_answers)
+        quiz.save(update_fields=['score'])
+    legacy = (time.perf_counter() - started) / args.legacy_sample
+
+    out = io.StringIO()
+    started = time.perf_counter()
+    call_command('regrade', stdout=out)
+    bulk = (time.perf_counter() - started) / args.quizzes
+
+    print(f"per-quiz load/score/save  {legacy * 1e6:8.1f}us/quiz  (~{legacy * 1e6 / 60:6.1f} min per million)")
+    print(f"manage.py regrade         {bulk * 1e6:8.1f}us/quiz  (~{bulk * 1e6 / 60:6.1f} min per million)")
+    print(out.getvalue().strip())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Token refresh latency as the outstanding and blacklisted token tables
+grow: simplejwt's ``TokenRefreshSerializer`` (a user query and a blacklist
+query per refresh) versus ``FastTokenRefreshSerializer``, plus the cost of
+pruning the expired half of the tables.
+
+The query-free path needs a cache shared between workers; with the default
+per-process cache each refresh still makes one indexed query. Pass e.g.
+``--cache-url filecache:///tmp/quizgen-bench-cache`` to measure it shared.
+
+    python -m benchmarks.token_blacklist --rows 10000,100000,1000000
+"""
+import argparse
+import time
+import uuid
+from datetime import timedelta
+
+from benchmarks.harness import create_user, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='10000,100000,1000000', help='comma-separated outstanding token counts')
+    parser.add_argument('--refreshes', type=int, default=2000)
+    parser.add_argument('--cache-url', help='CACHE_URL for the auth cache (default: per-process locmem)')
+    args = parser.parse_args()
+
+    setup_django(**({'CACHE_URL': args.cache_url} if args.cache_url else {}))
+    from django.db import connection
+    from django.utils import timezone
+    from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+    from user.blacklist import FastRefreshToken, cache_is_shared, prune_expired, token_blacklist
+    from user.serializers import FastTokenRefreshSerializer
+
+    print(f"auth cache {'shared' if cache_is_shared() else 'per-process'}")
+    user = create_user()
+    refresh = str(FastRefreshToken.for_user(user))
+    total = 0
+    for rows in (int(n) for n in args.rows.split(',')):
+        # Half expired, and every other token blacklisted, as after many logouts.
+        now = timezone.now()
+        tokens = OutstandingToken.objects.bulk_create([
+            OutstandingToken(user=user, jti=uuid.uuid4().hex, token='',
+                             expires_at=now + timedelta(days=-1 if n % 2 else 1))
+            for n in range(rows - total)
+        ], batch_size=5000)
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=t) for t in tokens[::2]], batch_size=5000)
+        total = rows
+
+        token_blacklist.reset()
+        started = time.perf_counter()
+        FastTokenRefreshSerializer(data={'refresh': refresh}).is_valid(raise_exception=True)
+        load_ms = (time.perf_counter() - started) * 1000
+        results = []
+        for serializer in (TokenRefreshSerializer, FastTokenRefreshSerializer):
+            queries = []
+            with connection.execute_wrapper(lambda execute, *a: queries.append(1) or execute(*a)):
+                started = time.perf_counter()
+                for _ in range(args.refreshes):
+                    serializer(data={'refresh': refresh}).is_valid(raise_exception=True)
+                elapsed = time.perf_counter() - started
+            results.append(f"{serializer.__name__} {elapsed / args.refreshes * 1e6:7.1f}us "
+                           f"({len(queries) / args.refreshes:.1f} queries)")
+        print(f"{rows:>8} tokens: {'  '.join(results)}  filter load {load_ms:.0f}ms")
+
+    started = time.perf_counter()
+    deleted = prune_expired()
+    print(f"pruned {deleted} expired tokens in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Bulk import throughput and export memory.
+
+Imports ``--questions`` generated questions from an NDJSON file through
+``manage.py import_questions``, then exports the resulting quiz history
+and reports peak Python memory for the export, which should not grow with
+the number of rows.
+
+    python -m benchmarks.transfer --questions 200000 --quizzes 50000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+
+from benchmarks.harness import setup_django, create_user
+
+LEVELS = ['easy', 'medium', 'hard']
+
+
+def write_sets(path, questions, set_size=500):
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, questions, set_size):
+            topic = start // set_size
+            f.write(json.dumps({
+                'domain': f'domain {topic % 20}', 'sub_domain': f'topic {topic}', 'level': LEVELS[topic % 3],
+                'questions': [{
+                    'question': f'Question {n}: which of these holds?',
+                    'options': [f'{n}-{c}' for c in 'abcd'],
+                    'correct_answers': [f'{n}-a'],
+                    'explanation': 'Because.',
+                    'sub_topic': f'concept {n % 7}',
+                } for n in range(start, min(start + set_size, questions))],
+            }) + '\n')
+
+
+def populate_history(quizzes, per_quiz):
+    from api.models import Question, QuizHistory, QuizHistoryQuestion
+
+    user = create_user()
+    question_ids = list(Question.objects.values_list('id', flat=True)[:per_quiz * 10])
+    for start in range(0, quizzes, 5000):
+        batch = QuizHistory.objects.bulk_create([
+            QuizHistory(user=user, domain='domain', sub_domain=f'topic {n}', status='completed', score=50.0)
+            for n in range(start, min(start + 5000, quizzes))
+        ])
+        QuizHistoryQuestion.objects.bulk_create([
+            QuizHistoryQuestion(quiz=quiz, question_id=question_ids[(quiz.id + p) % len(question_ids)],
+                                position=p, item_id=p + 1, selected=1)
+            for quiz in batch for p in range(per_quiz)
+        ], batch_size=5000)
+
+
+class NullWriter(StringIO):
+    """Counts what is written without keeping it."""
+    written = 0
+
+    def write(self, text):
+        self.written += len(text)
+        return len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=200000)
+    parser.add_argument('--quizzes', type=int, default=50000)
+    parser.add_argument('--questions-per-quiz', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+
+    from api import transfer
+    from api.models import QuizHistory
+
+    path = os.path.join(tempfile.mkdtemp(prefix='quizgen-transfer-'), 'sets.ndjson')
+    write_sets(path, args.questions)
+    started = time.perf_counter()
+    call_command('import_questions', path)
+    elapsed = time.perf_counter() - started
+    print(f"import   {args.questions} questions in {elapsed:.1f}s ({args.questions / elapsed:,.0f} rows/s)")
+
+    populate_history(args.quizzes, args.questions_per_quiz)
+    for fmt in transfer.FORMATS:
+        for quizzes in (args.quizzes // 10, args.quizzes):
+            selected = QuizHistory.objects.filter(id__lte=quizzes)
+            sink = NullWriter()
+            started = time.perf_counter()
+            rows = transfer.export_history(selected, fmt, sink)
+            elapsed = time.perf_counter() - started
+            # A second, slower pass under tracemalloc for the memory peak.
+            tracemalloc.start()
+            transfer.export_history(selected, fmt, NullWriter())
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"export   {fmt:<6} {quizzes:>8} quizzes {rows:>9} records in {elapsed:6.1f}s "
+                  f"({rows / elapsed:,.0f}/s)  {sink.written / 2 ** 20:7.1f} MiB written  peak {peak / 2 ** 20:5.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
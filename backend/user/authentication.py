@@ -0,0 +1,121 @@
+"""
+JWT authentication without a user query per request.
+
+``CachedJWTAuthentication`` (the default) resolves the token's user from
+Django's cache, keeping each ``User`` for ``AUTH_USER_CACHE_TTL`` seconds.
+``ClaimsJWTAuthentication`` is for read-only endpoints that only need to
+know who is asking: on safe methods it builds the user from the token's
+claims, with no query and only a cache check for revoked users.
+
+Saving or deleting a ``User`` (e.g. through ``ProfileEditView``,
+``ChangePasswordView`` or the admin) drops the cached copy. Deactivating
+or deleting one also marks its id as revoked until any access token it
+holds has expired, which the claims path checks as well. ``QuerySet.update``
+sends no signals; call ``forget_user`` after updating users that way.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _cache():
+    return caches[settings.AUTH_CACHE_ALIAS]
+
+
+def _user_key(user_id) -> str:
+    return f"quizgen:auth:user:{user_id}"
+
+
+def _revoked_key(user_id) -> str:
+    return f"quizgen:auth:revoked:{user_id}"
+
+
+def forget_user(user, revoke: bool = False) -> None:
+    """Drop ``user`` from the cache; with ``revoke``, also refuse its tokens until they expire."""
+    user_id = getattr(user, api_settings.USER_ID_FIELD)
+    cache = _cache()
+    cache.delete(_user_key(user_id))
+    if revoke:
+        lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+        cache.set(_revoked_key(user_id), True, timeout=int(lifetime) + 1)
+    else:
+        cache.delete(_revoked_key(user_id))
+
+
+def _user_saved(sender, instance, **kwargs):
+    forget_user(instance, revoke=not instance.is_active)
+
+
+def _user_deleted(sender, instance, **kwargs):
+    forget_user(instance, revoke=True)
+
+
+def connect_signals() -> None:
+    user_model = get_user_model()
+    post_save.connect(_user_saved, sender=user_model, dispatch_uid='quizgen-auth-user-saved')
+    post_delete.connect(_user_deleted, sender=user_model, dispatch_uid='quizgen-auth-user-deleted')
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` with the user row cached between requests."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        cache = _cache()
+        user = cache.get(_user_key(user_id))
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(_user_key(user_id), user, timeout=settings.AUTH_USER_CACHE_TTL)
+            return user
+
+        # The checks JWTAuthentication makes after its query.
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and (
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """
+    For read-only endpoints: on safe methods, ``request.user`` is an unsaved
+    ``User`` holding only the token's id and username, enough to filter by.
+    Other methods fall back to the cached user.
+    """
+
+    def authenticate(self, request):
+        self.method = request.method
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if getattr(self, 'method', None) not in SAFE_METHODS or api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+        if _cache().get(_revoked_key(user_id)):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        user = get_user_model()(**{api_settings.USER_ID_FIELD: user_id}, username=validated_token.get('username', ''))
+        # Saving it would blank out the real row.
+        user.save = _read_only
+        return user
+
+
+def _read_only(*args, **kwargs):
+    raise TypeError("A user built from token claims cannot be saved.")
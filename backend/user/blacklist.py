@@ -0,0 +1,178 @@
+"""
+Refresh-token blacklist checks that rarely reach the database.
+
+simplejwt's blacklist asks the database on every token refresh whether the
+token's jti has been blacklisted. Almost every answer is "no", so the
+blacklisted jtis are also kept in:
+
+- a cache entry per blacklisted jti in the ``AUTH_CACHE_ALIAS`` cache,
+  kept until the token expires.
+- a Bloom filter per process, loaded from the database on first use and
+  then topped up with newly blacklisted rows at most every
+  ``BLACKLIST_SYNC_INTERVAL`` seconds. The rare false positive is settled
+  by the database.
+
+A jti the filter has never seen is only taken as not blacklisted, with no
+query, when the cache is shared between workers (anything but the locmem
+and dummy backends): then a logout in one worker is in the cache for all of
+them at once. With a per-process cache, a logout in another worker would go
+unseen until the next sync, so the miss is confirmed against the database
+and each refresh makes one indexed query.
+
+``prune_tokens`` deletes expired outstanding and blacklisted tokens in
+batches, so the tables stay bounded.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter of strings, sized for ``capacity`` items at ``error_rate``."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        # Double hashing: k positions from two 64-bit hashes.
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def _cache():
+    return caches[settings.AUTH_CACHE_ALIAS]
+
+
+_PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared() -> bool:
+    """Whether every worker sees the ``AUTH_CACHE_ALIAS`` cache's writes."""
+    return settings.CACHES[settings.AUTH_CACHE_ALIAS]['BACKEND'] not in _PROCESS_LOCAL_CACHES
+
+
+def _cache_key(jti: str) -> str:
+    return f"quizgen:auth:blacklisted:{jti}"
+
+
+class TokenBlacklist:
+    """Process-wide view of the blacklisted refresh-token jtis; see the module docstring."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._last_id = 0
+        self._synced_at = 0.0
+
+    def _load(self) -> None:
+        live = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        capacity = max(settings.BLACKLIST_BLOOM_CAPACITY, 2 * live.count())
+        bloom = BloomFilter(capacity, settings.BLACKLIST_BLOOM_ERROR_RATE)
+        last_id = 0
+        for row_id, jti in live.order_by('id').values_list('id', 'token__jti').iterator(chunk_size=10000):
+            bloom.add(jti)
+            last_id = row_id
+        self._bloom = bloom
+        self._last_id = max(last_id, BlacklistedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0)
+        self._synced_at = time.monotonic()
+
+    def _sync(self) -> BloomFilter:
+        with self._lock:
+            if self._bloom is None or self._bloom.count > self._bloom.capacity:
+                # Sized afresh from the live tokens once it has filled up.
+                self._load()
+                return self._bloom
+            if time.monotonic() - self._synced_at < settings.BLACKLIST_SYNC_INTERVAL:
+                return self._bloom
+            rows = BlacklistedToken.objects.filter(id__gt=self._last_id).order_by('id').values_list('id', 'token__jti')
+            for row_id, jti in rows.iterator(chunk_size=10000):
+                self._bloom.add(jti)
+                self._last_id = row_id
+            self._synced_at = time.monotonic()
+            return self._bloom
+
+    def add(self, jti: str, expires_at: int) -> None:
+        """Record a jti just blacklisted in the database, until ``expires_at`` (a Unix time)."""
+        _cache().set(_cache_key(jti), True, timeout=max(1, int(expires_at - time.time())))
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def contains(self, jti: str) -> bool:
+        if _cache().get(_cache_key(jti)):
+            return True
+        if jti not in self._sync() and cache_is_shared():
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def reset(self) -> None:
+        """Forget the filter; it is reloaded from the database on next use."""
+        with self._lock:
+            self._bloom = None
+
+
+token_blacklist = TokenBlacklist()
+
+
+class FastRefreshToken(RefreshToken):
+    """``RefreshToken`` checked against ``token_blacklist`` instead of a query per check."""
+
+    def check_blacklist(self) -> None:
+        if token_blacklist.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        token_blacklist.add(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
+
+
+def prune_expired(batch_size: int = 5000, pause: float = 0.0) -> int:
+    """
+    Delete outstanding tokens that have expired, with their blacklist rows,
+    ``batch_size`` at a time so no statement holds locks for long.
+
+    Returns:
+        int: the number of outstanding tokens deleted.
+    """
+    deleted = 0
+    now = timezone.now()
+    while True:
+        ids = list(OutstandingToken.objects.filter(expires_at__lte=now)
+                   .order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
+    return deleted
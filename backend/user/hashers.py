@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    ``pbkdf2_sha256`` with its iteration count taken from
+    ``PASSWORD_PBKDF2_ITERATIONS``.
+
+    Hashes keep the same algorithm name, so existing passwords verify; a
+    password stored at a different count is rehashed at its next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
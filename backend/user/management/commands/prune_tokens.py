@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.blacklist import prune_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted refresh tokens in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Tokens deleted per transaction.")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument('--every', type=float, default=0,
+                            help="Keep running, pruning every this many seconds (0 = prune once and exit).")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if options['pause'] < 0 or options['every'] < 0:
+            raise CommandError("--pause and --every cannot be negative")
+
+        while True:
+            started = time.perf_counter()
+            deleted = prune_expired(options['batch_size'], options['pause'])
+            self.stdout.write(f"Pruned {deleted} expired tokens in {time.perf_counter() - started:.1f}s.")
+            if not options['every']:
+                return
+            try:
+                time.sleep(options['every'])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+# Functional indexes for the case-insensitive username-or-email lookup at
+# login. auth.User is not ours to add Meta indexes to, so they are created
+# in SQL (valid for both SQLite and PostgreSQL).
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX user_username_lower_idx ON auth_user (LOWER(username));',
+            reverse_sql='DROP INDEX user_username_lower_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX user_email_lower_idx ON auth_user (LOWER(email));',
+            reverse_sql='DROP INDEX user_email_lower_idx;',
+        ),
+    ]
@@ -1,8 +1,15 @@
-from django.contrib.auth.models import User
+from django.contrib.auth.models import User, update_last_login
 from django.contrib.auth.password_validation import get_default_password_validators
 from django.core.exceptions import ValidationError
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Lower
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import CachedJWTAuthentication
+from .blacklist import FastRefreshToken
 
 
 class SignupSerializer(serializers.ModelSerializer):
@@ -48,8 +55,26 @@ class SignupSerializer(serializers.ModelSerializer):
         return user
 
 
+def find_login_user(username_or_email):
+    """
+    The user whose username, or failing that email, matches case-insensitively.
+
+    One query, served by the lower(username) and lower(email) indexes.
+    """
+    if not username_or_email:
+        return None
+    key = Lower(Value(username_or_email))
+    return (
+        User.objects.alias(username_lower=Lower("username"), email_lower=Lower("email"))
+        .filter(Q(username_lower=key) | Q(email_lower=key))
+        .order_by(Case(When(username_lower=key, then=0), default=1), "pk")
+        .first()
+    )
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Allows login using username OR email"""
+    token_class = FastRefreshToken
 
     @classmethod
     def get_token(cls, user):
@@ -58,27 +83,53 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return token
 
     def validate(self, attrs):
-        from django.contrib.auth import authenticate, get_user_model
-        User = get_user_model()
-
-        username_or_email = attrs.get("username")
-        password = attrs.get("password")
-
-        # Try username or email
-        user = (
-            User.objects.filter(username__iexact=username_or_email).first()
-            or User.objects.filter(email__iexact=username_or_email).first()
-        )
-
+        """
+        Resolve the username or email in one query and check the password
+        once, instead of looking the user up again in ``authenticate()``.
+        """
+        user = find_login_user(attrs.get("username"))
         if not user:
             raise serializers.ValidationError({"detail": "No username or email found."})
 
-        user_auth = authenticate(username=user.username, password=password)
-        if not user_auth:
+        # check_password also rehashes the password if the hasher settings changed.
+        if not user.check_password(attrs.get("password")) or not user.is_active:
             raise serializers.ValidationError({"detail": "Incorrect password."})
 
-        attrs["username"] = user.username
-        return super().validate(attrs)
+        self.user = user
+        refresh = self.get_token(user)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        return {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+
+class FastTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    ``TokenRefreshSerializer`` that checks the blacklist through
+    ``FastRefreshToken`` and reads the user from the auth cache, so a
+    refresh makes no queries with a shared cache (one indexed query
+    without), however large the token tables grow.
+    """
+    token_class = FastRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        try:
+            user = CachedJWTAuthentication().get_user(refresh)
+        except AuthenticationFailed:
+            user = None
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        data = {"access": str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -1,3 +1,153 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import token_blacklist
+from .hashers import TunablePBKDF2PasswordHasher
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class LoginTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="Quinn", email="Quinn@Example.com", password="s3cret-pass")
+		# Someone else's email spelled like Quinn's username: the username match wins.
+		User.objects.create_user(username="rex", email="quinn", password="other-pass")
+		self.client = APIClient()
+		self.url = reverse("token_obtain_pair")
+
+	def login(self, username, password="s3cret-pass"):
+		return self.client.post(self.url, {"username": username, "password": password}, format="json")
+
+	def test_username_or_email_in_one_query_and_one_hash(self):
+		verify = mock.patch.object(TunablePBKDF2PasswordHasher, "verify", autospec=True,
+								   side_effect=TunablePBKDF2PasswordHasher.verify)
+		for username in ("quinn", "QUINN@example.COM"):
+			# The user lookup plus recording the refresh token as outstanding.
+			with verify as verified, self.assertNumQueries(2):
+				response = self.login(username)
+			self.assertEqual(response.status_code, 200)
+			self.assertEqual(verified.call_count, 1)
+			self.assertEqual(set(response.json()), {"access", "refresh"})
+
+	def test_errors(self):
+		self.assertEqual(self.login("nobody").json(), {"detail": ["No username or email found."]})
+		self.assertEqual(self.login("quinn", "wrong-pass").json(), {"detail": ["Incorrect password."]})
+		User.objects.filter(pk=self.user.pk).update(is_active=False)
+		self.assertEqual(self.login("quinn").status_code, 400)
+
+	def test_password_rehashed_when_work_factor_changes(self):
+		self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+		with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+			self.assertEqual(self.login("quinn").status_code, 200)
+		self.user.refresh_from_db()
+		self.assertTrue(self.user.password.startswith("pbkdf2_sha256$2000$"))
+		self.assertEqual(self.login("quinn").status_code, 200)
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class CachedAuthenticationTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(username="sam", email="sam@example.com", password="s3cret-pass")
+		self.client = APIClient()
+		self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+	def user_queries(self, method, url, data=None):
+		with CaptureQueriesContext(connection) as queries:
+			response = getattr(self.client, method)(url, data, format="json")
+		return response, sum('FROM "auth_user"' in q["sql"] for q in queries.captured_queries)
+
+	def test_user_cached_until_edited(self):
+		self.assertEqual(self.user_queries("get", reverse("profile"))[1], 1)
+		response, queries = self.user_queries("get", reverse("profile"))
+		self.assertEqual((response.json()["first_name"], queries), ("", 0))
+
+		self.client.patch(reverse("profile-edit"), {"first_name": "Sam"}, format="json")
+		self.assertEqual(self.user_queries("get", reverse("profile"))[0].json()["first_name"], "Sam")
+
+		response = self.client.post(reverse("change-password"), {
+			"old_password": "s3cret-pass", "new_password": "n3w-pass-word", "new_password2": "n3w-pass-word",
+		}, format="json")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(self.user_queries("get", reverse("profile"))[1], 1)
+
+	def test_read_only_endpoints_use_token_claims(self):
+		response, queries = self.user_queries("get", reverse("quiz-history"))
+		self.assertEqual((response.status_code, queries), (200, 0))
+		response, queries = self.user_queries("get", reverse("leaderboard"))
+		self.assertEqual((response.status_code, queries), (200, 0))
+
+	def test_deactivation_revokes_cached_and_claims_access(self):
+		self.client.get(reverse("profile"))
+		self.user.is_active = False
+		self.user.save()
+		self.assertEqual(self.client.get(reverse("profile")).status_code, 401)
+		self.assertEqual(self.client.get(reverse("quiz-history")).status_code, 401)
+		self.user.is_active = True
+		self.user.save()
+		self.assertEqual(self.client.get(reverse("quiz-history")).status_code, 200)
+
+
+class TokenBlacklistTest(TestCase):
+	def setUp(self):
+		cache.clear()
+		token_blacklist.reset()
+		User.objects.create_user(username="sam", email="sam@example.com", password="s3cret-pass")
+		self.client = APIClient()
+		self.tokens = self.client.post(reverse("token_obtain_pair"), {
+			"username": "sam", "password": "s3cret-pass",
+		}, format="json").json()
+
+	def refresh(self):
+		return self.client.post(reverse("token_refresh"), {"refresh": self.tokens["refresh"]}, format="json")
+
+	def test_refresh_skips_database_until_logout(self):
+		self.assertEqual(self.refresh().status_code, 200)
+		with mock.patch("user.blacklist.cache_is_shared", return_value=True):
+			with CaptureQueriesContext(connection) as queries:
+				self.assertEqual(self.refresh().status_code, 200)
+		self.assertEqual(len(queries), 0)
+
+		self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+		self.assertEqual(self.client.post(reverse("logout"), {"refresh": self.tokens["refresh"]}).status_code, 205)
+		self.assertEqual(self.refresh().status_code, 401)
+
+		# A worker that did not see the logout finds it when it loads the filter.
+		cache.clear()
+		token_blacklist.reset()
+		self.assertEqual(self.refresh().status_code, 401)
+
+	def test_per_process_cache_confirms_misses_in_database(self):
+		self.assertEqual(self.refresh().status_code, 200)
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(self.refresh().status_code, 200)
+		self.assertEqual(len(queries), 1)
+
+		# Blacklisted by another worker: not in this process's cache or filter yet.
+		RefreshToken(self.tokens["refresh"]).blacklist()
+		self.assertEqual(self.refresh().status_code, 401)
+
+	def test_prune_deletes_only_expired_tokens(self):
+		past = timezone.now() - timedelta(days=1)
+		for n in range(3):
+			expired = OutstandingToken.objects.create(jti=f"old-{n}", token="", expires_at=past)
+			BlacklistedToken.objects.create(token=expired)
+
+		out = StringIO()
+		call_command("prune_tokens", "--batch-size", "2", stdout=out)
+		self.assertIn("Pruned 3 expired tokens", out.getvalue())
+		self.assertEqual(OutstandingToken.objects.count(), 1)
+		self.assertEqual(BlacklistedToken.objects.count(), 0)
+		self.assertEqual(self.refresh().status_code, 200)
@@ -6,8 +6,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from .blacklist import FastRefreshToken
 from .serializers import (
     SignupSerializer,
     CustomTokenObtainPairSerializer,
@@ -48,7 +48,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 def logout_view(request):
     try:
         refresh_token = request.data["refresh"]
-        token = RefreshToken(refresh_token)
+        token = FastRefreshToken(refresh_token)
         token.blacklist()
         return Response({"detail": "Logout successful"}, status=status.HTTP_205_RESET_CONTENT)
     except KeyError:
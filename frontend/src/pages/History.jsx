@@ -6,31 +6,33 @@ import { authFetch } from '../utils/auth';
 
 function History() {
   const [history, setHistory] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
   const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState('all');
   const navigate = useNavigate();
 
-  useEffect(() => {
-    const fetchHistory = async () => {
-      setLoading(true);
-      try {
-        const resp = await authFetch('/quiz-history/');
-        if (!resp.ok) {
-          console.error('Failed to fetch history', resp.status);
-          setHistory([]);
-          return;
-        }
-
-        const data = await resp.json();
-        setHistory(Array.isArray(data) ? data : (data.results || []));
-      } catch (error) {
-        console.error('Error fetching history:', error);
-        setHistory([]);
-      } finally {
-        setLoading(false);
+  // History is paginated by cursor; each page holds quiz summaries only.
+  const fetchHistory = async (url = '/quiz-history/') => {
+    setLoading(true);
+    try {
+      const resp = await authFetch(url);
+      if (!resp.ok) {
+        console.error('Failed to fetch history', resp.status);
+        return;
       }
-    };
 
+      const data = await resp.json();
+      const results = Array.isArray(data) ? data : (data.results || []);
+      setHistory(prev => (url === '/quiz-history/' ? results : [...prev, ...results]));
+      setNextUrl(data.next || null);
+    } catch (error) {
+      console.error('Error fetching history:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  useEffect(() => {
     fetchHistory();
   }, []);
 
@@ -41,8 +43,15 @@ function History() {
 
       // If quiz is completed → view results
       if (isCompleted) {
-        const questions = Array.isArray(quiz.questions) ? quiz.questions : [];
-        const userAnswers = quiz.user_answers || [];
+        // The history list only has summaries; fetch the full quiz.
+        const detailResp = await authFetch(`/quiz-history/${quiz.id}/`);
+        if (!detailResp.ok) {
+          alert('Failed to load quiz.');
+          return;
+        }
+        const detail = await detailResp.json();
+        const questions = Array.isArray(detail.questions) ? detail.questions : [];
+        const userAnswers = detail.user_answers || [];
 
         if (!questions.length) {
           alert('No questions found for this quiz.');
@@ -62,12 +71,10 @@ function History() {
         return;
       }
 
-      // ✅ Resume quiz from saved progress
-      const payload = { domain: quiz.domain, sub_domain: quiz.sub_domain };
-      const res = await authFetch('/resume-quiz/', {
-        method: 'POST',
-        body: JSON.stringify(payload),
-      });
+      // ✅ Resume quiz from saved progress (a GET, so the browser revalidates
+      // its cached copy and an unchanged quiz comes back as a bodiless 304)
+      const params = new URLSearchParams({ domain: quiz.domain, sub_domain: quiz.sub_domain });
+      const res = await authFetch(`/resume-quiz/?${params}`);
 
       if (!res.ok) {
         alert('Failed to resume quiz.');
@@ -133,8 +140,8 @@ function History() {
         </main>
 
         <div className="history-list">
-          {loading && <p style={{ textAlign: 'center', color: '#666' }}>Loading...</p>}
-          {!loading && (() => {
+          {loading && !history.length && <p style={{ textAlign: 'center', color: '#666' }}>Loading...</p>}
+          {!(loading && !history.length) && (() => {
             const filtered = history.filter(q => {
               if (filter === 'all') return true;
               const isCompleted = q.completed || (q.status && String(q.status).toLowerCase() === 'completed');
@@ -203,6 +210,13 @@ function History() {
               )
             ));
           })()}
+          {!loading && nextUrl && (
+            <div style={{ textAlign: 'center' }}>
+              <button className="history-btn" onClick={() => fetchHistory(nextUrl)}>
+                Load more
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
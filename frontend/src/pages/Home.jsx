@@ -33,43 +33,40 @@ function Home() {
       setLoading(true);
       try {
         const { authFetch } = await import("../utils/auth");
-        const resp = await authFetch("/quiz-history/");
-        if (!resp.ok) {
-          console.error("Failed to fetch quiz history for stats", resp.status);
+        // Totals come from one aggregate request; only the most recent
+        // completed quizzes are fetched, for the chart.
+        const [summaryResp, recentResp] = await Promise.all([
+          authFetch("/quiz-history/summary/"),
+          authFetch("/quiz-history/?status=completed&page_size=20"),
+        ]);
+        if (!summaryResp.ok || !recentResp.ok) {
+          console.error(
+            "Failed to fetch quiz stats",
+            summaryResp.status,
+            recentResp.status
+          );
           return;
         }
+        const summary = await summaryResp.json();
+        const recent = (await recentResp.json()).results || [];
 
-        const data = await resp.json();
-        const quizzes = Array.isArray(data) ? data : data.results || [];
-
-        const total = quizzes.length;
-        const completed = quizzes.filter(
-          (q) =>
-            q.completed || (q.status && q.status.toLowerCase() === "completed")
-        ).length;
-        const incomplete = total - completed;
-
-        const scoresList = quizzes
+        // Oldest first, so the line reads left to right.
+        const scoresList = recent
           .filter((q) => q.score !== null && q.score !== undefined)
+          .reverse()
           .map((q, index) => ({
             quiz: `Quiz ${index + 1}`,
             score: q.score,
           }));
 
-        const maxScore = scoresList.length
-          ? Math.max(...scoresList.map((s) => s.score))
-          : 0;
-        const minScore = scoresList.length
-          ? Math.min(...scoresList.map((s) => s.score))
-          : 0;
-        const averageScore = scoresList.length
-          ? parseFloat(
-              (
-                scoresList.reduce((sum, s) => sum + s.score, 0) /
-                scoresList.length
-              ).toFixed(1)
-            )
-          : 0;
+        const {
+          total,
+          completed,
+          incomplete,
+          max_score: maxScore,
+          min_score: minScore,
+          average_score: averageScore,
+        } = summary;
 
         setStats({
           total,
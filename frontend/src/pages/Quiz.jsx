@@ -22,17 +22,14 @@ function Quiz() {
     setSelectedAnswers(userAnswers[currentQuestion] || []);
   }, [currentQuestion, userAnswers]);
 
-  // ✅ Auto-save progress to backend
+  // ✅ Auto-save position to backend (answers are saved one at a time on click)
   useEffect(() => {
     if (!quizId) return;
     const saveProgress = async () => {
       try {
         await authFetch(`/save-progress/${quizId}/`, {
           method: 'POST',
-          body: JSON.stringify({
-            user_answers: userAnswers,
-            current_question_index: currentQuestion,
-          }),
+          body: JSON.stringify({ current_question_index: currentQuestion }),
         });
       } catch (err) {
         console.warn('Progress save failed:', err);
@@ -41,7 +38,24 @@ function Quiz() {
 
     const timeout = setTimeout(saveProgress, 700);
     return () => clearTimeout(timeout);
-  }, [quizId, userAnswers, currentQuestion]);
+  }, [quizId, currentQuestion]);
+
+  // Send one answer as a bitmask over the question's options (bit i = options[i]).
+  const saveAnswer = async (index, options, answers) => {
+    if (!quizId) return;
+    const selected = (options || []).reduce(
+      (mask, option, i) => (answers.includes(option) ? mask | (1 << i) : mask),
+      0
+    );
+    try {
+      await authFetch(`/answer/${quizId}/`, {
+        method: 'PATCH',
+        body: JSON.stringify({ index, selected }),
+      });
+    } catch (err) {
+      console.warn('Answer save failed:', err);
+    }
+  };
 
   if (!questions.length) {
     return (
@@ -81,6 +95,7 @@ function Quiz() {
     const updatedAnswers = [...userAnswers];
     updatedAnswers[currentQuestion] = newSelected;
     setUserAnswers(updatedAnswers);
+    saveAnswer(currentQuestion, currentQ.options, newSelected);
   };
 
   const handleNext = () => {